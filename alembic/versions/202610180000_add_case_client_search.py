@@ -0,0 +1,70 @@
+"""Add full-text search vectors for cases and clients
+
+Revision ID: 202610180000
+Revises: 202501010000
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '202610180000'
+down_revision = '202501010000'
+branch_labels = None
+depends_on = None
+
+
+# Weight A fields rank above B, B above C; 'simple' matches services/search.py
+CASE_SEARCH_DOCUMENT = """
+    setweight(to_tsvector('simple', coalesce(case_number, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(opposing_party, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+"""
+
+CLIENT_SEARCH_DOCUMENT = """
+    setweight(to_tsvector('simple', coalesce(first_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(last_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(company_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(email, '')), 'B')
+"""
+
+
+def upgrade() -> None:
+    """Add generated search_vector columns with tenant-scoped GIN indexes."""
+    
+    # Lets organization_id share the GIN index with the tsvector
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    
+    op.add_column('cases', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(CASE_SEARCH_DOCUMENT, persisted=True)
+    ))
+    op.add_column('clients', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(CLIENT_SEARCH_DOCUMENT, persisted=True)
+    ))
+    
+    op.create_index(
+        'idx_case_search', 'cases', ['organization_id', 'search_vector'],
+        postgresql_using='gin',
+        postgresql_where=sa.text('is_deleted = false')
+    )
+    op.create_index(
+        'idx_client_search', 'clients', ['organization_id', 'search_vector'],
+        postgresql_using='gin',
+        postgresql_where=sa.text('is_deleted = false')
+    )
+
+
+def downgrade() -> None:
+    """Remove search_vector columns and their indexes."""
+    
+    op.drop_index('idx_client_search', table_name='clients')
+    op.drop_index('idx_case_search', table_name='cases')
+    op.drop_column('clients', 'search_vector')
+    op.drop_column('cases', 'search_vector')
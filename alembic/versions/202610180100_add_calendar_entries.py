@@ -0,0 +1,87 @@
+"""Add calendar_entries projection for upcoming deadlines
+
+Revision ID: 202610180100
+Revises: 202610180000
+Create Date: 2026-10-18 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610180100'
+down_revision = '202610180000'
+branch_labels = None
+depends_on = None
+
+
+# Same rows services/case_calendar.py maintains on writes; enums are stored by name
+OPEN_CASE = """
+    c.is_deleted = false
+    AND c.status NOT IN ('SETTLED', 'CLOSED_WON', 'CLOSED_LOST',
+                         'CLOSED_DISMISSED', 'CLOSED_WITHDRAWN', 'ARCHIVED')
+"""
+
+BACKFILL = f"""
+    INSERT INTO calendar_entries
+        (organization_id, entry_date, kind, source_id, title, location,
+         case_id, case_number, case_title)
+    SELECT c.organization_id, c.deadline_date, 'DEADLINE', c.id, 'Deadline', NULL,
+           c.id, c.case_number, c.title
+    FROM cases c WHERE {OPEN_CASE} AND c.deadline_date IS NOT NULL
+    UNION ALL
+    SELECT c.organization_id, c.statute_of_limitations, 'STATUTE_OF_LIMITATIONS', c.id,
+           'Statute of limitations', NULL, c.id, c.case_number, c.title
+    FROM cases c WHERE {OPEN_CASE} AND c.statute_of_limitations IS NOT NULL
+    UNION ALL
+    SELECT c.organization_id, c.next_court_date, 'COURT_DATE', c.id, 'Court date', NULL,
+           c.id, c.case_number, c.title
+    FROM cases c WHERE {OPEN_CASE} AND c.next_court_date IS NOT NULL
+    UNION ALL
+    SELECT e.organization_id, e.event_date, 'EVENT', e.id, e.title, e.location,
+           c.id, c.case_number, c.title
+    FROM case_events e JOIN cases c ON c.id = e.case_id
+    WHERE {OPEN_CASE} AND e.is_deleted = false
+    UNION ALL
+    SELECT t.organization_id, t.due_date, 'TASK', t.id, t.title, NULL, c.id, c.case_number, c.title
+    FROM case_tasks t JOIN cases c ON c.id = t.case_id
+    WHERE {OPEN_CASE} AND t.is_deleted = false AND t.completed = false
+      AND t.due_date IS NOT NULL
+"""
+
+
+def upgrade() -> None:
+    """Create calendar_entries and fill it from existing cases, events and tasks."""
+    
+    op.create_table(
+        'calendar_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entry_date', sa.DateTime(), nullable=False),
+        sa.Column('kind', sa.Enum(
+            'DEADLINE', 'STATUTE_OF_LIMITATIONS', 'COURT_DATE', 'EVENT', 'TASK',
+            name='calendarentrykind'
+        ), nullable=False),
+        sa.Column('source_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('case_id', sa.Integer(), nullable=False),
+        sa.Column('case_number', sa.String(length=100), nullable=False),
+        sa.Column('case_title', sa.String(length=255), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['case_id'], ['cases.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_calendar_entries_case_id', 'calendar_entries', ['case_id'])
+    op.create_index('idx_calendar_org_date', 'calendar_entries', ['organization_id', 'entry_date'])
+    
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    """Drop calendar_entries."""
+    
+    op.drop_index('idx_calendar_org_date', table_name='calendar_entries')
+    op.drop_index('ix_calendar_entries_case_id', table_name='calendar_entries')
+    op.drop_table('calendar_entries')
+    sa.Enum(name='calendarentrykind').drop(op.get_bind(), checkfirst=True)
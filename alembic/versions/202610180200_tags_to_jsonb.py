@@ -0,0 +1,55 @@
+"""Store case and client tags as JSONB with GIN indexes
+
+Revision ID: 202610180200
+Revises: 202610180100
+Create Date: 2026-10-18 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '202610180200'
+down_revision = '202610180100'
+branch_labels = None
+depends_on = None
+
+
+TAGGED_TABLES = ('cases', 'clients')
+
+
+def _index_name(table: str) -> str:
+    return f"idx_{table[:-1]}_tags"
+
+
+def upgrade() -> None:
+    """Convert tags to JSONB and index them for @> containment filters."""
+    
+    for table in TAGGED_TABLES:
+        op.alter_column(
+            table, 'tags',
+            type_=postgresql.JSONB(),
+            existing_type=sa.JSON(),
+            postgresql_using='tags::jsonb'
+        )
+        # jsonb_path_ops supports only @>, and is smaller and faster for it
+        op.create_index(
+            _index_name(table), table, ['organization_id', 'tags'],
+            postgresql_using='gin',
+            postgresql_ops={'tags': 'jsonb_path_ops'},
+            postgresql_where=sa.text('is_deleted = false')
+        )
+
+
+def downgrade() -> None:
+    """Restore plain JSON tags."""
+    
+    for table in TAGGED_TABLES:
+        op.drop_index(_index_name(table), table_name=table)
+        op.alter_column(
+            table, 'tags',
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(),
+            postgresql_using='tags::json'
+        )
@@ -0,0 +1,55 @@
+"""Rebuild tenant-scoped case indexes as partial indexes over live rows
+
+Revision ID: 202610180300
+Revises: 202610180200
+Create Date: 2026-10-18 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610180300'
+down_revision = '202610180200'
+branch_labels = None
+depends_on = None
+
+
+CASE_ORG_INDEXES = {
+    'idx_case_org_status': ['organization_id', 'status'],
+    'idx_case_org_client': ['organization_id', 'client_id'],
+    'idx_case_org_type': ['organization_id', 'case_type'],
+    'idx_case_org_priority': ['organization_id', 'priority'],
+    'idx_case_org_assigned': ['organization_id', 'assigned_to_id'],
+    'idx_case_org_stage': ['organization_id', 'stage'],
+}
+
+
+def _rebuild(name: str, columns, **kwargs) -> None:
+    """
+    Replace an index without blocking writes to cases.
+    
+    The new index is built concurrently under a temporary name, so the old
+    one keeps serving queries until it is dropped and the new one renamed.
+    """
+    temporary = f"{name}_new"
+    with op.get_context().autocommit_block():
+        # Left INVALID if an earlier attempt was interrupted mid-build
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {temporary}')
+        op.create_index(temporary, 'cases', columns, postgresql_concurrently=True, **kwargs)
+        op.drop_index(name, table_name='cases', postgresql_concurrently=True)
+        op.execute(f'ALTER INDEX {temporary} RENAME TO {name}')
+
+
+def upgrade() -> None:
+    """Restrict the idx_case_org_* indexes to rows that are not soft-deleted."""
+    
+    for name, columns in CASE_ORG_INDEXES.items():
+        _rebuild(name, columns, postgresql_where=sa.text('is_deleted = false'))
+
+
+def downgrade() -> None:
+    """Restore full indexes."""
+    
+    for name, columns in CASE_ORG_INDEXES.items():
+        _rebuild(name, columns)
@@ -0,0 +1,30 @@
+"""Add a version column to cases for optimistic locking
+
+Revision ID: 202610180400
+Revises: 202610180300
+Create Date: 2026-10-18 04:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610180400'
+down_revision = '202610180300'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Start every existing case at version 1."""
+    
+    op.add_column(
+        'cases',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1')
+    )
+
+
+def downgrade() -> None:
+    """Drop the case version."""
+    
+    op.drop_column('cases', 'version')
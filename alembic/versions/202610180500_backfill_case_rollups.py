@@ -0,0 +1,64 @@
+"""Backfill case hour rollups from time entries
+
+Revision ID: 202610180500
+Revises: 202610180400
+Create Date: 2026-10-18 05:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610180500'
+down_revision = '202610180400'
+branch_labels = None
+depends_on = None
+
+
+cases = sa.table(
+    'cases',
+    sa.column('id', sa.Integer()),
+    sa.column('actual_hours', sa.Numeric(8, 2)),
+    sa.column('billable_hours', sa.Numeric(8, 2))
+)
+
+time_entries = sa.table(
+    'time_entries',
+    sa.column('case_id', sa.Integer()),
+    sa.column('hours', sa.Numeric(6, 2)),
+    sa.column('billable', sa.Boolean()),
+    sa.column('is_deleted', sa.Boolean())
+)
+
+
+def _total(*criteria):
+    """Sum of a case's live entry hours, as a correlated subquery."""
+    return (
+        sa.select(sa.func.coalesce(sa.func.sum(time_entries.c.hours), 0))
+        .where(
+            time_entries.c.case_id == cases.c.id,
+            time_entries.c.is_deleted.is_(False),
+            *criteria
+        )
+        .scalar_subquery()
+    )
+
+
+def upgrade() -> None:
+    """
+    Set every case's rollups from its live time entries.
+    
+    Session events only keep the columns in step from now on; rows written
+    before them hold whatever the columns were last set to.
+    """
+    
+    op.execute(
+        cases.update().values(
+            actual_hours=_total(),
+            billable_hours=_total(time_entries.c.billable.is_(True))
+        )
+    )
+
+
+def downgrade() -> None:
+    """Nothing to undo; the backfilled values stay correct."""
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Realtime load-testing harness.
+
+Registers N simulated WebSocket clients, spread across M document rooms, in
+an in-harness connection registry, and drives document updates through a
+RealtimeBroadcaster delivering to that registry plus presence changes
+through the PresenceTracker and SessionStore, all backed by fakeredis or a
+local redis-server. Fan-out latency runs from the broadcast call to the
+last frame its room receives, so it covers replay sequencing, the Redis
+publish, local handlers and the per-format encode and send in fan_out.
+Reports latency percentiles, throughput and memory per connection.
+
+Usage:
+    python -m benchmarks.realtime_load [--clients 2000] [--rooms 50]
+        [--update-rate 200] [--presence-rate 100] [--duration 10]
+        [--redis fakeredis|redis://localhost:6379] [--format json|msgpack]
+        [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services.realtime.broadcaster import RealtimeBroadcaster
+from services.realtime.framing import FrameFormat
+from services.realtime.presence_tracker import PresenceStatus, PresenceTracker
+from services.realtime.session_store import SessionStore
+
+
+@dataclass
+class LoadConfig:
+    """Parameters for a load run."""
+    clients: int = 2000
+    rooms: int = 50
+    update_rate: float = 200.0  # Document updates per second, across all rooms
+    presence_rate: float = 100.0  # Presence changes per second
+    duration: float = 10.0
+    redis: str = "fakeredis"
+    payload_bytes: int = 512  # Approximate size of each update's changes dict
+    frame_format: FrameFormat = FrameFormat.JSON
+    seed: int = 42
+
+
+@dataclass
+class LoadReport:
+    """Results of a load run."""
+    clients: int
+    rooms: int
+    duration_s: float
+    updates_sent: int
+    frames_delivered: int
+    presence_changes: int
+    messages_per_sec: float
+    fanout_p50_ms: float
+    fanout_p95_ms: float
+    fanout_p99_ms: float
+    fanout_max_ms: float
+    presence_roster_p95_ms: float
+    session_touch_p95_ms: float
+    memory_per_connection_bytes: int
+    errors: int = 0
+
+
+class SimulatedClient:
+    """In-process stand-in for a client's WebSocket."""
+    
+    def __init__(self, client_id: int, user_id: str, room_id: str):
+        self.client_id = client_id
+        self.connection_id = f"bench-{client_id}"
+        self.user_id = user_id
+        self.room_id = room_id
+        self.session_id: Optional[str] = None
+        self.received = 0
+        self.bytes_received = 0
+        self.last_received_at = 0.0
+    
+    def _record(self, data: Any):
+        self.received += 1
+        self.bytes_received += len(data)
+        self.last_received_at = time.perf_counter()
+    
+    async def send_text(self, data: str):
+        self._record(data)
+    
+    async def send_bytes(self, data: bytes):
+        self._record(data)
+
+
+class ConnectionRegistry:
+    """Room and user membership the broadcaster looks up when sending."""
+    
+    def __init__(self):
+        self._clients: Dict[str, SimulatedClient] = {}
+        self._rooms: Dict[str, List[str]] = {}
+        self._users: Dict[str, List[str]] = {}
+    
+    def add(self, client: SimulatedClient):
+        self._clients[client.connection_id] = client
+        self._rooms.setdefault(client.room_id, []).append(client.connection_id)
+        self._users.setdefault(client.user_id, []).append(client.connection_id)
+    
+    def clear(self):
+        self._clients.clear()
+        self._rooms.clear()
+        self._users.clear()
+    
+    def _pairs(self, connection_ids: List[str]) -> Iterator[Tuple[str, SimulatedClient]]:
+        return ((connection_id, self._clients[connection_id]) for connection_id in connection_ids)
+    
+    def room_connections(self, room_id: str) -> Iterator[Tuple[str, SimulatedClient]]:
+        return self._pairs(self._rooms.get(room_id, []))
+    
+    def user_connections(self, user_id: str) -> Iterator[Tuple[str, SimulatedClient]]:
+        return self._pairs(self._users.get(user_id, []))
+    
+    def all_connections(self) -> Iterator[Tuple[str, SimulatedClient]]:
+        return iter(list(self._clients.items()))
+
+
+@dataclass
+class _Samples:
+    fanout_ms: List[float] = field(default_factory=list)
+    roster_ms: List[float] = field(default_factory=list)
+    touch_ms: List[float] = field(default_factory=list)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty sample."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def _create_redis(target: str):
+    """Create the Redis stand-in the services will share."""
+    if target == "fakeredis":
+        from fakeredis import aioredis as fake_aioredis
+        return fake_aioredis.FakeRedis(decode_responses=True)
+    
+    import redis.asyncio as redis
+    return redis.from_url(target, encoding="utf-8", decode_responses=True)
+
+
+class RealtimeLoadTest:
+    """Drives simulated clients through presence, session and fan-out paths."""
+    
+    def __init__(self, config: LoadConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.clients: List[SimulatedClient] = []
+        self.rooms: Dict[str, List[SimulatedClient]] = {}
+        self.samples = _Samples()
+        self.errors = 0
+        self.presence = PresenceTracker(max_cached_users=config.clients * 2)
+        self.sessions = SessionStore(max_cached_sessions=config.clients * 2)
+        self.registry = ConnectionRegistry()
+        # Not started: the benchmark is the only publisher, so nothing needs
+        # the subscription loop, and the module-level broadcaster stays untouched
+        self.broadcaster = RealtimeBroadcaster(connections=self.registry)
+        self.redis_client = None
+    
+    async def setup(self) -> int:
+        """Connect every client; returns bytes allocated per connection."""
+        self.redis_client = await _create_redis(self.config.redis)
+        self.presence.redis_client = self.redis_client
+        self.sessions.redis_client = self.redis_client
+        self.broadcaster.redis_client = self.redis_client
+        self.broadcaster.replay.attach(self.redis_client)
+        
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        
+        for client_id in range(self.config.clients):
+            room_id = f"document:bench-{client_id % self.config.rooms}"
+            client = SimulatedClient(client_id, f"user-{client_id}", room_id)
+            session = await self.sessions.create_session(client.user_id)
+            client.session_id = session.session_id
+            self.registry.add(client)
+            self.broadcaster.set_frame_format(client.connection_id, self.config.frame_format)
+            await self.presence.join_room(client.user_id, room_id)
+            self.clients.append(client)
+            self.rooms.setdefault(room_id, []).append(client)
+        
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return (after - before) // max(1, self.config.clients)
+    
+    async def teardown(self):
+        """Disconnect the clients, flush benchmark keys and close Redis."""
+        for client in self.clients:
+            self.broadcaster.forget_connection(client.connection_id)
+        self.registry.clear()
+        self.broadcaster.replay.attach(None)
+        
+        if self.redis_client is None:
+            return
+        if self.config.redis == "fakeredis":
+            await self.redis_client.flushall()
+        await self.redis_client.close()
+    
+    async def _send_update(self, seq: int) -> int:
+        """Broadcast one update to a random room and record when its last frame lands."""
+        room_id = self.random.choice(list(self.rooms))
+        members = self.rooms[room_id]
+        received = [client.received for client in members]
+        
+        started = time.perf_counter()
+        await self.broadcaster.broadcast_document_update(
+            room_id.split(":", 1)[1],
+            self.random.choice(members).user_id,
+            changes={"seq": seq, "text": "x" * self.config.payload_bytes}
+        )
+        
+        delivered = sum(client.received - before for client, before in zip(members, received))
+        missed = [client for client, before in zip(members, received) if client.received == before]
+        self.errors += len(missed)
+        if len(missed) < len(members):
+            last = max(client.last_received_at for client in members)
+            self.samples.fanout_ms.append((last - started) * 1000)
+        return delivered
+    
+    async def _change_presence(self):
+        """Touch a random client's presence and session, then read its room roster."""
+        client = self.random.choice(self.clients)
+        status = self.random.choice(
+            [PresenceStatus.ONLINE, PresenceStatus.AWAY, PresenceStatus.BUSY]
+        )
+        
+        try:
+            await self.presence.set_user_online(client.user_id, status)
+            
+            started = time.perf_counter()
+            await self.sessions.update_session_activity(client.session_id)
+            self.samples.touch_ms.append((time.perf_counter() - started) * 1000)
+            
+            started = time.perf_counter()
+            await self.presence.get_room_members(client.room_id)
+            self.samples.roster_ms.append((time.perf_counter() - started) * 1000)
+        except Exception:
+            self.errors += 1
+    
+    async def _drive(self, rate: float, action, deadline: float) -> int:
+        """Call action at a fixed rate until the deadline; returns the call count."""
+        if rate <= 0:
+            return 0
+        
+        interval = 1.0 / rate
+        count = 0
+        next_at = time.perf_counter()
+        
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_at:
+                await asyncio.sleep(next_at - now)
+            await action(count)
+            count += 1
+            next_at += interval
+        
+        return count
+    
+    async def run(self) -> LoadReport:
+        """Run the configured load and return the report."""
+        memory_per_connection = await self.setup()
+        frames_delivered = 0
+        
+        async def update(seq: int):
+            nonlocal frames_delivered
+            frames_delivered += await self._send_update(seq)
+        
+        async def presence(_: int):
+            await self._change_presence()
+        
+        try:
+            started = time.perf_counter()
+            deadline = started + self.config.duration
+            updates_sent, presence_changes = await asyncio.gather(
+                self._drive(self.config.update_rate, update, deadline),
+                self._drive(self.config.presence_rate, presence, deadline)
+            )
+            elapsed = time.perf_counter() - started
+        finally:
+            await self.teardown()
+        
+        fanout = self.samples.fanout_ms
+        return LoadReport(
+            clients=self.config.clients,
+            rooms=self.config.rooms,
+            duration_s=round(elapsed, 3),
+            updates_sent=updates_sent,
+            frames_delivered=frames_delivered,
+            presence_changes=presence_changes,
+            messages_per_sec=round(frames_delivered / elapsed, 1) if elapsed else 0.0,
+            fanout_p50_ms=round(statistics.median(fanout), 3) if fanout else 0.0,
+            fanout_p95_ms=round(_percentile(fanout, 95), 3),
+            fanout_p99_ms=round(_percentile(fanout, 99), 3),
+            fanout_max_ms=round(max(fanout), 3) if fanout else 0.0,
+            presence_roster_p95_ms=round(_percentile(self.samples.roster_ms, 95), 3),
+            session_touch_p95_ms=round(_percentile(self.samples.touch_ms, 95), 3),
+            memory_per_connection_bytes=memory_per_connection,
+            errors=self.errors
+        )
+
+
+def run_load_test(config: LoadConfig) -> LoadReport:
+    """Run a load test synchronously."""
+    return asyncio.run(RealtimeLoadTest(config).run())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Realtime stack load test")
+    parser.add_argument("--clients", type=int, default=LoadConfig.clients)
+    parser.add_argument("--rooms", type=int, default=LoadConfig.rooms)
+    parser.add_argument("--update-rate", type=float, default=LoadConfig.update_rate,
+                        help="Document updates per second across all rooms")
+    parser.add_argument("--presence-rate", type=float, default=LoadConfig.presence_rate,
+                        help="Presence changes per second")
+    parser.add_argument("--duration", type=float, default=LoadConfig.duration,
+                        help="Seconds to drive load for")
+    parser.add_argument("--redis", default=LoadConfig.redis,
+                        help="'fakeredis' or a redis:// URL for a local redis-server")
+    parser.add_argument("--payload-bytes", type=int, default=LoadConfig.payload_bytes)
+    parser.add_argument("--format", choices=[f.value for f in FrameFormat],
+                        default=FrameFormat.JSON.value,
+                        help="Frame format every simulated client negotiates")
+    parser.add_argument("--seed", type=int, default=LoadConfig.seed)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+    
+    config = LoadConfig(
+        clients=args.clients,
+        rooms=args.rooms,
+        update_rate=args.update_rate,
+        presence_rate=args.presence_rate,
+        duration=args.duration,
+        redis=args.redis,
+        payload_bytes=args.payload_bytes,
+        frame_format=FrameFormat(args.format),
+        seed=args.seed
+    )
+    report = run_load_test(config)
+    
+    if args.json:
+        print(json.dumps(asdict(report), indent=2))
+    else:
+        for name, value in asdict(report).items():
+            print(f"{name:32} {value}")
+    
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
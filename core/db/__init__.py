@@ -1,5 +1,30 @@
 """Database core module."""
 
-from .session import Base, SessionLocal, engine, get_db
+from .session import (
+    Base,
+    ReadSessionLocal,
+    SessionLocal,
+    engine,
+    get_async_db,
+    get_async_engine,
+    get_db,
+    get_read_db,
+    get_uow_db,
+)
+from .unit_of_work import UnitOfWorkRoute, commit_unless_unit_of_work, in_unit_of_work, unit_of_work
 
-__all__ = ["Base", "get_db", "SessionLocal", "engine"]
\ No newline at end of file
+__all__ = [
+    "Base",
+    "get_db",
+    "get_read_db",
+    "get_uow_db",
+    "unit_of_work",
+    "in_unit_of_work",
+    "commit_unless_unit_of_work",
+    "UnitOfWorkRoute",
+    "get_async_db",
+    "get_async_engine",
+    "SessionLocal",
+    "ReadSessionLocal",
+    "engine",
+]
\ No newline at end of file
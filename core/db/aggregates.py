@@ -0,0 +1,82 @@
+"""
+Grouped counts computed in SQL.
+On Postgres every breakdown and the overall totals come back from a single
+GROUPING SETS query; other dialects run one GROUP BY per dimension plus a
+totals query. Either way the database does the aggregation, so the cost
+does not grow with the rows loaded into Python.
+"""
+
+import os
+from enum import Enum
+from typing import Any, Dict, Sequence, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+# Seconds cached stats may be served before they are recomputed; commits only
+# invalidate the committing process, so this bounds staleness in the others,
+# the same bound cached list counts have
+STATS_CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL_SECONDS", "30"))
+
+
+def _key(value: Any) -> str:
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+def grouped_counts(
+    db: Session,
+    criteria: Sequence[Any],
+    dimensions: Dict[str, Any],
+    totals: Dict[str, Any]
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, Any]]:
+    """
+    Count rows per value of each dimension and compute overall totals.
+    
+    Args:
+        db: Database session
+        criteria: WHERE conditions selecting the rows, e.g. tenant scoping
+        dimensions: Breakdown name -> column to group by
+        totals: Total name -> aggregate expression over all matching rows
+    
+    Returns:
+        Tuple of (breakdown name -> {value: count}, total name -> value)
+    """
+    names = list(dimensions)
+    columns = [dimensions[name] for name in names]
+    breakdowns: Dict[str, Dict[str, int]] = {name: {} for name in names}
+    total_names = list(totals)
+    aggregates = [totals[name] for name in total_names]
+    
+    if db.get_bind().dialect.name == "postgresql":
+        rows = (
+            db.query(
+                *columns,
+                *(func.grouping(column) for column in columns),
+                func.count(),
+                *aggregates
+            )
+            .filter(*criteria)
+            .group_by(func.grouping_sets(*(tuple_(column) for column in columns), tuple_()))
+            .all()
+        )
+        
+        overall: Dict[str, Any] = dict.fromkeys(total_names)
+        width = len(columns)
+        for row in rows:
+            values, flags = row[:width], row[width:2 * width]
+            count = row[2 * width]
+            if all(flags):
+                # The () grouping set: totals over every matching row
+                overall = dict(zip(total_names, row[2 * width + 1:]))
+                continue
+            index = flags.index(0)
+            if values[index] is not None:
+                breakdowns[names[index]][_key(values[index])] = count
+        return breakdowns, overall
+    
+    for name, column in zip(names, columns):
+        rows = db.query(column, func.count()).filter(*criteria).group_by(column).all()
+        breakdowns[name] = {_key(value): count for value, count in rows if value is not None}
+    
+    row = db.query(*aggregates).filter(*criteria).one() if aggregates else ()
+    return breakdowns, dict(zip(total_names, row))
@@ -0,0 +1,182 @@
+"""
+Set-based bulk updates scoped to one organization.
+Each chunk of ids becomes one ``UPDATE ... WHERE id IN (...) AND
+organization_id = ?`` statement, and the ids actually updated come back
+through RETURNING where the dialect supports it. Every chunk runs in the
+caller's transaction, and committed-write listeners are notified as if the
+rows had been flushed. Versioned mappers have their version bumped, so
+ETags issued before a bulk change no longer match.
+"""
+
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+from sqlalchemy import inspect, select, update
+from sqlalchemy.orm import Session
+
+from core.exceptions import ValidationError
+
+from .invalidation import record_write
+
+# Ids per UPDATE statement; keeps IN lists well under driver parameter limits
+BULK_CHUNK_SIZE = int(os.getenv("BULK_UPDATE_CHUNK_SIZE", "1000"))
+
+_SYNC = {"synchronize_session": "fetch"}
+
+
+def version_attribute(model: type) -> Any:
+    """The mapped attribute of the model's ``version_id_col``, or None if unversioned."""
+    mapper = inspect(model)
+    if mapper.version_id_col is None:
+        return None
+    return getattr(model, mapper.get_property_by_column(mapper.version_id_col).key)
+
+
+def chunked(values: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Split a sequence into consecutive slices of at most ``size`` items."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def bulk_parameter(parameters: Dict[str, Any], name: str, coerce: Callable[[Any], Any]) -> Any:
+    """Read one bulk action parameter, raising ValidationError if missing or invalid."""
+    if name not in parameters:
+        raise ValidationError(f"Bulk action requires the '{name}' parameter")
+    try:
+        return coerce(parameters[name])
+    except (TypeError, ValueError):
+        raise ValidationError(f"Invalid value for '{name}': {parameters[name]!r}")
+
+
+def optional_int(value: Any) -> Any:
+    """Coerce a parameter to an int, keeping None (e.g. to unassign)."""
+    return None if value is None else int(value)
+
+
+def string_list(value: Any) -> List[str]:
+    """Coerce a parameter to a list of strings."""
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(value)
+    return [str(item) for item in value]
+
+
+def list_union(items: Sequence[Any]) -> Callable[[Any], List[Any]]:
+    """Transform appending ``items`` missing from a JSON array value."""
+    def transform(current):
+        current = list(current or [])
+        return current + [item for item in dict.fromkeys(items) if item not in current]
+    return transform
+
+
+def list_difference(items: Sequence[Any]) -> Callable[[Any], List[Any]]:
+    """Transform removing ``items`` from a JSON array value."""
+    def transform(current):
+        return [item for item in current or [] if item not in items]
+    return transform
+
+
+def bulk_update(
+    db: Session,
+    model: type,
+    ids: Iterable[int],
+    organization_id: int,
+    values: Dict[Any, Any],
+    criteria: Sequence[Any] = (),
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[int]:
+    """
+    Apply the same column values to an organization's rows by id.
+    
+    Args:
+        db: Database session; the caller commits
+        model: Mapped class with ``id`` and ``organization_id`` columns
+        ids: Primary keys to update; duplicates are ignored
+        organization_id: Rows of other organizations are never touched
+        values: Column -> new value or SQL expression
+        criteria: Extra WHERE conditions, e.g. excluding soft-deleted rows
+        chunk_size: Ids per statement
+    
+    Returns:
+        Ids of the rows updated, in request order per chunk
+    """
+    ids = list(dict.fromkeys(ids))
+    returning = db.get_bind().dialect.update_returning
+    updated: List[int] = []
+    
+    version = version_attribute(model)
+    if version is not None:
+        values = {**values, version: version + 1}
+    
+    for chunk in chunked(ids, chunk_size):
+        where = (model.id.in_(chunk), model.organization_id == organization_id, *criteria)
+        if returning:
+            statement = update(model).where(*where).values(values).returning(model.id)
+            updated.extend(db.execute(statement, execution_options=_SYNC).scalars())
+            continue
+        
+        matched = db.execute(select(model.id).where(*where)).scalars().all()
+        if matched:
+            statement = update(model).where(model.id.in_(matched)).values(values)
+            db.execute(statement, execution_options=_SYNC)
+            updated.extend(matched)
+    
+    if updated:
+        record_write(db, model, organization_id, updated)
+    return updated
+
+
+def bulk_rewrite(
+    db: Session,
+    model: type,
+    column: Any,
+    ids: Iterable[int],
+    organization_id: int,
+    transform: Callable[[Any], Any],
+    criteria: Sequence[Any] = (),
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[int]:
+    """
+    Replace one column with a per-row value computed from its current value.
+    
+    For changes SQL cannot express portably. Each chunk costs one SELECT of
+    (id, column) and one executemany UPDATE of the rows that changed.
+    
+    Returns:
+        Ids of the rows found, whether or not their value changed
+    """
+    ids = list(dict.fromkeys(ids))
+    key = column.key
+    found: List[int] = []
+    changed: List[int] = []
+    
+    # Versioned rows are updated by primary key and the version they were
+    # read at; the ORM bumps it and raises StaleDataError if it changed
+    version = version_attribute(model)
+    columns = (model.id, column) if version is None else (model.id, column, version)
+    
+    for chunk in chunked(ids, chunk_size):
+        rows = db.execute(
+            select(*columns).where(
+                model.id.in_(chunk),
+                model.organization_id == organization_id,
+                *criteria
+            )
+        ).all()
+        found.extend(row[0] for row in rows)
+        
+        changes = []
+        for row_id, current, *read_version in rows:
+            new = transform(current)
+            if new != current:
+                change = {"id": row_id, key: new}
+                if version is not None:
+                    change[version.key] = read_version[0]
+                changes.append(change)
+        if changes:
+            # Ids were selected within the organization; rows are updated by primary key
+            db.execute(update(model), changes)
+            changed.extend(change["id"] for change in changes)
+    
+    if changed:
+        record_write(db, model, organization_id, changed)
+    return found
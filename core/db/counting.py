@@ -0,0 +1,180 @@
+"""
+Count strategies for paginated list totals.
+Exact runs COUNT(*) every time; cached memoizes counts per organization and
+filter set for a short TTL and drops them when the organization's rows
+change; estimated reads the Postgres planner's row estimate.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+
+from .invalidation import on_committed_write
+from .replicas import pin_to_primary
+
+# Seconds a cached count may be served before it is recounted
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+
+# Upper bound on cached counts per process
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "10000"))
+
+# Below this many estimated rows an exact count is cheap enough to run
+ESTIMATE_EXACT_THRESHOLD = int(os.getenv("COUNT_ESTIMATE_EXACT_THRESHOLD", "1000"))
+
+
+class CountStrategy(str, Enum):
+    """How list endpoints compute their total."""
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+
+
+class CountResult(NamedTuple):
+    """A list total and whether it was counted exactly for this request."""
+    total: int
+    exact: bool
+
+
+# (namespace, organization_id, filter hash) -> (expires_at, total), oldest first
+_count_cache: "OrderedDict[Tuple, Tuple[float, int]]" = OrderedDict()
+
+# (namespace, organization_id) -> cache keys, for invalidation
+_cache_index: Dict[Tuple[str, Any], Set[Tuple]] = {}
+
+# Guards both structures; request threads and commit hooks share them
+_cache_lock = threading.Lock()
+
+
+def filter_hash(filters: Any) -> str:
+    """Stable hash of a filter schema's non-empty fields."""
+    if filters is None:
+        return "none"
+    data = filters.dict(exclude_none=True) if hasattr(filters, "dict") else dict(filters)
+    encoded = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def _forget(key: Tuple):
+    """Remove a cached count and its index entry; caller holds the lock."""
+    _count_cache.pop(key, None)
+    keys = _cache_index.get(key[:2])
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del _cache_index[key[:2]]
+
+
+def _get_cached(key: Tuple) -> Optional[int]:
+    with _cache_lock:
+        entry = _count_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            _forget(key)
+            return None
+        return entry[1]
+
+
+def _set_cached(key: Tuple, total: int):
+    with _cache_lock:
+        _count_cache[key] = (time.monotonic() + COUNT_CACHE_TTL_SECONDS, total)
+        _count_cache.move_to_end(key)
+        _cache_index.setdefault(key[:2], set()).add(key)
+        while len(_count_cache) > COUNT_CACHE_MAX_ENTRIES:
+            _forget(next(iter(_count_cache)))
+
+
+def invalidate_counts(namespace: str, organization_id: Any):
+    """Drop every cached count for an organization's list."""
+    with _cache_lock:
+        for key in _cache_index.pop((namespace, organization_id), ()):
+            _count_cache.pop(key, None)
+
+
+def clear_count_cache():
+    """Drop every cached count."""
+    with _cache_lock:
+        _count_cache.clear()
+        _cache_index.clear()
+
+
+def _exact_count(query: Query) -> int:
+    return query.order_by(None).count()
+
+
+def _estimated_count(db: Session, query: Query) -> Optional[int]:
+    """Planner row estimate for a query, or None off Postgres."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    
+    statement = query.order_by(None).statement.compile(
+        dialect=bind.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_total(
+    db: Session,
+    query: Query,
+    strategy: CountStrategy = CountStrategy.EXACT,
+    namespace: str = "",
+    organization_id: Any = None,
+    filters: Any = None,
+    filtered: bool = False
+) -> CountResult:
+    """
+    Count the rows a list query matches using the requested strategy.
+    
+    Args:
+        db: Database session
+        query: Filtered list query, without pagination applied
+        strategy: Count strategy to use
+        namespace: List name used to scope cached counts, e.g. "cases"
+        organization_id: Tenant whose writes invalidate the cached count
+        filters: Filter schema used to key cached counts
+        filtered: Whether user filters narrow the query; estimates are only
+            used for unfiltered lists and fall back to cached counts otherwise
+    
+    Returns:
+        CountResult with the total and whether it was counted exactly now
+    """
+    strategy = CountStrategy(strategy)
+    
+    if strategy == CountStrategy.ESTIMATED and not filtered:
+        estimate = _estimated_count(db, query)
+        if estimate is not None and estimate >= ESTIMATE_EXACT_THRESHOLD:
+            return CountResult(estimate, False)
+        if estimate is not None:
+            return CountResult(_exact_count(query), True)
+    
+    if strategy == CountStrategy.EXACT:
+        return CountResult(_exact_count(query), True)
+    
+    key = (namespace, organization_id, filter_hash(filters))
+    cached = _get_cached(key)
+    if cached is not None:
+        return CountResult(cached, False)
+    
+    # A lagging replica could cache a count the last commit invalidated
+    pin_to_primary(db)
+    total = _exact_count(query)
+    _set_cached(key, total)
+    return CountResult(total, True)
+
+
+def track_count_invalidation(model: type, namespace: str):
+    """Invalidate a namespace's cached counts when ``model`` rows are written."""
+    on_committed_write(model, lambda organization_id: invalidate_counts(namespace, organization_id))
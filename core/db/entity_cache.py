@@ -0,0 +1,227 @@
+"""
+Read-through cache for single-row lookups.
+Detail pages load the same few rows over and over. Rendered rows are kept
+in a per-process LRU and, when Redis is configured, in Redis keys that every
+process shares. Each Redis entry has its own TTL and is keyed by a
+per-organization generation: a commit writing any of a cache's models bumps
+the generation, which orphans every older entry at once, and a fill is
+written under the generation read before loading, so a load racing a commit
+in another process lands under a generation nobody reads any more. The
+local TTL only bounds how long another process's LRU can lag behind.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .invalidation import on_committed_write
+from .replicas import pin_to_primary
+
+logger = logging.getLogger(__name__)
+
+# Serve detail lookups from the entity cache
+ENTITY_CACHE_ENABLED = os.getenv("ENTITY_CACHE_ENABLED", "false").lower() == "true"
+
+# Seconds an entry is served from process memory without asking Redis
+ENTITY_CACHE_LOCAL_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_LOCAL_TTL_SECONDS", "5"))
+
+# Seconds an entry is kept in Redis
+ENTITY_CACHE_REDIS_TTL_SECONDS = int(os.getenv("ENTITY_CACHE_REDIS_TTL_SECONDS", "60"))
+
+# Upper bound on in-process entries per cache
+ENTITY_CACHE_MAX_ENTRIES = int(os.getenv("ENTITY_CACHE_MAX_ENTRIES", "5000"))
+
+# Shared tier; empty keeps entries in process memory only
+ENTITY_CACHE_REDIS_URL = os.getenv("ENTITY_CACHE_REDIS_URL", os.getenv("REDIS_URL", ""))
+
+# None until first use, False when Redis is not configured or not installed
+_redis_client: Any = None
+_redis_lock = threading.Lock()
+
+
+def _redis():
+    """The shared Redis client, or None to use process memory only."""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = False
+                if ENTITY_CACHE_REDIS_URL:
+                    try:
+                        import redis
+                        _redis_client = redis.from_url(
+                            ENTITY_CACHE_REDIS_URL, decode_responses=True
+                        )
+                    except ImportError:
+                        logger.warning("redis package not available, entity cache stays in process")
+    return _redis_client or None
+
+
+class EntityCache:
+    """
+    Rendered rows of one kind, keyed by organization and lookup key.
+    
+    Values are strings (typically a response schema's JSON) so both tiers
+    store them as they are.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        *models: type,
+        local_ttl: float = ENTITY_CACHE_LOCAL_TTL_SECONDS,
+        redis_ttl: int = ENTITY_CACHE_REDIS_TTL_SECONDS,
+        max_entries: int = ENTITY_CACHE_MAX_ENTRIES,
+        enabled: bool = ENTITY_CACHE_ENABLED
+    ):
+        self.name = name
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple[Any, str], Tuple[float, str]]" = OrderedDict()
+        # Bumped on invalidation so a load racing a local commit is not cached
+        self._generations: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        for model in models:
+            on_committed_write(model, self.invalidate)
+    
+    def _generation_key(self, organization_id: Any) -> str:
+        return f"entity:{self.name}:{organization_id}:generation"
+    
+    def _entry_key(self, organization_id: Any, generation: int, key: str) -> str:
+        return f"entity:{self.name}:{organization_id}:{generation}:{key}"
+    
+    def _shared_generation(self, client: Any, organization_id: Any) -> int:
+        return int(client.get(self._generation_key(organization_id)) or 0)
+    
+    def _generation(self, organization_id: Any) -> Tuple[int, Optional[int]]:
+        """
+        The organization's local and shared generations.
+        
+        The shared one is None without Redis or when it cannot be read, in
+        which case nothing is written to Redis.
+        """
+        local = self._generations.get(organization_id, 0)
+        client = _redis()
+        if client is None:
+            return local, None
+        try:
+            return local, self._shared_generation(client, organization_id)
+        except Exception as e:
+            logger.warning(f"Entity cache generation read from Redis failed: {e}")
+            return local, None
+    
+    def _remember(self, organization_id: Any, key: str, value: str):
+        with self._lock:
+            self._entries[(organization_id, key)] = (time.monotonic() + self.local_ttl, value)
+            self._entries.move_to_end((organization_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get(self, organization_id: Any, key: str) -> Optional[str]:
+        """A cached value from process memory or Redis, or None."""
+        with self._lock:
+            entry = self._entries.get((organization_id, key))
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end((organization_id, key))
+                    return entry[1]
+                del self._entries[(organization_id, key)]
+        
+        client = _redis()
+        if client is None:
+            return None
+        try:
+            generation = self._shared_generation(client, organization_id)
+            value = client.get(self._entry_key(organization_id, generation, key))
+        except Exception as e:
+            logger.warning(f"Entity cache read from Redis failed: {e}")
+            return None
+        if value is not None:
+            self._remember(organization_id, key, value)
+        return value
+    
+    def set(
+        self,
+        organization_id: Any,
+        key: str,
+        value: str,
+        generation: Optional[Tuple[int, Optional[int]]] = None
+    ):
+        """
+        Store a value in both tiers.
+        
+        ``generation`` is the organization's generation from before the value
+        was loaded; a value loaded before an invalidation is dropped locally
+        and written under a generation that is no longer read.
+        """
+        local, shared = generation if generation is not None else self._generation(organization_id)
+        if self._generations.get(organization_id, 0) != local:
+            return
+        self._remember(organization_id, key, value)
+        
+        client = _redis()
+        if client is None or shared is None:
+            return
+        try:
+            client.setex(self._entry_key(organization_id, shared, key), self.redis_ttl, value)
+        except Exception as e:
+            logger.warning(f"Entity cache write to Redis failed: {e}")
+    
+    def invalidate(self, organization_id: Any):
+        """Drop an organization's entries; None drops every in-process entry."""
+        with self._lock:
+            self._generations[organization_id] = self._generations.get(organization_id, 0) + 1
+            if organization_id is None:
+                self._entries.clear()
+            else:
+                for cached in [cached for cached in self._entries if cached[0] == organization_id]:
+                    del self._entries[cached]
+        
+        client = _redis()
+        if client is None or organization_id is None:
+            return
+        try:
+            # Older entries are never read again and expire on their own
+            client.incr(self._generation_key(organization_id))
+        except Exception as e:
+            logger.warning(f"Entity cache invalidation in Redis failed: {e}")
+    
+    def clear(self):
+        """Drop every in-process entry."""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_or_load(
+        self,
+        db: Session,
+        organization_id: Any,
+        key: str,
+        load: Callable[[], Optional[str]]
+    ) -> Optional[str]:
+        """
+        The cached value for ``key``, or ``load()`` cached for next time.
+        
+        Misses (``load()`` returning None) are not cached, so a row created
+        after a 404 is found straight away.
+        """
+        if not self.enabled:
+            return load()
+        
+        value = self.get(organization_id, key)
+        if value is not None:
+            return value
+        
+        # A lagging replica could refill the cache with a row a commit just replaced
+        pin_to_primary(db)
+        generation = self._generation(organization_id)
+        value = load()
+        if value is not None:
+            self.set(organization_id, key, value, generation)
+        return value
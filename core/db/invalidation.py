@@ -0,0 +1,145 @@
+"""
+Commit-time write notifications for in-process caches.
+Caches register a callback per mapped class; after a transaction commits,
+each callback is called once per organization whose rows of that class
+were inserted, updated or deleted. Row listeners are also told which
+primary keys were written. Rolled back writes notify nobody.
+OrganizationCache builds a per-organization TTL cache on top of this.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = "committed_write_organizations"
+
+_PENDING_ROWS_KEY = "committed_write_rows"
+
+# Mapped class -> callbacks taking an organization_id
+_listeners: Dict[type, List[Callable[[Any], None]]] = {}
+
+# Mapped class -> callbacks taking an organization_id and the written ids
+_row_listeners: Dict[type, List[Callable[[Any, Optional[Set[Any]]], None]]] = {}
+
+
+def on_committed_write(model: type, callback: Callable[[Any], None]):
+    """Call ``callback(organization_id)`` after commits that write ``model`` rows."""
+    _listeners.setdefault(model, []).append(callback)
+
+
+def on_committed_rows(model: type, callback: Callable[[Any, Optional[Set[Any]]], None]):
+    """
+    Call ``callback(organization_id, ids)`` after commits that write ``model`` rows.
+    
+    ``ids`` is None when a write did not say which rows it touched.
+    """
+    _row_listeners.setdefault(model, []).append(callback)
+
+
+def _add_rows(session: Session, model: type, organization_id: Any, ids: Optional[Set[Any]]):
+    rows: Dict[Tuple[type, Any], Optional[Set[Any]]] = session.info.setdefault(
+        _PENDING_ROWS_KEY, {}
+    )
+    key = (model, organization_id)
+    if ids is None or (key in rows and rows[key] is None):
+        rows[key] = None
+    else:
+        rows.setdefault(key, set()).update(ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_writes(session: Session, flush_context):
+    """Remember which organizations' rows changed in this transaction."""
+    if not _listeners and not _row_listeners:
+        return
+    
+    pending: Set[Tuple[type, Any]] = session.info.setdefault(_PENDING_KEY, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        model = type(instance)
+        organization_id = getattr(instance, "organization_id", None)
+        if model in _listeners:
+            pending.add((model, organization_id))
+        if model in _row_listeners:
+            row_id = getattr(instance, "id", None)
+            _add_rows(session, model, organization_id, None if row_id is None else {row_id})
+
+
+def record_write(
+    session: Session,
+    model: type,
+    organization_id: Any,
+    ids: Optional[Iterable[Any]] = None
+):
+    """
+    Register a write made outside the unit of work, e.g. a bulk UPDATE.
+    
+    Listeners for ``model`` are notified for ``organization_id`` when the
+    session's transaction commits, exactly as for flushed rows. Without
+    ``ids``, row listeners assume any of the organization's rows changed.
+    """
+    if model in _listeners:
+        session.info.setdefault(_PENDING_KEY, set()).add((model, organization_id))
+    if model in _row_listeners:
+        _add_rows(session, model, organization_id, None if ids is None else set(ids))
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_writes(session: Session):
+    """Notify listeners once the writes are visible to other sessions."""
+    for model, organization_id in session.info.pop(_PENDING_KEY, ()):
+        for callback in _listeners.get(model, ()):
+            callback(organization_id)
+    for (model, organization_id), ids in session.info.pop(_PENDING_ROWS_KEY, {}).items():
+        for callback in _row_listeners.get(model, ()):
+            callback(organization_id, ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session: Session):
+    """Nothing was written, so nobody needs notifying."""
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_PENDING_ROWS_KEY, None)
+
+
+class OrganizationCache:
+    """
+    Per-organization values kept for a short TTL.
+    
+    Entries are dropped after any commit that writes one of ``models`` for
+    that organization, so the TTL only bounds staleness across processes.
+    """
+    
+    def __init__(self, *models: type, ttl: float = 300, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        for model in models:
+            on_committed_write(model, self.invalidate)
+    
+    def get(self, organization_id: Any) -> Any:
+        """Get an organization's value, or None if missing or expired."""
+        entry = self._entries.get(organization_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._entries.pop(organization_id, None)
+            return None
+        return entry[1]
+    
+    def set(self, organization_id: Any, value: Any):
+        """Store an organization's value, evicting the oldest entries if full."""
+        self._entries[organization_id] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(organization_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, organization_id: Any):
+        """Drop an organization's value."""
+        self._entries.pop(organization_id, None)
+    
+    def clear(self):
+        """Drop every value."""
+        self._entries.clear()
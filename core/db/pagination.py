@@ -0,0 +1,190 @@
+"""
+Keyset (cursor) pagination for SQLAlchemy queries.
+Pages are addressed by the last row's ``(order_by column, id)`` instead of
+an offset, so every page costs the same index range scan as the first.
+Cursors are opaque, HMAC-signed tokens.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from core.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Placeholder SECRET_KEY from the sample configuration; never a signing key
+_PUBLIC_SECRET = "your-secret-key-change-in-production"
+
+
+def _cursor_secret() -> str:
+    """
+    The cursor signing key.
+    
+    Without CURSOR_SECRET or a real SECRET_KEY a random key is generated, so
+    cursors cannot be forged but only work in the process that issued them.
+    """
+    secret = os.getenv("CURSOR_SECRET") or os.getenv("SECRET_KEY")
+    if secret and secret != _PUBLIC_SECRET:
+        return secret
+    logger.warning("CURSOR_SECRET is not set; signing cursors with a random per-process key")
+    return secrets.token_urlsafe(32)
+
+
+CURSOR_SECRET = _cursor_secret()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _sign(payload: str) -> str:
+    key = CURSOR_SECRET.encode("utf-8")
+    digest = hmac.new(key, payload.encode("utf-8"), hashlib.sha256).digest()
+    return _b64encode(digest[:16])
+
+
+def _dump_value(value: Any) -> Tuple[str, Any]:
+    """Serialize a sort key value with a type tag so it round-trips exactly."""
+    if isinstance(value, datetime):
+        return "dt", value.isoformat()
+    if isinstance(value, date):
+        return "d", value.isoformat()
+    if isinstance(value, Decimal):
+        return "dec", str(value)
+    if isinstance(value, Enum):
+        return "enum", value.value
+    return "raw", value
+
+
+def _load_value(tag: str, value: Any, column) -> Any:
+    if tag == "dt":
+        return datetime.fromisoformat(value)
+    if tag == "d":
+        return date.fromisoformat(value)
+    if tag == "dec":
+        return Decimal(value)
+    if tag == "enum":
+        enum_class = getattr(column.type, "enum_class", None)
+        return enum_class(value) if enum_class else value
+    return value
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Encode and sign a cursor payload."""
+    body = _b64encode(json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+    return f"{body}.{_sign(body)}"
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Verify and decode a cursor.
+    
+    Raises:
+        ValidationError: If the cursor is malformed or was tampered with
+    """
+    try:
+        body, signature = cursor.split(".", 1)
+    except (AttributeError, ValueError):
+        raise ValidationError("Invalid cursor")
+    
+    if not hmac.compare_digest(signature, _sign(body)):
+        raise ValidationError("Invalid cursor")
+    
+    try:
+        return json.loads(_b64decode(body))
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError("Invalid cursor")
+
+
+def keyset_paginate(
+    query: Query,
+    model,
+    order_by: str,
+    order_direction: str = "desc",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    allowed_columns: Iterable[str] = ("created_at", "id")
+) -> Tuple[List[Any], Optional[str], bool]:
+    """
+    Fetch one page of a query ordered by ``(order_by, id)``.
+    
+    Args:
+        query: Filtered query over ``model``; must not already be ordered
+        model: Mapped class with an ``id`` primary key
+        order_by: Sort column; must be non-nullable and in ``allowed_columns``
+        order_direction: ``asc`` or ``desc``
+        limit: Page size
+        cursor: ``next_cursor`` from the previous page, or None for the first page
+        allowed_columns: Columns that may be used as the sort key
+    
+    Returns:
+        Tuple of (items, next_cursor, has_next)
+    
+    Raises:
+        ValidationError: If the sort column is not allowed or the cursor does
+            not belong to this ordering
+    """
+    if order_by not in allowed_columns:
+        raise ValidationError(
+            f"Cannot paginate by cursor on '{order_by}'",
+            {"allowed": sorted(allowed_columns)}
+        )
+    if order_direction not in ("asc", "desc"):
+        raise ValidationError("order_direction must be 'asc' or 'desc'")
+    
+    column = getattr(model, order_by)
+    descending = order_direction == "desc"
+    
+    if cursor:
+        payload = decode_cursor(cursor)
+        if payload.get("o") != order_by or payload.get("d") != order_direction:
+            raise ValidationError("Cursor does not match the requested ordering")
+        
+        key = (_load_value(payload["t"], payload["v"], column), payload["id"])
+        if order_by == "id":
+            query = query.filter(column < key[1] if descending else column > key[1])
+        else:
+            # Row-value comparison lets the (column, id) index serve the range
+            position = tuple_(column, model.id)
+            query = query.filter(position < key if descending else position > key)
+    
+    if order_by == "id":
+        ordering = [column.desc() if descending else column.asc()]
+    elif descending:
+        ordering = [column.desc(), model.id.desc()]
+    else:
+        ordering = [column.asc(), model.id.asc()]
+    
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+    has_next = len(rows) > limit
+    items = rows[:limit]
+    
+    next_cursor = None
+    if has_next and items:
+        last = items[-1]
+        tag, value = _dump_value(getattr(last, order_by))
+        next_cursor = encode_cursor({
+            "o": order_by,
+            "d": order_direction,
+            "t": tag,
+            "v": value,
+            "id": last.id
+        })
+    
+    return items, next_cursor, has_next
@@ -0,0 +1,202 @@
+"""
+Engine construction and connection pool instrumentation.
+Sync and async engines share one set of pool settings read from the
+environment. Both pools time every checkout, so request latency spent
+waiting for a connection (rather than running SQL) is visible, together
+with how close each pool is to its limit.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Connections kept open per process, and extra connections allowed under burst
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+# Seconds after which a connection is replaced; keep below server/proxy idle timeouts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Test connections with a lightweight ping on checkout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Checkouts slower than this many milliseconds are logged
+DB_POOL_SLOW_CHECKOUT_MS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", "100"))
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Async drivers used in place of the configured sync driver
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+class PoolMetrics:
+    """Checkout wait statistics for one pool."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Optional[QueuePool] = None
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Zero every counter."""
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.buckets = [0] * (len(WAIT_BUCKETS) + 1)
+    
+    def observe(self, seconds: float, timed_out: bool = False):
+        """Record one checkout and how long it waited."""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.buckets[bisect_left(WAIT_BUCKETS, seconds)] += 1
+        
+        if seconds * 1000 >= DB_POOL_SLOW_CHECKOUT_MS:
+            logger.warning(
+                "Waited %.0f ms for a %s database connection%s: %s",
+                seconds * 1000, self.name, " and timed out" if timed_out else "",
+                self.pool.status() if self.pool is not None else "no pool"
+            )
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters and pool occupancy."""
+        with self._lock:
+            stats: Dict[str, Any] = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_buckets": {
+                    **{str(bound): count for bound, count in zip(WAIT_BUCKETS, self.buckets)},
+                    "+Inf": self.buckets[-1],
+                },
+            }
+        
+        pool = self.pool
+        if pool is not None:
+            # A negative max_overflow means the pool never blocks
+            capacity = pool.size() + pool._max_overflow if pool._max_overflow >= 0 else None
+            in_use = pool.checkedout()
+            stats.update({
+                "size": pool.size(),
+                "checked_out": in_use,
+                "overflow": max(pool.overflow(), 0),
+                "idle": pool.checkedin(),
+                "saturation": round(in_use / capacity, 4) if capacity else None,
+            })
+        return stats
+
+
+class _TimedCheckoutMixin:
+    """Times the wait for a pooled connection, including creating one."""
+    
+    metrics: PoolMetrics
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - started)
+        return connection
+    
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        self.metrics.pool = pool
+        return pool
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool recording checkout waits."""
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording checkout waits."""
+
+
+# Metrics by engine name, e.g. "primary" and "async"
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def _instrument(engine_pool, name: str) -> PoolMetrics:
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+    metrics.pool = engine_pool
+    engine_pool.metrics = metrics
+    return metrics
+
+
+def _pool_options(url) -> Dict[str, Any]:
+    """Pool keyword arguments; SQLite keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def build_engine(url, name: str = "primary", **options) -> Engine:
+    """Create a sync engine with the configured, instrumented pool."""
+    pool_options = _pool_options(url)
+    if pool_options:
+        pool_options["poolclass"] = TimedQueuePool
+    engine = create_engine(url, **{**pool_options, **options})
+    if isinstance(engine.pool, TimedQueuePool):
+        _instrument(engine.pool, name)
+    return engine
+
+
+def async_url(url):
+    """The URL with its driver swapped for the dialect's async driver."""
+    url = make_url(url)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()!r}")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+def build_async_engine(url, name: str = "async", **options):
+    """Create an AsyncEngine (asyncpg on Postgres) with the same pool settings."""
+    # Needs greenlet and the async driver, which sync-only deployments may lack
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
+    url = async_url(url)
+    pool_options = _pool_options(url)
+    if pool_options:
+        pool_options["poolclass"] = TimedAsyncQueuePool
+    engine = create_async_engine(url, **{**pool_options, **options})
+    if isinstance(engine.sync_engine.pool, TimedAsyncQueuePool):
+        _instrument(engine.sync_engine.pool, name)
+    return engine
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Checkout wait and saturation metrics for every instrumented pool."""
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
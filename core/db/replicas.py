@@ -0,0 +1,187 @@
+"""
+Read-replica routing.
+Sessions from ``get_read_db`` send SELECTs to a read replica and everything
+else (flushes, DML, raw SQL) to the primary. A replica is used only while
+its replication lag is below ``REPLICA_MAX_LAG_SECONDS``; otherwise reads
+fall back to the primary.
+
+Read-your-writes:
+    * Within a session, the first write pins every later statement to the
+      primary.
+    * Across requests, a successful unsafe request (POST, PUT, PATCH,
+      DELETE) sets a short-lived cookie, and requests carrying it read from
+      the primary until replicas have had time to catch up.
+    * Code filling shared caches calls ``pin_to_primary`` so a lagging
+      replica cannot repopulate a cache that a commit just invalidated.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import Select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from .pool import build_engine
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated replica URLs; empty keeps every read on the primary
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+
+# Replicas further behind than this are skipped
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+
+# Seconds a measured lag is trusted before it is checked again
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+
+# Seconds after a write during which the writer reads from the primary
+READ_YOUR_WRITES_SECONDS = float(
+    os.getenv("READ_YOUR_WRITES_SECONDS", str(REPLICA_MAX_LAG_SECONDS + 1))
+)
+
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+
+_PRIMARY_KEY = "routing_primary"
+_REPLICA_KEY = "routing_replica"
+
+_UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# Seconds since the last replayed transaction, or 0 when fully caught up
+_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    """A replica engine and its most recently measured lag."""
+    
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.lag: float = float("inf")
+        self.checked_at: float = float("-inf")
+    
+    def measure_lag(self) -> float:
+        """Query the replica's replication lag; unreachable replicas count as infinitely behind."""
+        if self.engine.dialect.name != "postgresql":
+            return 0.0
+        try:
+            with self.engine.connect() as connection:
+                return float(connection.execute(_LAG_QUERY).scalar() or 0)
+        except Exception as e:
+            logger.warning(f"Replica lag check failed for {self.engine.url.host}: {e}")
+            return float("inf")
+
+
+class ReplicaSet:
+    """Round-robin choice among replicas that are close enough to the primary."""
+    
+    def __init__(self, engines: List[Engine], max_lag: float = REPLICA_MAX_LAG_SECONDS):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._lock = threading.Lock()
+    
+    def _current_lag(self, replica: Replica) -> float:
+        now = time.monotonic()
+        if now - replica.checked_at >= REPLICA_LAG_CHECK_SECONDS:
+            with self._lock:
+                if now - replica.checked_at >= REPLICA_LAG_CHECK_SECONDS:
+                    replica.lag = replica.measure_lag()
+                    replica.checked_at = now
+        return replica.lag
+    
+    def choose(self) -> Optional[Engine]:
+        """A replica engine within the lag limit, or None to use the primary."""
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = next(self._cycle)
+            if self._current_lag(replica) <= self.max_lag:
+                return replica.engine
+        return None
+    
+    def status(self) -> List[dict]:
+        """Last measured lag per replica."""
+        return [{"host": r.engine.url.host, "lag_seconds": r.lag} for r in self.replicas]
+
+
+class RoutingSession(Session):
+    """Session sending SELECTs to a replica until it writes or is pinned to the primary."""
+    
+    def __init__(self, *args, primary: Engine, replicas: ReplicaSet, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replicas = replicas
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get(_PRIMARY_KEY):
+            return self.primary
+        if clause is None and not self._flushing:
+            # Bind lookups without a statement, e.g. to inspect the dialect
+            return self.primary
+        if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+            # Writes, locking reads and statements that may write pin the rest of the session
+            self.info[_PRIMARY_KEY] = True
+            return self.primary
+        
+        if _REPLICA_KEY not in self.info:
+            # One replica per session keeps its reads mutually consistent
+            self.info[_REPLICA_KEY] = self.replicas.choose()
+        return self.info[_REPLICA_KEY] or self.primary
+
+
+def pin_to_primary(session: Session):
+    """Send the rest of a routing session's statements to the primary; no-op otherwise."""
+    session.info[_PRIMARY_KEY] = True
+
+
+def reads_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough that replicas may not have its changes."""
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """Mark clients whose request changed data so their next reads use the primary."""
+    
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        wrote = request.method in _UNSAFE_METHODS and response.status_code < 400
+        if DATABASE_REPLICA_URLS and wrote:
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE,
+                str(time.time() + READ_YOUR_WRITES_SECONDS),
+                max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+                httponly=True,
+                samesite="lax"
+            )
+        return response
+
+
+def build_read_sessionmaker(
+    primary: Engine, replica_urls: List[str] = DATABASE_REPLICA_URLS
+) -> sessionmaker:
+    """Sessionmaker for routing sessions over ``primary`` and the replica URLs."""
+    replicas = ReplicaSet([
+        build_engine(url, name=f"replica-{index}") for index, url in enumerate(replica_urls)
+    ])
+    return sessionmaker(
+        class_=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        primary=primary,
+        replicas=replicas
+    )
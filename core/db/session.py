@@ -1,16 +1,42 @@
-from typing import Generator
+from typing import TYPE_CHECKING, AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from fastapi import Request
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
 from ..config import settings
+from .pool import build_async_engine, build_engine
+from .replicas import build_read_sessionmaker, reads_primary
+from .unit_of_work import request_unit_of_work
 
-engine = create_engine(settings.database_url.get_secret_value())
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+engine = build_engine(settings.database_url.get_secret_value())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Routes SELECTs to DATABASE_REPLICA_URLS; identical to SessionLocal without replicas
+ReadSessionLocal = build_read_sessionmaker(engine)
+
 Base = declarative_base()
 
+# Built on first use so deployments without asyncpg can still import this module
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_engine():
+    """The process-wide AsyncEngine for the configured database."""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        
+        _async_engine = build_async_engine(settings.database_url.get_secret_value())
+        _async_sessionmaker = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -18,3 +44,28 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_uow_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Session for write endpoints.
+    
+    Committed once by ``UnitOfWorkRoute`` after the endpoint returns.
+    """
+    # Autoflush writes pending objects before queries that need them
+    yield from request_unit_of_work(request, SessionLocal(autoflush=True))
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """Session for read-only endpoints: replica reads, or primary right after the client wrote."""
+    db = SessionLocal() if reads_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator["AsyncSession", None]:
+    get_async_engine()
+    async with _async_sessionmaker() as db:
+        yield db
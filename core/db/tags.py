@@ -0,0 +1,78 @@
+"""
+Tag lists stored as JSONB arrays.
+On Postgres, ``tags`` columns are JSONB with a GIN (jsonb_path_ops) index,
+so "has all of these tags" filters use the containment operator ``@>`` and
+become index scans, and bulk tag changes are single set-based UPDATEs.
+Other dialects store plain JSON and fall back to text matching and per-row
+rewrites. ``TagList`` tracks in-place list mutations so ``append``/``remove``
+on a loaded row are flushed.
+"""
+
+import json
+from typing import Any, Iterable, List, Sequence
+
+from sqlalchemy import JSON, String, Text, and_, cast, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, array
+from sqlalchemy.ext.mutable import MutableList
+from sqlalchemy.orm import Session
+
+from core.utils import LIKE_ESCAPE, escape_like
+
+from .bulk import BULK_CHUNK_SIZE, bulk_rewrite, bulk_update, list_difference, list_union
+
+# Column type for string tag arrays
+TagList = MutableList.as_mutable(JSONB().with_variant(JSON(), "sqlite"))
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def tags_condition(db: Session, column: Any, tags: Iterable[str]):
+    """WHERE condition matching rows tagged with every tag in ``tags``."""
+    tags = list(dict.fromkeys(tags))
+    if _is_postgres(db):
+        return column.op("@>")(literal(tags, JSONB))
+    return and_(*(
+        # Match the tag as JSON encodes it, with LIKE wildcards escaped
+        cast(column, String).like(f"%{escape_like(json.dumps(tag))}%", escape=LIKE_ESCAPE)
+        for tag in tags
+    ))
+
+
+def _without(column: Any, tags: Sequence[str]):
+    """``tags - ARRAY[...]``: the array minus every element equal to one of ``tags``."""
+    minus = func.coalesce(column, literal([], JSONB)).op("-", return_type=JSONB)
+    return minus(cast(array(tags), ARRAY(Text)))
+
+
+def bulk_update_tags(
+    db: Session,
+    model: type,
+    ids: Iterable[int],
+    organization_id: int,
+    tags: Sequence[str],
+    remove: bool = False,
+    criteria: Sequence[Any] = (),
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[int]:
+    """
+    Add ``tags`` to (or remove them from) an organization's rows by id.
+    
+    Returns:
+        Ids of the rows matched
+    """
+    tags = list(dict.fromkeys(tags))
+    column = model.tags
+    if not _is_postgres(db):
+        transform = list_difference(tags) if remove else list_union(tags)
+        return bulk_rewrite(
+            db, model, column, ids, organization_id, transform, criteria, chunk_size
+        )
+    
+    if remove:
+        value = _without(column, tags)
+    else:
+        # Dropping then appending keeps each tag once; only re-added tags move to the end
+        value = _without(column, tags).op("||", return_type=JSONB)(literal(tags, JSONB))
+    return bulk_update(db, model, ids, organization_id, {column: value}, criteria, chunk_size)
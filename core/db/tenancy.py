@@ -0,0 +1,57 @@
+"""
+Tenant-scoped data access.
+A TenantRepository is bound to one organization: every query it builds is
+restricted to that organization's live rows, so callers cannot forget the
+tenant filter, and rows it adds are stamped with the organization.
+"""
+
+from typing import Any, Generic, Optional, Type, TypeVar
+
+from sqlalchemy.orm import Query, Session
+
+from core.exceptions import PermissionError, ValidationError
+
+T = TypeVar("T")
+
+
+class TenantRepository(Generic[T]):
+    """Queries over one model restricted to a single organization."""
+    
+    def __init__(self, db: Session, model: Type[T], organization_id: Any):
+        if organization_id is None:
+            raise ValidationError(f"An organization is required to access {model.__name__} rows")
+        self.db = db
+        self.model = model
+        self.organization_id = organization_id
+    
+    def query(self, *options) -> Query:
+        """The organization's live rows, with optional loader options."""
+        query = self.db.query(self.model).filter(self.model.organization_id == self.organization_id)
+        if hasattr(self.model, "is_deleted"):
+            query = query.filter(self.model.is_deleted.is_(False))
+        return query.options(*options) if options else query
+    
+    def get(self, id: Any, *options) -> Optional[T]:
+        """A live row of the organization by primary key."""
+        return self.query(*options).filter(self.model.id == id).first()
+    
+    def get_by(self, column: str, value: Any, *options) -> Optional[T]:
+        """A live row of the organization by a unique column such as a slug."""
+        return self.query(*options).filter(getattr(self.model, column) == value).first()
+    
+    def add(self, instance: T) -> T:
+        """
+        Add a row to the organization.
+        
+        Raises:
+            PermissionError: If the row already belongs to another organization
+        """
+        current = getattr(instance, "organization_id", None)
+        if current is not None and current != self.organization_id:
+            raise PermissionError(
+                f"{self.model.__name__} belongs to another organization",
+                {"organization_id": current}
+            )
+        instance.organization_id = self.organization_id
+        self.db.add(instance)
+        return instance
@@ -0,0 +1,102 @@
+"""
+Request-scoped unit of work.
+Endpoints depending on ``get_uow_db`` get a session that model helpers and
+services never commit. Their changes stay pending (autoflush writes them
+when a query needs them) and ``UnitOfWorkRoute`` commits once, after the
+endpoint returns and before the response is sent, so a request costs one
+flush and one COMMIT however many objects it touches. An endpoint that
+raises commits nothing; closing the session rolls the work back.
+"""
+
+import logging
+from contextlib import contextmanager
+from typing import Callable, Generator
+
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+_ROUTE_FLAG = "unit_of_work_route"
+
+
+def in_unit_of_work(session: Session) -> bool:
+    """Whether someone else owns the session's commit."""
+    return bool(session.info.get(UNIT_OF_WORK_KEY))
+
+
+def commit_unless_unit_of_work(session: Session) -> None:
+    """Commit now, or leave it to the enclosing unit of work."""
+    if not in_unit_of_work(session):
+        session.commit()
+
+
+@contextmanager
+def unit_of_work(session: Session) -> Generator[Session, None, None]:
+    """
+    Commit everything done in the block once, or roll it all back.
+    
+    Nested blocks join the outermost one.
+    """
+    if in_unit_of_work(session):
+        yield session
+        return
+    
+    session.info[UNIT_OF_WORK_KEY] = True
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.info.pop(UNIT_OF_WORK_KEY, None)
+
+
+def request_unit_of_work(request: Request, session: Session) -> Generator[Session, None, None]:
+    """Dependency body binding ``session`` to the request for ``UnitOfWorkRoute`` to commit."""
+    if not getattr(request.state, _ROUTE_FLAG, False):
+        session.close()
+        raise RuntimeError("Unit of work sessions need a router with route_class=UnitOfWorkRoute")
+    
+    session.info[UNIT_OF_WORK_KEY] = True
+    request.state.unit_of_work = session
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class UnitOfWorkRoute(APIRoute):
+    """Route committing the request's unit of work once the endpoint has returned."""
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        
+        async def route_handler(request: Request):
+            setattr(request.state, _ROUTE_FLAG, True)
+            response = await handler(request)
+            
+            session = getattr(request.state, "unit_of_work", None)
+            if session is not None:
+                try:
+                    await run_in_threadpool(session.commit)
+                except StaleDataError:
+                    # A versioned row changed after the endpoint read it
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="The record was modified by another request"
+                    )
+                except Exception:
+                    logger.exception(
+                        f"Failed to commit unit of work for {request.method} {request.url.path}"
+                    )
+                    raise
+            return response
+        
+        return route_handler
@@ -0,0 +1,102 @@
+"""
+Optimistic concurrency for versioned models.
+Versioned mappers (``version_id_col``) put the version in every UPDATE's
+WHERE clause and bump it, so an edit based on a stale read matches no row
+and fails instead of overwriting a concurrent change. The version doubles
+as the ETag that clients send back in If-Match, so conflicts are caught
+without holding row locks between read and write.
+"""
+
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from core.exceptions import ConflictError, ValidationError
+
+
+def etag(version: int) -> str:
+    """Strong ETag for a row version."""
+    return f'"{version}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """
+    Expected version from an If-Match header; None when absent or ``*``.
+    
+    Raises:
+        ValidationError: If the header is not an ETag issued by this API
+    """
+    if value is None:
+        return None
+    tag = value.split(",")[0].strip()
+    if tag == "*":
+        return None
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise ValidationError("If-Match must be an ETag returned by this API", {"if_match": value})
+
+
+def check_version(instance: Any, expected_version: Optional[int]):
+    """
+    Refuse to edit a row whose version is no longer the one the client read.
+    
+    Raises:
+        ConflictError: If ``expected_version`` is given and differs
+    """
+    if expected_version is not None and instance.version != expected_version:
+        raise ConflictError(
+            f"{type(instance).__name__} was modified since version {expected_version}",
+            {"current_version": instance.version}
+        )
+
+
+def apply_update(instance: Any, changes: Dict[str, Any]):
+    """Set changed attributes, converting schema enums to the column's enum class."""
+    columns = inspect(type(instance)).columns
+    for field, value in changes.items():
+        if not hasattr(instance, field):
+            continue
+        column = columns.get(field)
+        enum_class = getattr(column.type, "enum_class", None) if column is not None else None
+        if enum_class is not None and value is not None and not isinstance(value, enum_class):
+            value = enum_class(getattr(value, "value", value))
+        setattr(instance, field, value)
+
+
+def flush_versioned(db: Session, instance: Any):
+    """
+    Flush pending changes, turning a lost update race into a ConflictError.
+    
+    Raises:
+        ConflictError: If another transaction updated ``instance`` first;
+            the session is rolled back and the error carries the stored version
+    """
+    model = type(instance)
+    identity = inspect(instance).identity
+    try:
+        db.flush()
+    except StaleDataError:
+        db.rollback()
+        current = None
+        if identity:
+            current = db.query(model.version).filter(model.id == identity[0]).scalar()
+        raise ConflictError(
+            f"{model.__name__} was modified by another request",
+            {"current_version": current}
+        )
+
+
+def conflict_exception(error: ConflictError) -> HTTPException:
+    """409 response carrying the current version, also as the ETag to retry with."""
+    current = error.details.get("current_version")
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": error.message, "current_version": current},
+        headers={"ETag": etag(current)} if current is not None else None
+    )
@@ -52,6 +52,11 @@ class DatabaseError(GoldleavesException):
     pass
 
 
+class ConflictError(GoldleavesException):
+    """Raised when a write is based on a version that has since changed."""
+    pass
+
+
 class EmailError(GoldleavesException):
     """Raised when email operations fail."""
     pass
@@ -21,3 +21,14 @@ def safe_get(d: dict, keys: list, default: Optional[str] = None):
         except (KeyError, TypeError):
             return default
     return d
+
+# Escape character passed as ``escape=`` alongside escape_like patterns
+LIKE_ESCAPE = "\\"
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so ``value`` only matches itself"""
+    return (
+        value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace("%", LIKE_ESCAPE + "%")
+        .replace("_", LIKE_ESCAPE + "_")
+    )
@@ -4,16 +4,17 @@ Provides common functionality like timestamps, soft deletes, and audit trails.
 """
 
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, event
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, event, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declared_attr
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Mapper, ORMExecuteState, Session, with_loader_criteria
 from sqlalchemy.sql import func
 
 from core.database import Base
+from core.db.unit_of_work import commit_unless_unit_of_work, in_unit_of_work
 
 
 class TimestampMixin:
@@ -39,6 +40,29 @@ class TimestampMixin:
         )
 
 
+# Execution option letting an ORM SELECT see soft-deleted rows
+INCLUDE_DELETED = "include_deleted"
+
+# Predicate of the partial indexes built by live_index()
+LIVE_ROWS = "is_deleted = false"
+
+
+def live_index(name: str, *columns, **kwargs) -> Index:
+    """
+    Index covering only rows that are not soft-deleted.
+    
+    Almost every read filters ``is_deleted = false``, so deleted rows only
+    make a full index bigger. The predicate matches the default loader
+    criteria below, which lets the planner use the index for ORM queries.
+    """
+    return Index(
+        name, *columns,
+        postgresql_where=text(LIVE_ROWS),
+        sqlite_where=text(LIVE_ROWS),
+        **kwargs
+    )
+
+
 class SoftDeleteMixin:
     """Mixin for soft delete functionality."""
     
@@ -129,6 +153,14 @@ class BaseModel(Base, TimestampMixin, SoftDeleteMixin, AuditMixin):
     
     __abstract__ = True
     
+    @declared_attr
+    def __mapper_args__(cls) -> Dict[str, Any]:
+        # Server defaults come back in the INSERT/UPDATE's RETURNING clause, so
+        # reading created_at or updated_at after a flush needs no extra SELECT.
+        # UPDATEs match on and bump the version, so a stale edit fails with
+        # StaleDataError instead of overwriting a concurrent one.
+        return {"eager_defaults": True, "version_id_col": cls.version}
+    
     def to_dict(self, exclude: Optional[set] = None) -> Dict[str, Any]:
         """Convert model to dictionary."""
         exclude = exclude or set()
@@ -167,19 +199,36 @@ class BaseModel(Base, TimestampMixin, SoftDeleteMixin, AuditMixin):
             cls.is_deleted == False
         ).count()
     
-    def save(self, db: Session) -> None:
-        """Save the current instance."""
+    def save(self, db: Session, flush: bool = False, refresh: bool = False) -> None:
+        """
+        Save the current instance.
+        
+        Inside a unit of work the instance is only added and is written with
+        the rest of the request's changes; pass ``flush=True`` when its id is
+        needed straight away. Outside one it is committed immediately.
+        ``refresh`` reloads values set by triggers; server defaults already
+        arrive with the flush.
+        """
         db.add(self)
-        db.commit()
-        db.refresh(self)
+        if in_unit_of_work(db):
+            if flush or refresh:
+                db.flush()
+        else:
+            db.commit()
+        if refresh:
+            db.refresh(self)
     
     def delete(self, db: Session, hard: bool = False, deleted_by: Optional[str] = None) -> None:
-        """Delete the record (soft delete by default)."""
+        """
+        Delete the record (soft delete by default).
+        
+        Committed with the unit of work if there is one.
+        """
         if hard:
             db.delete(self)
         else:
             self.soft_delete(deleted_by)
-        db.commit()
+        commit_unless_unit_of_work(db)
     
     def __repr__(self) -> str:
         """String representation."""
@@ -235,6 +284,31 @@ class SlugMixin:
         )
 
 
+# Mapped classes with an is_deleted column, filtered by default
+_soft_delete_classes: List[type] = []
+
+
+@event.listens_for(Mapper, 'after_mapper_constructed')
+def receive_after_mapper_constructed(mapper, cls):
+    """Register soft-deletable classes; subclasses are covered by their base."""
+    if 'is_deleted' in mapper.columns and mapper.inherits is None:
+        _soft_delete_classes.append(cls)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def receive_do_orm_execute(execute_state: ORMExecuteState):
+    """Hide soft-deleted rows from ORM SELECTs, relationship loads and eager loads."""
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        execute_state.statement = execute_state.statement.options(*(
+            with_loader_criteria(cls, lambda cls: cls.is_deleted.is_(False), include_aliases=True)
+            for cls in _soft_delete_classes
+        ))
+
+
 # Event listeners for automatic audit fields
 @event.listens_for(BaseModel, 'before_insert', propagate=True)
 def receive_before_insert(mapper, connection, target):
@@ -249,8 +323,6 @@ def receive_before_insert(mapper, connection, target):
 
 @event.listens_for(BaseModel, 'before_update', propagate=True)
 def receive_before_update(mapper, connection, target):
-    """Update audit fields before update."""
+    """Update audit fields before update; the mapper bumps the version."""
     if hasattr(target, 'updated_by') and target.updated_by is None:
         target.updated_by = 'system'
-    if hasattr(target, 'version'):
-        target.version += 1
@@ -5,21 +5,29 @@ from decimal import Decimal
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
-    JSON,
     Boolean,
     Column,
     DateTime,
     Enum,
+    FetchedValue,
     ForeignKey,
     Index,
     Integer,
     Numeric,
     String,
     Text,
+    and_,
+    case,
+    text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import deferred, relationship
+
+from core.db.tags import TagList
 
 # Import from local dependencies
+from .base import live_index
 from .dependencies import Base, utcnow
 from .user import SoftDeleteMixin, TimestampMixin
 
@@ -61,6 +69,17 @@ class CaseStatus(PyEnum):
     ARCHIVED = "archived"
 
 
+# Statuses that mean a case is no longer active
+CLOSED_STATUSES = (
+    CaseStatus.SETTLED,
+    CaseStatus.CLOSED_WON,
+    CaseStatus.CLOSED_LOST,
+    CaseStatus.CLOSED_DISMISSED,
+    CaseStatus.CLOSED_WITHDRAWN,
+    CaseStatus.ARCHIVED,
+)
+
+
 class CasePriority(PyEnum):
     """Enum for case priority levels."""
     LOW = "low"
@@ -138,16 +157,25 @@ class Case(Base, TimestampMixin, SoftDeleteMixin):
     
     # Time tracking
     estimated_hours = Column(Numeric(8, 2), nullable=True)
+    # Rollups of live time entries, kept in sync by services/case_rollups.py
     actual_hours = Column(Numeric(8, 2), default=0, nullable=False)
     billable_hours = Column(Numeric(8, 2), default=0, nullable=False)
     
     # Case metadata
-    tags = Column(JSON, nullable=True)  # Array of string tags
+    tags = Column(TagList, nullable=True)  # Array of string tags; JSONB on Postgres
     notes = Column(Text, nullable=True)
     internal_notes = Column(Text, nullable=True)  # Private notes for staff
     outcome_summary = Column(Text, nullable=True)
     lessons_learned = Column(Text, nullable=True)
     
+    # Full-text search document, generated by the database from the case
+    # number, title, opposing party and description (see services/search.py)
+    search_vector = deferred(Column(
+        TSVECTOR().with_variant(Text(), "sqlite"),
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue()
+    ))
+    
     # External references
     external_case_id = Column(String(100), nullable=True, index=True)
     matter_number = Column(String(100), nullable=True, index=True)  # Client's internal reference
@@ -158,6 +186,9 @@ class Case(Base, TimestampMixin, SoftDeleteMixin):
     share_slug = Column(String(200), nullable=True, unique=True, index=True)  # For secure sharing
     share_expires_at = Column(DateTime, nullable=True)
     
+    # Optimistic locking: every UPDATE matches on and bumps the version
+    version = Column(Integer, default=1, nullable=False)
+    
     # Multi-tenant isolation
     client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -179,20 +210,38 @@ class Case(Base, TimestampMixin, SoftDeleteMixin):
     # Document relationships - NEW (using the new Document model)
     prediction_documents = relationship("Document", back_populates="case", cascade="all, delete-orphan")
     
-    # Composite indexes for performance and multi-tenant isolation
+    # Composite indexes for performance and multi-tenant isolation; the
+    # tenant-scoped filters only ever read live rows
     __table_args__ = (
-        Index('idx_case_org_status', 'organization_id', 'status'),
-        Index('idx_case_org_client', 'organization_id', 'client_id'),
-        Index('idx_case_org_type', 'organization_id', 'case_type'),
-        Index('idx_case_org_priority', 'organization_id', 'priority'),
-        Index('idx_case_org_assigned', 'organization_id', 'assigned_to_id'),
-        Index('idx_case_org_stage', 'organization_id', 'stage'),
+        live_index('idx_case_org_status', 'organization_id', 'status'),
+        live_index('idx_case_org_client', 'organization_id', 'client_id'),
+        live_index('idx_case_org_type', 'organization_id', 'case_type'),
+        live_index('idx_case_org_priority', 'organization_id', 'priority'),
+        live_index('idx_case_org_assigned', 'organization_id', 'assigned_to_id'),
+        live_index('idx_case_org_stage', 'organization_id', 'stage'),
         Index('idx_case_number_org', 'case_number', 'organization_id'),
         Index('idx_case_deadline', 'deadline_date', 'organization_id'),
         Index('idx_case_court_date', 'next_court_date', 'organization_id'),
         Index('idx_case_opened_date', 'opened_date', 'organization_id'),
         Index('idx_case_share_slug', 'share_slug'),  # For public sharing
+        # Tenant-scoped full-text search; needs the btree_gin extension
+        Index(
+            'idx_case_search', 'organization_id', 'search_vector',
+            postgresql_using='gin',
+            postgresql_where=text('is_deleted = false')
+        ).ddl_if(dialect='postgresql'),
+        # Tag containment (@>) filters; jsonb_path_ops only supports @> and is smaller
+        Index(
+            'idx_case_tags', 'organization_id', 'tags',
+            postgresql_using='gin',
+            postgresql_ops={'tags': 'jsonb_path_ops'},
+            postgresql_where=text('is_deleted = false')
+        ).ddl_if(dialect='postgresql'),
     )
+    
+    # Concurrent edits fail with StaleDataError instead of overwriting each
+    # other; server-side updated_at comes back with the UPDATE
+    __mapper_args__ = {"version_id_col": version, "eager_defaults": True}
 
     def __repr__(self):
         return f"<Case(id={self.id}, number='{self.case_number}', title='{self.title[:50]}', status={self.status.value})>"
@@ -243,10 +292,8 @@ class Case(Base, TimestampMixin, SoftDeleteMixin):
         self.stage = new_stage
 
     def calculate_total_hours(self) -> Decimal:
-        """Calculate total hours from time entries."""
-        if self.time_entries:
-            return sum(entry.hours for entry in self.time_entries if entry.hours)
-        return Decimal('0.00')
+        """Total hours from the actual_hours rollup (see services/case_rollups.py)."""
+        return self.actual_hours or Decimal('0.00')
 
     def calculate_billable_amount(self) -> Decimal:
         """Calculate total billable amount."""
@@ -258,6 +305,35 @@ class Case(Base, TimestampMixin, SoftDeleteMixin):
             return self.actual_settlement * (self.contingency_percentage / 100)
         return Decimal('0.00')
 
+    @hybrid_property
+    def billable_amount(self) -> Decimal:
+        """Billable amount, computed from the hour rollups without loading time entries."""
+        return self.calculate_billable_amount()
+
+    @billable_amount.inplace.expression
+    @classmethod
+    def _billable_amount_expression(cls):
+        """SQL form of calculate_billable_amount for reports."""
+        return case(
+            (
+                and_(cls.billing_type == BillingType.HOURLY, cls.hourly_rate.isnot(None)),
+                cls.billable_hours * cls.hourly_rate
+            ),
+            (
+                and_(cls.billing_type == BillingType.FLAT_FEE, cls.flat_fee_amount.isnot(None)),
+                cls.flat_fee_amount
+            ),
+            (
+                and_(
+                    cls.billing_type == BillingType.CONTINGENCY,
+                    cls.contingency_percentage.isnot(None),
+                    cls.actual_settlement.isnot(None)
+                ),
+                cls.actual_settlement * cls.contingency_percentage / 100
+            ),
+            else_=Decimal('0.00')
+        )
+
     def is_overdue(self) -> bool:
         """Check if case has passed its deadline."""
         return self.deadline_date and datetime.utcnow() > self.deadline_date
@@ -422,3 +498,52 @@ class CaseTask(Base, TimestampMixin, SoftDeleteMixin):
         """Reopen a completed task."""
         self.completed = False
         self.completed_at = None
+
+
+class CalendarEntryKind(PyEnum):
+    """Enum for the source of a calendar entry."""
+    DEADLINE = "deadline"
+    STATUTE_OF_LIMITATIONS = "statute_of_limitations"
+    COURT_DATE = "court_date"
+    EVENT = "event"
+    TASK = "task"
+
+
+class CalendarEntry(Base):
+    """
+    Dated case items (deadlines, court dates, events and open tasks) in one table.
+    
+    A projection rebuilt per case by services/case_calendar.py whenever a case,
+    event or task changes; never written directly.
+    """
+    __tablename__ = "calendar_entries"
+
+    id = Column(Integer, primary_key=True)
+    entry_date = Column(DateTime, nullable=False)
+    kind = Column(Enum(CalendarEntryKind), nullable=False)
+    source_id = Column(Integer, nullable=False)  # Case, event or task id depending on kind
+    title = Column(String(255), nullable=False)
+    location = Column(String(255), nullable=True)
+    
+    # Denormalized case reference so listings need no join
+    case_id = Column(
+        Integer, ForeignKey("cases.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    case_number = Column(String(100), nullable=False)
+    case_title = Column(String(255), nullable=False)
+    
+    # Multi-tenant isolation
+    organization_id = Column(
+        Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False
+    )
+    
+    __table_args__ = (
+        # Serves an organization's date window with one range scan
+        Index('idx_calendar_org_date', 'organization_id', 'entry_date'),
+    )
+
+    def __repr__(self):
+        return (
+            f"<CalendarEntry(kind={self.kind}, source_id={self.source_id}, "
+            f"date={self.entry_date})>"
+        )
@@ -4,6 +4,8 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from core.db.replicas import ReadYourWritesMiddleware
+
 # ✅ Phase 3: Auth router import and inclusion - COMPLETED
 from models.auth_router import router as auth_router
 from models.core_db import engine
@@ -28,6 +30,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Clients that just wrote read from the primary until replicas catch up
+app.add_middleware(ReadYourWritesMiddleware)
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
@@ -3,16 +3,22 @@
 from datetime import date
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from core.db.session import get_db
+from core.db.counting import CountStrategy
+from core.db.session import get_db, get_read_db, get_uow_db
+from core.db.unit_of_work import UnitOfWorkRoute
+from core.db.versioning import conflict_exception, etag, parse_if_match
 from core.dependencies import get_current_active_user, get_current_organization_id
-from core.exceptions import NotFoundError, ValidationError
+from core.exceptions import ConflictError, NotFoundError, ValidationError
 from models.user import User
-from schemas.base.pagination import PaginatedResponse
+from schemas.base.pagination import CursorPaginatedResponse, CursorPaginationMeta, PaginatedResponse
 from schemas.base.responses import SuccessResponse
 from schemas.case.core import (
+    CalendarEntryResponse,
+    CaseBillingReport,
     CaseBulkAction,
     CaseBulkResult,
     CaseCreate,
@@ -22,18 +28,20 @@ from schemas.case.core import (
     CaseUpdate,
 )
 from services.case import CaseService
+from services.case_calendar import MEDIA_TYPES, CalendarExportFormat
 
 router = APIRouter(
     prefix="/cases",
     tags=["cases"],
-    dependencies=[Depends(get_current_active_user)]
+    dependencies=[Depends(get_current_active_user)],
+    route_class=UnitOfWorkRoute
 )
 
 
 @router.post("/", response_model=CaseResponse, status_code=201)
 def create_case(
     case_data: CaseCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -68,7 +76,11 @@ def list_cases(
     opened_before: Optional[date] = Query(None, description="Filter cases opened before date"),
     order_by: str = Query("created_at", description="Field to order by"),
     order_direction: str = Query("desc", regex="^(asc|desc)$", description="Order direction"),
-    db: Session = Depends(get_db),
+    count: CountStrategy = Query(
+        CountStrategy.EXACT,
+        description="How to compute the total: exact, cached or estimated"
+    ),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -88,22 +100,91 @@ def list_cases(
         opened_before=opened_before
     )
     
-    cases, total = CaseService.list_cases(
-        db=db,
-        organization_id=organization_id,
-        filters=filters,
-        skip=skip,
-        limit=limit,
-        order_by=order_by,
-        order_direction=order_direction
-    )
+    try:
+        cases, count_result = CaseService.list_cases(
+            db=db,
+            organization_id=organization_id,
+            filters=filters,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            order_direction=order_direction,
+            count_strategy=count
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    total = count_result.total
     return PaginatedResponse(
         items=[CaseResponse.from_orm(case) for case in cases],
         total=total,
         page=skip // limit + 1,
         per_page=limit,
-        pages=(total + limit - 1) // limit
+        pages=(total + limit - 1) // limit,
+        total_exact=count_result.exact
+    )
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPaginatedResponse[CaseResponse],
+    response_model_exclude_none=True
+)
+def list_cases_cursor(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
+    search: Optional[str] = Query(None, description="Search in case number, title, description"),
+    case_type: Optional[str] = Query(None, description="Filter by case type"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    priority: Optional[str] = Query(None, description="Filter by priority"),
+    billing_type: Optional[str] = Query(None, description="Filter by billing type"),
+    client_id: Optional[int] = Query(None, description="Filter by client"),
+    assigned_to_id: Optional[int] = Query(None, description="Filter by assigned user"),
+    tags: Optional[List[str]] = Query(None, description="Filter by tags"),
+    opened_after: Optional[date] = Query(None, description="Filter cases opened after date"),
+    opened_before: Optional[date] = Query(None, description="Filter cases opened before date"),
+    order_by: str = Query("created_at", description="Field to order by"),
+    order_direction: str = Query("desc", regex="^(asc|desc)$", description="Order direction"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    organization_id: int = Depends(get_current_organization_id)
+):
+    """List cases with keyset (cursor) pagination; deep pages cost the same as the first."""
+    
+    # Build filters
+    filters = CaseFilter(
+        search=search,
+        case_type=case_type,
+        status=status,
+        priority=priority,
+        billing_type=billing_type,
+        client_id=client_id,
+        assigned_to_id=assigned_to_id,
+        tags=tags,
+        opened_after=opened_after,
+        opened_before=opened_before
+    )
+    
+    try:
+        cases, next_cursor, has_next = CaseService.list_cases_cursor(
+            db=db,
+            organization_id=organization_id,
+            filters=filters,
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            order_direction=order_direction
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return CursorPaginatedResponse(
+        items=[CaseResponse.from_orm(case) for case in cases],
+        pagination=CursorPaginationMeta(
+            has_next=has_next,
+            next_cursor=next_cursor,
+            count=len(cases)
+        )
     )
 
 
@@ -111,7 +192,7 @@ def list_cases(
 def search_cases(
     q: str = Query(..., min_length=2, description="Search term"),
     limit: int = Query(10, ge=1, le=50, description="Number of results to return"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -129,7 +210,7 @@ def search_cases(
 
 @router.get("/stats", response_model=CaseStats, response_model_exclude_none=True)
 def get_case_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -138,10 +219,26 @@ def get_case_stats(
     return CaseService.get_case_stats(db=db, organization_id=organization_id)
 
 
-@router.get("/deadlines")
+@router.get("/billing-report", response_model=CaseBillingReport)
+def get_billing_report(
+    include_closed: bool = Query(True, description="Include closed cases"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    organization_id: int = Depends(get_current_organization_id)
+):
+    """Get firm-wide hours and billable amounts from per-case rollups."""
+    
+    return CaseService.get_billing_report(
+        db=db,
+        organization_id=organization_id,
+        include_closed=include_closed
+    )
+
+
+@router.get("/deadlines", response_model=List[CalendarEntryResponse])
 def get_upcoming_deadlines(
     days_ahead: int = Query(30, ge=1, le=365, description="Number of days to look ahead"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -156,32 +253,61 @@ def get_upcoming_deadlines(
     return deadlines
 
 
+@router.get("/deadlines/export")
+def export_deadlines(
+    format: CalendarExportFormat = Query(
+        CalendarExportFormat.ICS, description="iCalendar (ics) or NDJSON"
+    ),
+    days_ahead: int = Query(90, ge=1, le=365, description="Number of days to look ahead"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    organization_id: int = Depends(get_current_organization_id)
+):
+    """Stream upcoming deadlines for calendar sync."""
+    
+    chunks = CaseService.export_calendar(
+        db=db,
+        organization_id=organization_id,
+        days_ahead=days_ahead,
+        export_format=format
+    )
+    
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="deadlines.{format.value}"'}
+    )
+
+
 @router.get("/{case_id}", response_model=CaseResponse, response_model_exclude_none=True)
 def get_case(
     case_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
     """Get a specific case by ID."""
     
-    case = CaseService.get_case(db=db, case_id=case_id, organization_id=organization_id)
+    case = CaseService.get_case_response(db=db, case_id=case_id, organization_id=organization_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     
-    return CaseResponse.from_orm(case)
+    response.headers["ETag"] = etag(case.version)
+    return case
 
 
 @router.get("/number/{case_number}", response_model=CaseResponse, response_model_exclude_none=True)
 def get_case_by_number(
     case_number: str,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
     """Get a specific case by case number."""
     
-    case = CaseService.get_case_by_number(
+    case = CaseService.get_case_response_by_number(
         db=db, 
         case_number=case_number, 
         organization_id=organization_id
@@ -189,18 +315,27 @@ def get_case_by_number(
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     
-    return CaseResponse.from_orm(case)
+    response.headers["ETag"] = etag(case.version)
+    return case
 
 
 @router.put("/{case_id}", response_model=CaseResponse)
 def update_case(
     case_id: int,
     case_update: CaseUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag of the case version being edited"),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
-    """Update a specific case."""
+    """
+    Update a specific case.
+    
+    Send the ETag from a previous GET or PUT as If-Match to update only if
+    nobody changed the case since; a conflict returns 409 with the current
+    version.
+    """
     
     try:
         case = CaseService.update_case(
@@ -208,11 +343,15 @@ def update_case(
             case_id=case_id,
             case_update=case_update,
             organization_id=organization_id,
-            updated_by_id=current_user.id
+            updated_by_id=current_user.id,
+            expected_version=parse_if_match(if_match)
         )
+        response.headers["ETag"] = etag(case.version)
         return CaseResponse.from_orm(case)
     except NotFoundError:
         raise HTTPException(status_code=404, detail="Case not found")
+    except ConflictError as e:
+        raise conflict_exception(e)
     except ValidationError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -222,7 +361,7 @@ def update_case(
 @router.delete("/{case_id}", response_model=SuccessResponse)
 def delete_case(
     case_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -252,7 +391,7 @@ def close_case(
     case_id: int,
     closure_reason: str = Query(..., description="Reason for closing the case"),
     final_notes: Optional[str] = Query(None, description="Final notes for the case"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -280,7 +419,7 @@ def close_case(
 def reopen_case(
     case_id: int,
     reason: str = Query(..., description="Reason for reopening the case"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -306,7 +445,7 @@ def reopen_case(
 @router.post("/bulk", response_model=CaseBulkResult)
 def bulk_update_cases(
     bulk_action: CaseBulkAction,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -323,5 +462,7 @@ def bulk_update_cases(
             updated_by_id=current_user.id
         )
         return result
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to perform bulk operation")
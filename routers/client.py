@@ -2,14 +2,17 @@
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
-from core.db.session import get_db
+from core.db.counting import CountStrategy
+from core.db.session import get_db, get_read_db, get_uow_db
+from core.db.unit_of_work import UnitOfWorkRoute
+from core.db.versioning import conflict_exception, etag, parse_if_match
 from core.dependencies import get_current_active_user, get_current_organization_id
-from core.exceptions import NotFoundError, ValidationError
+from core.exceptions import ConflictError, NotFoundError, ValidationError
 from models.user import User
-from schemas.base.pagination import PaginatedResponse
+from schemas.base.pagination import CursorPaginatedResponse, CursorPaginationMeta, PaginatedResponse
 from schemas.base.responses import SuccessResponse
 from schemas.client.core import (
     ClientBulkAction,
@@ -25,14 +28,15 @@ from services.client import ClientService
 router = APIRouter(
     prefix="/clients",
     tags=["clients"],
-    dependencies=[Depends(get_current_active_user)]
+    dependencies=[Depends(get_current_active_user)],
+    route_class=UnitOfWorkRoute
 )
 
 
 @router.post("/", response_model=ClientResponse, status_code=201)
 def create_client(
     client_data: ClientCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -63,7 +67,11 @@ def list_clients(
     tags: Optional[List[str]] = Query(None, description="Filter by tags"),
     order_by: str = Query("created_at", description="Field to order by"),
     order_direction: str = Query("desc", regex="^(asc|desc)$", description="Order direction"),
-    db: Session = Depends(get_db),
+    count: CountStrategy = Query(
+        CountStrategy.EXACT,
+        description="How to compute the total: exact, cached or estimated"
+    ),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -79,22 +87,83 @@ def list_clients(
         tags=tags
     )
     
-    clients, total = ClientService.list_clients(
-        db=db,
-        organization_id=organization_id,
-        filters=filters,
-        skip=skip,
-        limit=limit,
-        order_by=order_by,
-        order_direction=order_direction
-    )
+    try:
+        clients, count_result = ClientService.list_clients(
+            db=db,
+            organization_id=organization_id,
+            filters=filters,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            order_direction=order_direction,
+            count_strategy=count
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    total = count_result.total
     return PaginatedResponse(
         items=[ClientResponse.from_orm(client) for client in clients],
         total=total,
         page=skip // limit + 1,
         per_page=limit,
-        pages=(total + limit - 1) // limit
+        pages=(total + limit - 1) // limit,
+        total_exact=count_result.exact
+    )
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPaginatedResponse[ClientResponse],
+    response_model_exclude_none=True
+)
+def list_clients_cursor(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
+    search: Optional[str] = Query(None, description="Search in client names, email, company"),
+    client_type: Optional[str] = Query(None, description="Filter by client type"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    priority: Optional[str] = Query(None, description="Filter by priority"),
+    assigned_to_id: Optional[int] = Query(None, description="Filter by assigned user"),
+    tags: Optional[List[str]] = Query(None, description="Filter by tags"),
+    order_by: str = Query("created_at", description="Field to order by"),
+    order_direction: str = Query("desc", regex="^(asc|desc)$", description="Order direction"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    organization_id: int = Depends(get_current_organization_id)
+):
+    """List clients with keyset (cursor) pagination; deep pages cost the same as the first."""
+    
+    # Build filters
+    filters = ClientFilter(
+        search=search,
+        client_type=client_type,
+        status=status,
+        priority=priority,
+        assigned_to_id=assigned_to_id,
+        tags=tags
+    )
+    
+    try:
+        clients, next_cursor, has_next = ClientService.list_clients_cursor(
+            db=db,
+            organization_id=organization_id,
+            filters=filters,
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            order_direction=order_direction
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return CursorPaginatedResponse(
+        items=[ClientResponse.from_orm(client) for client in clients],
+        pagination=CursorPaginationMeta(
+            has_next=has_next,
+            next_cursor=next_cursor,
+            count=len(clients)
+        )
     )
 
 
@@ -102,7 +171,7 @@ def list_clients(
 def search_clients(
     q: str = Query(..., min_length=2, description="Search term"),
     limit: int = Query(10, ge=1, le=50, description="Number of results to return"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -120,7 +189,7 @@ def search_clients(
 
 @router.get("/stats", response_model=ClientStats, response_model_exclude_none=True)
 def get_client_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -132,44 +201,60 @@ def get_client_stats(
 @router.get("/{client_id}", response_model=ClientResponse, response_model_exclude_none=True)
 def get_client(
     client_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
     """Get a specific client by ID."""
     
-    client = ClientService.get_client(db=db, client_id=client_id, organization_id=organization_id)
+    client = ClientService.get_client_response(
+        db=db, client_id=client_id, organization_id=organization_id
+    )
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    return ClientResponse.from_orm(client)
+    response.headers["ETag"] = etag(client.version)
+    return client
 
 
 @router.get("/slug/{slug}", response_model=ClientResponse, response_model_exclude_none=True)
 def get_client_by_slug(
     slug: str,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
     """Get a specific client by slug."""
     
-    client = ClientService.get_client_by_slug(db=db, slug=slug, organization_id=organization_id)
+    client = ClientService.get_client_response_by_slug(
+        db=db, slug=slug, organization_id=organization_id
+    )
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    return ClientResponse.from_orm(client)
+    response.headers["ETag"] = etag(client.version)
+    return client
 
 
 @router.put("/{client_id}", response_model=ClientResponse)
 def update_client(
     client_id: int,
     client_update: ClientUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag of the client version being edited"),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
-    """Update a specific client."""
+    """
+    Update a specific client.
+    
+    Send the ETag from a previous GET or PUT as If-Match to update only if
+    nobody changed the client since; a conflict returns 409 with the current
+    version.
+    """
     
     try:
         client = ClientService.update_client(
@@ -177,11 +262,15 @@ def update_client(
             client_id=client_id,
             client_update=client_update,
             organization_id=organization_id,
-            updated_by_id=current_user.id
+            updated_by_id=current_user.id,
+            expected_version=parse_if_match(if_match)
         )
+        response.headers["ETag"] = etag(client.version)
         return ClientResponse.from_orm(client)
     except NotFoundError:
         raise HTTPException(status_code=404, detail="Client not found")
+    except ConflictError as e:
+        raise conflict_exception(e)
     except ValidationError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -191,7 +280,7 @@ def update_client(
 @router.delete("/{client_id}", response_model=SuccessResponse)
 def delete_client(
     client_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -218,7 +307,7 @@ def delete_client(
 @router.post("/bulk", response_model=ClientBulkResult)
 def bulk_update_clients(
     bulk_action: ClientBulkAction,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow_db),
     current_user: User = Depends(get_current_active_user),
     organization_id: int = Depends(get_current_organization_id)
 ):
@@ -232,6 +321,8 @@ def bulk_update_clients(
             updated_by_id=current_user.id
         )
         return result
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to perform bulk operation")
 
@@ -58,6 +58,16 @@ def _get_uptime() -> str:
     return "unknown"
 
 
+def _get_database_metrics() -> dict:
+    """Get connection pool checkout waits and saturation, if a database is configured."""
+    try:
+        from core.db.pool import pool_stats
+    except Exception as e:
+        logger.debug(f"Database metrics unavailable: {e}")
+        return {}
+    return pool_stats()
+
+
 @router.get(
     "/__health__",
     response_model=HealthResponse,
@@ -148,6 +158,8 @@ async def get_metrics() -> JSONResponse:
                 "status": "healthy",
                 # Add more system metrics as needed
             },
+            # Connection pool checkout waits and saturation per engine
+            "database": _get_database_metrics(),
             "custom": {
                 # Add custom application metrics here
                 "requests_total": 0,  # This would be tracked by actual metrics
@@ -307,3 +307,4 @@ class PaginatedResponse(BaseModel, Generic[T]):
     pages: int
     has_next: bool
     has_prev: bool
+    total_exact: bool = True
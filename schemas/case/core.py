@@ -82,6 +82,15 @@ class BillingType(str, Enum):
     PRO_BONO = "pro_bono"
 
 
+class CalendarEntryKind(str, Enum):
+    """Calendar entry source enumeration."""
+    DEADLINE = "deadline"
+    STATUTE_OF_LIMITATIONS = "statute_of_limitations"
+    COURT_DATE = "court_date"
+    EVENT = "event"
+    TASK = "task"
+
+
 class CaseBase(BaseModel):
     """Base case schema with common fields."""
     title: str = Field(..., min_length=1, max_length=255, description="Case title")
@@ -200,6 +209,7 @@ class CaseResponse(CaseBase):
     closed_date: Optional[datetime]
     created_at: datetime
     updated_at: datetime
+    version: int = Field(1, description="Row version; send it back as If-Match when updating")
     
     # Financial computed fields
     actual_hours: Decimal = Field(default=Decimal('0.00'))
@@ -256,6 +266,33 @@ class CaseResponse(CaseBase):
         }
 
 
+class CalendarEntryResponse(BaseModel):
+    """Dated item on the upcoming deadlines calendar."""
+    kind: CalendarEntryKind
+    source_id: int
+    entry_date: datetime
+    title: str
+    location: Optional[str] = None
+    case_id: int
+    case_number: str
+    case_title: str
+    
+    class Config:
+        from_attributes = True
+        schema_extra = {
+            "example": {
+                "kind": "court_date",
+                "source_id": 1,
+                "entry_date": "2025-09-15T09:30:00Z",
+                "title": "Court date",
+                "location": None,
+                "case_id": 1,
+                "case_number": "CASE-2025-000001",
+                "case_title": "Contract Dispute - Smith vs. ABC Corp"
+            }
+        }
+
+
 class CaseSummary(BaseModel):
     """Simplified case schema for lists and references."""
     id: int
@@ -376,6 +413,49 @@ class CaseStats(BaseModel):
         }
 
 
+class CaseBillingTotals(BaseModel):
+    """Hour and amount totals for a group of cases."""
+    case_count: int = 0
+    actual_hours: Decimal = Field(default=Decimal('0.00'))
+    billable_hours: Decimal = Field(default=Decimal('0.00'))
+    billable_amount: Decimal = Field(default=Decimal('0.00'))
+
+
+class CaseBillingReport(BaseModel):
+    """Firm-wide billing report built from per-case hour rollups."""
+    totals: CaseBillingTotals = Field(default_factory=CaseBillingTotals)
+    by_billing_type: Dict[str, CaseBillingTotals] = Field(default_factory=dict)
+    by_assigned_to: Dict[str, CaseBillingTotals] = Field(default_factory=dict)
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "totals": {
+                    "case_count": 42,
+                    "actual_hours": 1310.50,
+                    "billable_hours": 1184.25,
+                    "billable_amount": 414487.50
+                },
+                "by_billing_type": {
+                    "hourly": {
+                        "case_count": 30,
+                        "actual_hours": 1100.00,
+                        "billable_hours": 1000.00,
+                        "billable_amount": 350000.00
+                    }
+                },
+                "by_assigned_to": {
+                    "7": {
+                        "case_count": 12,
+                        "actual_hours": 400.00,
+                        "billable_hours": 380.00,
+                        "billable_amount": 133000.00
+                    }
+                }
+            }
+        }
+
+
 class CaseCloseRequest(BaseModel):
     """Schema for closing a case."""
     status: CaseStatus = Field(..., description="Closing status")
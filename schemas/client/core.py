@@ -170,6 +170,7 @@ class ClientResponse(ClientBase):
     assigned_to_id: Optional[int]
     created_at: datetime
     updated_at: datetime
+    version: int = Field(1, description="Row version; send it back as If-Match when updating")
     
     # Address information
     address: Optional[AddressBase] = None
@@ -1,5 +1,17 @@
 """Services package."""
 
-from .user_service import UserService
+from importlib import import_module
+
+# Submodules are imported on first attribute access so that importing one
+# service does not pull in the models every other service depends on
+_EXPORTS = {
+    "UserService": ".user_service",
+}
 
 __all__ = ["UserService"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
@@ -1,2 +1,586 @@
+"""
+Case service implementation.
+Handles case queries for the case router.
+"""
 
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Query, Session, joinedload, load_only, selectinload
+
+from core.db.aggregates import STATS_CACHE_TTL_SECONDS, grouped_counts
+from core.db.bulk import bulk_parameter, bulk_update, optional_int, string_list
+from core.db.counting import CountResult, CountStrategy, count_total, track_count_invalidation
+from core.db.entity_cache import EntityCache
+from core.db.invalidation import OrganizationCache, on_committed_rows
+from core.db.pagination import keyset_paginate
+from core.db.replicas import pin_to_primary
+from core.db.tags import bulk_update_tags, tags_condition
+from core.db.tenancy import TenantRepository
+from core.db.unit_of_work import commit_unless_unit_of_work
+from core.db.versioning import apply_update, check_version, flush_versioned
+from core.exceptions import NotFoundError, ValidationError
+from models.case import (
+    CLOSED_STATUSES,
+    BillingType,
+    CalendarEntry,
+    Case,
+    CaseDocument,
+    CaseEvent,
+    CasePriority,
+    CaseStage,
+    CaseStatus,
+    CaseTask,
+    CaseType,
+    TimeEntry,
+)
+from schemas.case.core import (
+    CaseBillingReport,
+    CaseBillingTotals,
+    CaseBulkAction,
+    CaseBulkResult,
+    CaseFilter,
+    CaseResponse,
+    CaseStats,
+    CaseUpdate,
+)
+from services import case_calendar, case_rollups, search  # noqa: F401  (projection listeners)
+from services.case_calendar import EXPORTERS, CalendarExportFormat, rebuild_calendar_entries
+from services.typeahead import TYPEAHEAD_ENABLED, TypeaheadIndex, load_in_order
+
+# Writes to cases drop their organization's cached list counts
+track_count_invalidation(Case, "cases")
+
+
+def _typeahead_rows(db: Session, organization_id: int, ids: Optional[Iterable[int]] = None):
+    # The index is kept until the next write, so build it from the primary
+    pin_to_primary(db)
+    query = db.query(Case.id, Case.case_number, Case.title).filter(
+        Case.organization_id == organization_id,
+        Case.is_deleted.is_(False)
+    )
+    return query if ids is None else query.filter(Case.id.in_(ids))
+
+
+# Optional in-memory prefix index over case numbers and titles
+case_typeahead = TypeaheadIndex("case", _typeahead_rows)
+on_committed_rows(Case, case_typeahead.rows_changed)
+
+# Per-organization CaseStats, dropped when the organization's cases change
+_case_stats_cache = OrganizationCache(Case, ttl=STATS_CACHE_TTL_SECONDS)
+
+# Rendered CaseResponse JSON by id and number; the response embeds the
+# client summary and collection counts, so their writes drop it too.
+# services.client registers the Client invalidation, keeping this module
+# importable without the client model.
+case_detail_cache = EntityCache("case", Case, CaseDocument, CaseEvent, CaseTask, TimeEntry)
+
+
+class CaseService:
+    """Service class for case operations."""
+    
+    # Columns list endpoints may order by
+    ORDER_COLUMNS = (
+        "created_at", "updated_at", "opened_date", "closed_date", "deadline_date",
+        "next_court_date", "title", "case_number", "status", "priority", "id"
+    )
+    
+    # Non-nullable columns that can key a cursor page
+    CURSOR_ORDER_COLUMNS = ("created_at", "updated_at", "opened_date", "title", "case_number", "id")
+    
+    # Fields covered by the search_vector column, searched with ILIKE off Postgres
+    SEARCH_COLUMNS = (Case.case_number, Case.title, Case.opposing_party, Case.description)
+    
+    # Loader options per response shape. CaseResponse reads every column and
+    # embeds a ClientSummary, so each profile joins the client in the same
+    # statement; detail also batch-loads the collections the case page shows.
+    LOAD_PROFILES = {
+        "list": (joinedload(Case.client),),
+        "detail": (
+            joinedload(Case.client),
+            joinedload(Case.assigned_to),
+            joinedload(Case.supervising_attorney),
+            joinedload(Case.created_by),
+            selectinload(Case.documents),
+            selectinload(Case.time_entries),
+            selectinload(Case.events),
+            selectinload(Case.tasks),
+        ),
+        "export": (
+            load_only(
+                Case.case_number, Case.title, Case.case_type, Case.status, Case.priority,
+                Case.stage, Case.billing_type, Case.practice_area, Case.client_id,
+                Case.organization_id, Case.assigned_to_id, Case.opened_date, Case.closed_date,
+                Case.deadline_date, Case.next_court_date, Case.actual_hours, Case.billable_hours,
+                Case.tags, Case.created_at, Case.updated_at
+            ),
+            joinedload(Case.client),
+        ),
+    }
+    
+    @staticmethod
+    def load_options(profile: str = "list") -> tuple:
+        """
+        Get the loader options for a loading profile.
+        
+        Raises:
+            ValidationError: If the profile is unknown
+        """
+        try:
+            return CaseService.LOAD_PROFILES[profile]
+        except KeyError:
+            raise ValidationError(
+                f"Unknown loading profile '{profile}'",
+                {"allowed": sorted(CaseService.LOAD_PROFILES)}
+            )
+    
+    @staticmethod
+    def _filtered_query(
+        db: Session,
+        organization_id: int,
+        filters: Optional[CaseFilter] = None
+    ) -> Query:
+        """Build the tenant-scoped, filtered case query shared by list modes."""
+        query = TenantRepository(db, Case, organization_id).query()
+        
+        if not filters:
+            return query
+        
+        if filters.search:
+            condition, _ = search.match_condition(
+                db, Case, filters.search, CaseService.SEARCH_COLUMNS
+            )
+            if condition is not None:
+                query = query.filter(condition)
+        if filters.case_type:
+            query = query.filter(Case.case_type == CaseType(filters.case_type.value))
+        if filters.status:
+            query = query.filter(Case.status == CaseStatus(filters.status.value))
+        if filters.priority:
+            query = query.filter(Case.priority == CasePriority(filters.priority.value))
+        if filters.stage:
+            query = query.filter(Case.stage == CaseStage(filters.stage.value))
+        if filters.billing_type:
+            query = query.filter(Case.billing_type == BillingType(filters.billing_type.value))
+        if filters.client_id:
+            query = query.filter(Case.client_id == filters.client_id)
+        if filters.assigned_to_id:
+            query = query.filter(Case.assigned_to_id == filters.assigned_to_id)
+        if filters.supervising_attorney_id:
+            query = query.filter(Case.supervising_attorney_id == filters.supervising_attorney_id)
+        if filters.practice_area:
+            query = query.filter(Case.practice_area == filters.practice_area)
+        if filters.tags:
+            query = query.filter(tags_condition(db, Case.tags, filters.tags))
+        if filters.opened_after:
+            query = query.filter(Case.opened_date >= filters.opened_after)
+        if filters.opened_before:
+            query = query.filter(Case.opened_date <= filters.opened_before)
+        if filters.deadline_after:
+            query = query.filter(Case.deadline_date >= filters.deadline_after)
+        if filters.deadline_before:
+            query = query.filter(Case.deadline_date <= filters.deadline_before)
+        if filters.overdue_only:
+            query = query.filter(
+                Case.deadline_date < datetime.utcnow(),
+                Case.status.notin_(CLOSED_STATUSES)
+            )
+        
+        return query
+    
+    @staticmethod
+    def list_cases(
+        db: Session,
+        organization_id: int,
+        filters: Optional[CaseFilter] = None,
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str = "created_at",
+        order_direction: str = "desc",
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        profile: str = "list"
+    ) -> Tuple[List[Case], CountResult]:
+        """
+        List cases with offset pagination.
+        
+        Returns:
+            Tuple of (cases, CountResult with the total and whether it is exact)
+        """
+        if order_by not in CaseService.ORDER_COLUMNS:
+            raise ValidationError(f"Cannot order cases by '{order_by}'")
+        
+        query = CaseService._filtered_query(db, organization_id, filters)
+        total = count_total(
+            db,
+            query,
+            strategy=count_strategy,
+            namespace="cases",
+            organization_id=organization_id,
+            filters=filters,
+            filtered=bool(filters and filters.dict(exclude_defaults=True))
+        )
+        
+        column = getattr(Case, order_by)
+        ordering = column.desc() if order_direction == "desc" else column.asc()
+        query = query.options(*CaseService.load_options(profile))
+        cases = query.order_by(ordering, Case.id.desc()).offset(skip).limit(limit).all()
+        
+        return cases, total
+    
+    @staticmethod
+    def list_cases_cursor(
+        db: Session,
+        organization_id: int,
+        filters: Optional[CaseFilter] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        order_by: str = "created_at",
+        order_direction: str = "desc",
+        profile: str = "list"
+    ) -> Tuple[List[Case], Optional[str], bool]:
+        """
+        List cases with keyset pagination.
+        
+        Returns:
+            Tuple of (cases, next_cursor, has_next)
+        
+        Raises:
+            ValidationError: If the ordering is not cursor-safe or the cursor is invalid
+        """
+        query = CaseService._filtered_query(db, organization_id, filters)
+        query = query.options(*CaseService.load_options(profile))
+        return keyset_paginate(
+            query,
+            Case,
+            order_by=order_by,
+            order_direction=order_direction,
+            limit=limit,
+            cursor=cursor,
+            allowed_columns=CaseService.CURSOR_ORDER_COLUMNS
+        )
+    
+    @staticmethod
+    def search_cases(
+        db: Session,
+        organization_id: int,
+        search_term: str,
+        limit: int = 10,
+        profile: str = "list"
+    ) -> List[Case]:
+        """Ranked prefix search over case number, title, opposing party and description."""
+        if TYPEAHEAD_ENABLED:
+            ids = case_typeahead.search(db, organization_id, search_term, limit)
+            return load_in_order(db, Case, organization_id, ids, CaseService.load_options(profile))
+        
+        return search.search(
+            db,
+            Case,
+            organization_id=organization_id,
+            term=search_term,
+            fallback_columns=CaseService.SEARCH_COLUMNS,
+            limit=limit,
+            options=CaseService.load_options(profile)
+        )
+    
+    @staticmethod
+    def get_case_stats(db: Session, organization_id: int) -> CaseStats:
+        """
+        Get case counts and breakdowns for an organization.
+        
+        Aggregated in SQL and cached per organization until its cases change.
+        """
+        stats = _case_stats_cache.get(organization_id)
+        if stats is not None:
+            return stats
+        # Cached until the next write, so computed from the primary, never a lagging replica
+        pin_to_primary(db)
+        
+        now = datetime.utcnow()
+        is_open = Case.status.notin_(CLOSED_STATUSES)
+        breakdowns, totals = grouped_counts(
+            db,
+            criteria=(Case.organization_id == organization_id, Case.is_deleted.is_(False)),
+            dimensions={
+                "by_type": Case.case_type,
+                "by_status": Case.status,
+                "by_priority": Case.priority,
+                "by_stage": Case.stage,
+            },
+            totals={
+                "total_cases": func.count(),
+                "open_cases": func.count().filter(is_open),
+                "overdue_cases": func.count().filter(and_(is_open, Case.deadline_date < now)),
+                "recent_cases": func.count().filter(Case.created_at >= now - timedelta(days=30)),
+                "total_billable_amount": func.sum(Case.billable_amount),
+                "average_case_value": func.avg(Case.estimated_value),
+            }
+        )
+        
+        total_cases = totals["total_cases"] or 0
+        open_cases = totals["open_cases"] or 0
+        cents = Decimal("0.01")
+        stats = CaseStats(
+            total_cases=total_cases,
+            open_cases=open_cases,
+            closed_cases=total_cases - open_cases,
+            overdue_cases=totals["overdue_cases"] or 0,
+            recent_cases=totals["recent_cases"] or 0,
+            total_billable_amount=Decimal(totals["total_billable_amount"] or 0).quantize(cents),
+            average_case_value=Decimal(totals["average_case_value"] or 0).quantize(cents),
+            **breakdowns
+        )
+        _case_stats_cache.set(organization_id, stats)
+        return stats
+    
+    @staticmethod
+    def get_billing_report(
+        db: Session,
+        organization_id: int,
+        include_closed: bool = True
+    ) -> CaseBillingReport:
+        """
+        Firm-wide hours and billable amounts.
+        
+        Reads the per-case rollup columns, so the cost depends on the number
+        of cases rather than the number of time entries.
+        """
+        criteria = [Case.organization_id == organization_id, Case.is_deleted.is_(False)]
+        if not include_closed:
+            criteria.append(Case.status.notin_(CLOSED_STATUSES))
+        
+        measures = (
+            func.count(),
+            func.sum(Case.actual_hours),
+            func.sum(Case.billable_hours),
+            func.sum(Case.billable_amount),
+        )
+        
+        def to_totals(count, actual_hours, billable_hours, billable_amount) -> CaseBillingTotals:
+            cents = Decimal("0.01")
+            return CaseBillingTotals(
+                case_count=count,
+                actual_hours=Decimal(actual_hours or 0).quantize(cents),
+                billable_hours=Decimal(billable_hours or 0).quantize(cents),
+                billable_amount=Decimal(billable_amount or 0).quantize(cents)
+            )
+        
+        report = CaseBillingReport(totals=to_totals(*db.query(*measures).filter(*criteria).one()))
+        
+        by_billing_type = (
+            db.query(Case.billing_type, *measures)
+            .filter(*criteria)
+            .group_by(Case.billing_type)
+        )
+        for billing_type, *row in by_billing_type:
+            report.by_billing_type[billing_type.value] = to_totals(*row)
+        
+        by_assigned_to = (
+            db.query(Case.assigned_to_id, *measures)
+            .filter(*criteria)
+            .group_by(Case.assigned_to_id)
+        )
+        for assigned_to_id, *row in by_assigned_to:
+            key = str(assigned_to_id) if assigned_to_id is not None else "unassigned"
+            report.by_assigned_to[key] = to_totals(*row)
+        
+        return report
+    
+    @staticmethod
+    def _calendar_window(db: Session, organization_id: int, days_ahead: int) -> Query:
+        now = datetime.utcnow()
+        return (
+            db.query(CalendarEntry)
+            .filter(
+                CalendarEntry.organization_id == organization_id,
+                CalendarEntry.entry_date >= now,
+                CalendarEntry.entry_date < now + timedelta(days=days_ahead)
+            )
+            .order_by(CalendarEntry.entry_date, CalendarEntry.id)
+        )
+    
+    @staticmethod
+    def get_upcoming_deadlines(
+        db: Session,
+        organization_id: int,
+        days_ahead: int = 30
+    ) -> List[CalendarEntry]:
+        """
+        Deadlines, court dates, events and open tasks of open cases in a window.
+        
+        Reads the calendar_entries projection, so the whole window is one
+        range scan on (organization_id, entry_date).
+        """
+        return CaseService._calendar_window(db, organization_id, days_ahead).all()
+    
+    @staticmethod
+    def export_calendar(
+        db: Session,
+        organization_id: int,
+        days_ahead: int,
+        export_format: CalendarExportFormat
+    ) -> Iterator[str]:
+        """Encode the upcoming window as iCalendar or NDJSON chunks."""
+        # Rows are read before streaming starts: the request's session is
+        # closed once the endpoint returns
+        entries = CaseService.get_upcoming_deadlines(db, organization_id, days_ahead)
+        return EXPORTERS[export_format](entries)
+    
+    @staticmethod
+    def get_case(
+        db: Session,
+        case_id: int,
+        organization_id: int,
+        profile: str = "detail"
+    ) -> Optional[Case]:
+        """Get a live case by ID within an organization."""
+        return TenantRepository(db, Case, organization_id).get(
+            case_id, *CaseService.load_options(profile)
+        )
+    
+    @staticmethod
+    def get_case_by_number(
+        db: Session,
+        case_number: str,
+        organization_id: int,
+        profile: str = "detail"
+    ) -> Optional[Case]:
+        """Get a live case by case number within an organization."""
+        return TenantRepository(db, Case, organization_id).get_by(
+            "case_number", case_number, *CaseService.load_options(profile)
+        )
+    
+    @staticmethod
+    def _cached_response(
+        db: Session,
+        organization_id: int,
+        key: str,
+        load
+    ) -> Optional[CaseResponse]:
+        """Serve a case detail response from the entity cache, rendering it on a miss."""
+        def render() -> Optional[str]:
+            case = load()
+            return CaseResponse.from_orm(case).model_dump_json() if case else None
+        
+        cached = case_detail_cache.get_or_load(db, organization_id, key, render)
+        return CaseResponse.model_validate_json(cached) if cached else None
+    
+    @staticmethod
+    def get_case_response(
+        db: Session,
+        case_id: int,
+        organization_id: int
+    ) -> Optional[CaseResponse]:
+        """Detail response for a case by ID, cached when the entity cache is enabled."""
+        return CaseService._cached_response(
+            db, organization_id, f"id:{case_id}",
+            lambda: CaseService.get_case(db, case_id, organization_id)
+        )
+    
+    @staticmethod
+    def get_case_response_by_number(
+        db: Session,
+        case_number: str,
+        organization_id: int
+    ) -> Optional[CaseResponse]:
+        """Detail response for a case by case number, cached when the entity cache is enabled."""
+        return CaseService._cached_response(
+            db, organization_id, f"number:{case_number}",
+            lambda: CaseService.get_case_by_number(db, case_number, organization_id)
+        )
+    
+    @staticmethod
+    def update_case(
+        db: Session,
+        case_id: int,
+        case_update: CaseUpdate,
+        organization_id: int,
+        updated_by_id: Optional[int] = None,
+        expected_version: Optional[int] = None
+    ) -> Case:
+        """
+        Update a case, optionally only while it is still at ``expected_version``.
+        
+        The UPDATE also matches on the version the case was read at, so an
+        edit racing another one fails instead of silently overwriting it.
+        
+        Raises:
+            NotFoundError: If the case does not exist in the organization
+            ConflictError: If the case changed since the expected version
+        """
+        case = TenantRepository(db, Case, organization_id).get(case_id)
+        if case is None:
+            raise NotFoundError("Case not found")
+        check_version(case, expected_version)
+        
+        apply_update(case, case_update.dict(exclude_unset=True))
+        if case.status in CLOSED_STATUSES and case.closed_date is None:
+            case.closed_date = datetime.utcnow()
+        
+        flush_versioned(db, case)
+        commit_unless_unit_of_work(db)
+        return case
+    
+    @staticmethod
+    def _bulk_values(action: str, parameters: dict) -> dict:
+        """Column values for a bulk action that sets the same value on every case."""
+        if action == "update_status":
+            status = bulk_parameter(parameters, "status", CaseStatus)
+            values = {Case.status: status}
+            if status in CLOSED_STATUSES:
+                values[Case.closed_date] = func.coalesce(Case.closed_date, datetime.utcnow())
+            return values
+        if action == "update_priority":
+            return {Case.priority: bulk_parameter(parameters, "priority", CasePriority)}
+        if action == "assign_to":
+            return {Case.assigned_to_id: bulk_parameter(parameters, "assigned_to_id", optional_int)}
+        raise ValidationError(f"Unknown bulk action '{action}'")
+    
+    @staticmethod
+    def bulk_update_cases(
+        db: Session,
+        bulk_action: CaseBulkAction,
+        organization_id: int,
+        updated_by_id: Optional[int] = None
+    ) -> CaseBulkResult:
+        """
+        Apply one action to many cases in a single transaction.
+        
+        Each chunk of ids is one UPDATE scoped to the organization, so the
+        cost is a few statements however many cases are selected. Ids that
+        are missing, deleted or belong to another organization are reported
+        as errors.
+        """
+        action = bulk_action.action
+        parameters = bulk_action.parameters or {}
+        case_ids = list(dict.fromkeys(bulk_action.case_ids))
+        live = (Case.is_deleted.is_(False),)
+        
+        try:
+            if action in ("add_tags", "remove_tags"):
+                tags = bulk_parameter(parameters, "tags", string_list)
+                updated = bulk_update_tags(
+                    db, Case, case_ids, organization_id, tags,
+                    remove=action == "remove_tags",
+                    criteria=live
+                )
+            else:
+                values = CaseService._bulk_values(action, parameters)
+                updated = bulk_update(db, Case, case_ids, organization_id, values, live)
+                if action == "update_status" and updated:
+                    # Closed cases leave the deadline calendar
+                    rebuild_calendar_entries(db, organization_id=organization_id, case_ids=updated)
+            commit_unless_unit_of_work(db)
+        except Exception:
+            db.rollback()
+            raise
+        
+        updated_set = set(updated)
+        missing = [case_id for case_id in case_ids if case_id not in updated_set]
+        return CaseBulkResult(
+            success_count=len(updated),
+            error_count=len(missing),
+            updated_cases=updated,
+            errors=[{"case_id": case_id, "error": "Case not found"} for case_id in missing]
+        )
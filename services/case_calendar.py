@@ -0,0 +1,270 @@
+"""
+Calendar projection of case deadlines, court dates, events and tasks.
+``calendar_entries`` holds one row per dated item of every open case, keyed
+by (organization_id, entry_date), so an upcoming-deadlines window is a
+single index range scan. Rows are rebuilt per case inside the flush that
+changed the case, one of its events or one of its tasks, and the window can
+be exported as iCalendar or NDJSON for calendar sync.
+"""
+
+import json
+from datetime import datetime
+from enum import Enum
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import (
+    String,
+    and_,
+    cast,
+    delete,
+    event,
+    insert,
+    literal,
+    null,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.orm import Session, attributes
+
+from models.case import CLOSED_STATUSES, CalendarEntry, CalendarEntryKind, Case, CaseEvent, CaseTask
+
+# Case columns that feed calendar rows; other case edits leave them alone
+_CASE_FIELDS = (
+    "deadline_date",
+    "statute_of_limitations",
+    "next_court_date",
+    "status",
+    "is_deleted",
+    "title",
+    "case_number",
+    "organization_id",
+)
+
+# (kind, case column, entry title) for dates stored on the case itself
+_CASE_DATES = (
+    (CalendarEntryKind.DEADLINE, "deadline_date", "Deadline"),
+    (CalendarEntryKind.STATUTE_OF_LIMITATIONS, "statute_of_limitations", "Statute of limitations"),
+    (CalendarEntryKind.COURT_DATE, "next_court_date", "Court date"),
+)
+
+_COLUMNS = (
+    "organization_id",
+    "entry_date",
+    "kind",
+    "source_id",
+    "title",
+    "location",
+    "case_id",
+    "case_number",
+    "case_title",
+)
+
+
+class CalendarExportFormat(str, Enum):
+    """Formats the deadline calendar can be exported in."""
+    ICS = "ics"
+    NDJSON = "ndjson"
+
+
+MEDIA_TYPES = {
+    CalendarExportFormat.ICS: "text/calendar; charset=utf-8",
+    CalendarExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def _projection(*criteria):
+    """SELECT producing the calendar rows of the open cases matching ``criteria``."""
+    open_case = and_(Case.is_deleted.is_(False), Case.status.notin_(CLOSED_STATUSES), *criteria)
+    case_columns = (Case.id, Case.case_number, Case.title)
+    
+    def kind(value: CalendarEntryKind):
+        return literal(value, CalendarEntry.kind.type)
+    
+    selects = [
+        select(
+            Case.organization_id,
+            getattr(Case, column),
+            kind(entry_kind),
+            Case.id,
+            literal(title, String(255)),
+            cast(null(), String(255)),
+            *case_columns
+        ).where(open_case, getattr(Case, column).isnot(None))
+        for entry_kind, column, title in _CASE_DATES
+    ]
+    selects.append(
+        select(
+            CaseEvent.organization_id,
+            CaseEvent.event_date,
+            kind(CalendarEntryKind.EVENT),
+            CaseEvent.id,
+            CaseEvent.title,
+            CaseEvent.location,
+            *case_columns
+        )
+        .join(Case, CaseEvent.case_id == Case.id)
+        .where(open_case, CaseEvent.is_deleted.is_(False))
+    )
+    selects.append(
+        select(
+            CaseTask.organization_id,
+            CaseTask.due_date,
+            kind(CalendarEntryKind.TASK),
+            CaseTask.id,
+            CaseTask.title,
+            cast(null(), String(255)),
+            *case_columns
+        )
+        .join(Case, CaseTask.case_id == Case.id)
+        .where(
+            open_case,
+            CaseTask.is_deleted.is_(False),
+            CaseTask.completed.is_(False),
+            CaseTask.due_date.isnot(None)
+        )
+    )
+    return union_all(*selects)
+
+
+def _rebuild(connection, case_criteria, entry_criteria) -> int:
+    """Replace the calendar rows selected by the criteria; returns rows written."""
+    table = CalendarEntry.__table__
+    connection.execute(delete(table).where(entry_criteria))
+    result = connection.execute(insert(table).from_select(_COLUMNS, _projection(case_criteria)))
+    return result.rowcount
+
+
+def _previous(obj, key: str):
+    """Value of an attribute as last flushed, before pending changes."""
+    history = attributes.get_history(obj, key)
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _touched_case_ids(session: Session) -> set:
+    """Ids of cases whose calendar rows this flush may have changed."""
+    case_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Case):
+            if obj in session.dirty and not any(
+                attributes.get_history(obj, field).has_changes() for field in _CASE_FIELDS
+            ):
+                continue
+            case_ids.add(obj.id)
+        elif isinstance(obj, (CaseEvent, CaseTask)):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            # A moved event or task leaves its old case as well
+            case_ids.update((obj.case_id, _previous(obj, "case_id")))
+    case_ids.discard(None)
+    return case_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_calendar(session: Session, flush_context):
+    """Rebuild calendar rows of changed cases in the flush's transaction."""
+    case_ids = _touched_case_ids(session)
+    if case_ids:
+        _rebuild(
+            session.connection(),
+            Case.id.in_(case_ids),
+            CalendarEntry.__table__.c.case_id.in_(case_ids)
+        )
+
+
+def rebuild_calendar_entries(
+    db: Session,
+    organization_id: Optional[int] = None,
+    case_ids: Optional[Iterable[int]] = None
+) -> int:
+    """
+    Rebuild calendar rows from cases, events and tasks, e.g. after bulk SQL.
+    
+    Returns:
+        Number of calendar rows written
+    """
+    table = CalendarEntry.__table__
+    case_criteria, entry_criteria = [], []
+    if organization_id is not None:
+        case_criteria.append(Case.organization_id == organization_id)
+        entry_criteria.append(table.c.organization_id == organization_id)
+    if case_ids is not None:
+        case_ids = list(case_ids)
+        case_criteria.append(Case.id.in_(case_ids))
+        entry_criteria.append(table.c.case_id.in_(case_ids))
+    return _rebuild(db.connection(), and_(true(), *case_criteria), and_(true(), *entry_criteria))
+
+
+def _ical_text(value: str) -> str:
+    """Escape a TEXT property value (RFC 5545 section 3.3.11)."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _ical_line(line: str) -> str:
+    """Fold a content line at 75 octets and terminate it with CRLF."""
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        # Continuation lines start with a space, which counts toward the limit
+        if size + width > 75:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def _ical_datetime(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def iter_ical(entries: Iterable[CalendarEntry], domain: str = "goldleaves") -> Iterator[str]:
+    """Yield an iCalendar document for the entries, one content line at a time."""
+    stamp = _ical_datetime(datetime.utcnow())
+    yield _ical_line("BEGIN:VCALENDAR")
+    yield _ical_line("VERSION:2.0")
+    yield _ical_line("PRODID:-//Goldleaves//Case Calendar//EN")
+    yield _ical_line("CALSCALE:GREGORIAN")
+    for entry in entries:
+        yield _ical_line("BEGIN:VEVENT")
+        yield _ical_line(f"UID:{entry.kind.value}-{entry.source_id}@{domain}")
+        yield _ical_line(f"DTSTAMP:{stamp}")
+        yield _ical_line(f"DTSTART:{_ical_datetime(entry.entry_date)}")
+        yield _ical_line(f"SUMMARY:{_ical_text(f'{entry.title} ({entry.case_number})')}")
+        yield _ical_line(f"DESCRIPTION:{_ical_text(f'{entry.case_number}: {entry.case_title}')}")
+        if entry.location:
+            yield _ical_line(f"LOCATION:{_ical_text(entry.location)}")
+        yield _ical_line(f"CATEGORIES:{entry.kind.value.upper()}")
+        yield _ical_line("END:VEVENT")
+    yield _ical_line("END:VCALENDAR")
+
+
+def iter_ndjson(entries: Iterable[CalendarEntry]) -> Iterator[str]:
+    """Yield one JSON object per line for each entry."""
+    for entry in entries:
+        yield json.dumps({
+            "kind": entry.kind.value,
+            "source_id": entry.source_id,
+            "entry_date": entry.entry_date.isoformat(),
+            "title": entry.title,
+            "location": entry.location,
+            "case_id": entry.case_id,
+            "case_number": entry.case_number,
+            "case_title": entry.case_title,
+        }, separators=(",", ":")) + "\n"
+
+
+EXPORTERS = {
+    CalendarExportFormat.ICS: iter_ical,
+    CalendarExportFormat.NDJSON: iter_ndjson,
+}
@@ -0,0 +1,163 @@
+"""
+Per-case hour rollups maintained from time entries.
+``Case.actual_hours`` and ``Case.billable_hours`` are kept in step with the
+case's live time entries: every flush that inserts, edits, soft-deletes or
+deletes a TimeEntry applies the hour deltas to its case with one atomic
+``UPDATE ... SET hours = hours + delta``. Reports then read the case
+columns instead of summing time entries. The UPDATE bypasses the unit of
+work, so it is registered with ``record_write`` for case caches to drop
+the organization's entries on commit.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, event, func, select, update
+from sqlalchemy.orm import Session, attributes
+
+from core.db.invalidation import record_write
+from models.case import Case, TimeEntry
+
+# Cases whose rollup columns were updated behind the ORM in this flush
+_PENDING_KEY = "case_rollup_cases"
+
+_ZERO = Decimal("0")
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    """No-op; registered with active_history so the ORM loads ``oldvalue``."""
+
+
+# Setting these on an expired entry must still record the old value, so the
+# entry's previous contribution can be subtracted
+for _attribute in (TimeEntry.hours, TimeEntry.billable, TimeEntry.is_deleted, TimeEntry.case_id):
+    event.listen(_attribute, "set", _load_previous_value, active_history=True)
+
+
+def _contribution(hours: Any, billable: Any, is_deleted: Any) -> Tuple[Decimal, Decimal]:
+    """(actual, billable) hours one entry adds to its case."""
+    if is_deleted or not hours:
+        return _ZERO, _ZERO
+    hours = Decimal(hours)
+    return hours, hours if billable else _ZERO
+
+
+def _committed(entry: TimeEntry, key: str) -> Any:
+    """Value of an attribute as last flushed, before pending changes."""
+    history = attributes.get_history(entry, key)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _deltas(session: Session) -> Dict[Any, Tuple[Decimal, Decimal, Any]]:
+    """(actual, billable, organization_id) hour deltas per case id for this flush."""
+    deltas = defaultdict(lambda: [_ZERO, _ZERO, None])
+    
+    def apply(entry, case_id, contribution, sign):
+        if case_id is None:
+            return
+        deltas[case_id][0] += sign * contribution[0]
+        deltas[case_id][1] += sign * contribution[1]
+        deltas[case_id][2] = entry.organization_id
+    
+    for entry in session.new:
+        if isinstance(entry, TimeEntry):
+            contribution = _contribution(entry.hours, entry.billable, entry.is_deleted)
+            apply(entry, entry.case_id, contribution, 1)
+    
+    for entry in session.deleted:
+        if isinstance(entry, TimeEntry):
+            old = _contribution(
+                _committed(entry, "hours"),
+                _committed(entry, "billable"),
+                _committed(entry, "is_deleted")
+            )
+            apply(entry, _committed(entry, "case_id"), old, -1)
+    
+    for entry in session.dirty:
+        if not isinstance(entry, TimeEntry) or not session.is_modified(entry):
+            continue
+        old = _contribution(
+            _committed(entry, "hours"),
+            _committed(entry, "billable"),
+            _committed(entry, "is_deleted")
+        )
+        apply(entry, _committed(entry, "case_id"), old, -1)
+        apply(entry, entry.case_id, _contribution(entry.hours, entry.billable, entry.is_deleted), 1)
+    
+    return {case_id: tuple(delta) for case_id, delta in deltas.items() if delta[0] or delta[1]}
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_rollups(session: Session, flush_context):
+    """
+    Apply hour deltas in the flush's transaction.
+    
+    Runs after the entries are written, when foreign keys set through
+    relationships are populated but attribute history still holds the
+    previous values.
+    """
+    deltas = _deltas(session)
+    if not deltas:
+        return
+    
+    table = Case.__table__
+    connection = session.connection()
+    by_organization = defaultdict(set)
+    for case_id, (actual, billable, organization_id) in deltas.items():
+        connection.execute(
+            update(table)
+            .where(table.c.id == case_id)
+            .values(
+                actual_hours=table.c.actual_hours + actual,
+                billable_hours=table.c.billable_hours + billable
+            )
+        )
+        by_organization[organization_id].add(case_id)
+    
+    session.info.setdefault(_PENDING_KEY, set()).update(deltas)
+    # Cached case stats and detail responses embed the rollups
+    for organization_id, case_ids in by_organization.items():
+        record_write(session, Case, organization_id, case_ids)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_rolled_up_cases(session: Session, flush_context):
+    """Make loaded cases reread the rollup columns the UPDATE changed."""
+    for case_id in session.info.pop(_PENDING_KEY, ()):
+        case = session.identity_map.get(session.identity_key(Case, case_id))
+        if case is not None:
+            session.expire(case, ["actual_hours", "billable_hours"])
+
+
+def recalculate_case_rollups(
+    db: Session,
+    organization_id: Optional[int] = None,
+    case_ids: Optional[Iterable[int]] = None
+) -> int:
+    """
+    Recompute rollups from time entries, e.g. after bulk SQL bypassed the ORM.
+    
+    Returns:
+        Number of cases updated
+    """
+    live = and_(TimeEntry.case_id == Case.id, TimeEntry.is_deleted.is_(False))
+    actual = select(func.coalesce(func.sum(TimeEntry.hours), 0)).where(live).scalar_subquery()
+    billable = (
+        select(func.coalesce(func.sum(TimeEntry.hours), 0))
+        .where(live, TimeEntry.billable.is_(True))
+        .scalar_subquery()
+    )
+    
+    statement = update(Case).values(actual_hours=actual, billable_hours=billable)
+    if organization_id is not None:
+        statement = statement.where(Case.organization_id == organization_id)
+    if case_ids is not None:
+        statement = statement.where(Case.id.in_(list(case_ids)))
+    
+    result = db.execute(statement.execution_options(synchronize_session="fetch"))
+    return result.rowcount
@@ -1,2 +1,416 @@
+"""
+Client service implementation.
+Handles client queries for the client router.
+"""
 
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
 
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session, selectinload
+
+from core.db.aggregates import STATS_CACHE_TTL_SECONDS, grouped_counts
+from core.db.bulk import bulk_parameter, bulk_update, optional_int, string_list
+from core.db.counting import CountResult, CountStrategy, count_total, track_count_invalidation
+from core.db.entity_cache import EntityCache
+from core.db.invalidation import OrganizationCache, on_committed_rows, on_committed_write
+from core.db.pagination import keyset_paginate
+from core.db.replicas import pin_to_primary
+from core.db.tags import bulk_update_tags, tags_condition
+from core.db.tenancy import TenantRepository
+from core.db.unit_of_work import commit_unless_unit_of_work
+from core.db.versioning import apply_update, check_version, flush_versioned
+from core.exceptions import NotFoundError, ValidationError
+from models.case import Case
+from models.client import Client, ClientPriority, ClientStatus, ClientType
+from schemas.client.core import (
+    ClientBulkAction,
+    ClientBulkResult,
+    ClientFilter,
+    ClientResponse,
+    ClientStats,
+    ClientUpdate,
+)
+from services import search
+from services.case import case_detail_cache
+from services.typeahead import TYPEAHEAD_ENABLED, TypeaheadIndex, load_in_order
+
+# Writes to clients drop their organization's cached list counts
+track_count_invalidation(Client, "clients")
+
+
+def _typeahead_rows(db: Session, organization_id: int, ids: Optional[Iterable[int]] = None):
+    # The index is kept until the next write, so build it from the primary
+    pin_to_primary(db)
+    query = db.query(Client.id, Client.first_name, Client.last_name, Client.company_name).filter(
+        Client.organization_id == organization_id,
+        Client.is_deleted.is_(False)
+    )
+    return query if ids is None else query.filter(Client.id.in_(ids))
+
+
+# Optional in-memory prefix index over client names and companies
+client_typeahead = TypeaheadIndex("client", _typeahead_rows)
+on_committed_rows(Client, client_typeahead.rows_changed)
+
+# Per-organization ClientStats, dropped when the organization's clients change
+_client_stats_cache = OrganizationCache(Client, ttl=STATS_CACHE_TTL_SECONDS)
+
+# Rendered ClientResponse JSON by id and slug; case writes change its case count
+client_detail_cache = EntityCache("client", Client, Case)
+
+# Case responses embed the client summary, so client writes drop them too
+on_committed_write(Client, case_detail_cache.invalidate)
+
+
+class ClientService:
+    """Service class for client operations."""
+    
+    # Columns list endpoints may order by
+    ORDER_COLUMNS = (
+        "created_at", "updated_at", "first_name", "last_name", "company_name",
+        "email", "status", "priority", "id"
+    )
+    
+    # Non-nullable columns that can key a cursor page
+    CURSOR_ORDER_COLUMNS = ("created_at", "updated_at", "first_name", "last_name", "id")
+    
+    # Fields covered by the search_vector column, searched with ILIKE off Postgres
+    SEARCH_COLUMNS = (Client.first_name, Client.last_name, Client.company_name, Client.email)
+    
+    # Loader options per response shape. ClientResponse only reads the
+    # client's own columns; the detail view batch-loads its cases.
+    LOAD_PROFILES = {
+        "list": (),
+        "detail": (selectinload(Client.cases),),
+        "export": (),
+    }
+    
+    @staticmethod
+    def load_options(profile: str = "list") -> tuple:
+        """
+        Get the loader options for a loading profile.
+        
+        Raises:
+            ValidationError: If the profile is unknown
+        """
+        try:
+            return ClientService.LOAD_PROFILES[profile]
+        except KeyError:
+            raise ValidationError(
+                f"Unknown loading profile '{profile}'",
+                {"allowed": sorted(ClientService.LOAD_PROFILES)}
+            )
+    
+    @staticmethod
+    def _filtered_query(
+        db: Session,
+        organization_id: int,
+        filters: Optional[ClientFilter] = None
+    ) -> Query:
+        """Build the tenant-scoped, filtered client query shared by list modes."""
+        query = TenantRepository(db, Client, organization_id).query()
+        
+        if not filters:
+            return query
+        
+        if filters.search:
+            condition, _ = search.match_condition(
+                db, Client, filters.search, ClientService.SEARCH_COLUMNS
+            )
+            if condition is not None:
+                query = query.filter(condition)
+        if filters.client_type:
+            query = query.filter(Client.client_type == ClientType(filters.client_type.value))
+        if filters.status:
+            query = query.filter(Client.status == ClientStatus(filters.status.value))
+        if filters.priority:
+            query = query.filter(Client.priority == ClientPriority(filters.priority.value))
+        if filters.assigned_to_id:
+            query = query.filter(Client.assigned_to_id == filters.assigned_to_id)
+        if filters.tags:
+            query = query.filter(tags_condition(db, Client.tags, filters.tags))
+        if filters.created_after:
+            query = query.filter(Client.created_at >= filters.created_after)
+        if filters.created_before:
+            query = query.filter(Client.created_at <= filters.created_before)
+        
+        return query
+    
+    @staticmethod
+    def list_clients(
+        db: Session,
+        organization_id: int,
+        filters: Optional[ClientFilter] = None,
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str = "created_at",
+        order_direction: str = "desc",
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        profile: str = "list"
+    ) -> Tuple[List[Client], CountResult]:
+        """
+        List clients with offset pagination.
+        
+        Returns:
+            Tuple of (clients, CountResult with the total and whether it is exact)
+        """
+        if order_by not in ClientService.ORDER_COLUMNS:
+            raise ValidationError(f"Cannot order clients by '{order_by}'")
+        
+        query = ClientService._filtered_query(db, organization_id, filters)
+        total = count_total(
+            db,
+            query,
+            strategy=count_strategy,
+            namespace="clients",
+            organization_id=organization_id,
+            filters=filters,
+            filtered=bool(filters and filters.dict(exclude_defaults=True))
+        )
+        
+        column = getattr(Client, order_by)
+        ordering = column.desc() if order_direction == "desc" else column.asc()
+        query = query.options(*ClientService.load_options(profile))
+        clients = query.order_by(ordering, Client.id.desc()).offset(skip).limit(limit).all()
+        
+        return clients, total
+    
+    @staticmethod
+    def list_clients_cursor(
+        db: Session,
+        organization_id: int,
+        filters: Optional[ClientFilter] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        order_by: str = "created_at",
+        order_direction: str = "desc",
+        profile: str = "list"
+    ) -> Tuple[List[Client], Optional[str], bool]:
+        """
+        List clients with keyset pagination.
+        
+        Returns:
+            Tuple of (clients, next_cursor, has_next)
+        
+        Raises:
+            ValidationError: If the ordering is not cursor-safe or the cursor is invalid
+        """
+        query = ClientService._filtered_query(db, organization_id, filters)
+        query = query.options(*ClientService.load_options(profile))
+        return keyset_paginate(
+            query,
+            Client,
+            order_by=order_by,
+            order_direction=order_direction,
+            limit=limit,
+            cursor=cursor,
+            allowed_columns=ClientService.CURSOR_ORDER_COLUMNS
+        )
+    
+    @staticmethod
+    def search_clients(
+        db: Session,
+        organization_id: int,
+        search_term: str,
+        limit: int = 10,
+        profile: str = "list"
+    ) -> List[Client]:
+        """Ranked prefix search over client names, company and email."""
+        if TYPEAHEAD_ENABLED:
+            ids = client_typeahead.search(db, organization_id, search_term, limit)
+            options = ClientService.load_options(profile)
+            return load_in_order(db, Client, organization_id, ids, options)
+        
+        return search.search(
+            db,
+            Client,
+            organization_id=organization_id,
+            term=search_term,
+            fallback_columns=ClientService.SEARCH_COLUMNS,
+            limit=limit,
+            options=ClientService.load_options(profile)
+        )
+    
+    @staticmethod
+    def get_client_stats(db: Session, organization_id: int) -> ClientStats:
+        """
+        Get client counts and breakdowns for an organization.
+        
+        Aggregated in SQL and cached per organization until its clients change.
+        """
+        stats = _client_stats_cache.get(organization_id)
+        if stats is not None:
+            return stats
+        # Cached until the next write, so computed from the primary, never a lagging replica
+        pin_to_primary(db)
+        
+        breakdowns, totals = grouped_counts(
+            db,
+            criteria=(Client.organization_id == organization_id, Client.is_deleted.is_(False)),
+            dimensions={
+                "by_type": Client.client_type,
+                "by_status": Client.status,
+                "by_priority": Client.priority,
+            },
+            totals={
+                "total_clients": func.count(),
+                "active_clients": func.count().filter(Client.status == ClientStatus.ACTIVE),
+                "prospects": func.count().filter(Client.status == ClientStatus.PROSPECT),
+                "recent_clients": func.count().filter(
+                    Client.created_at >= datetime.utcnow() - timedelta(days=30)
+                ),
+            }
+        )
+        
+        stats = ClientStats(
+            **{name: value or 0 for name, value in totals.items()},
+            **breakdowns
+        )
+        _client_stats_cache.set(organization_id, stats)
+        return stats
+    
+    @staticmethod
+    def get_client(
+        db: Session,
+        client_id: int,
+        organization_id: int,
+        profile: str = "detail"
+    ) -> Optional[Client]:
+        """Get a live client by ID within an organization."""
+        return TenantRepository(db, Client, organization_id).get(
+            client_id, *ClientService.load_options(profile)
+        )
+    
+    @staticmethod
+    def get_client_by_slug(
+        db: Session,
+        slug: str,
+        organization_id: int,
+        profile: str = "detail"
+    ) -> Optional[Client]:
+        """Get a live client by slug within an organization."""
+        return TenantRepository(db, Client, organization_id).get_by(
+            "slug", slug, *ClientService.load_options(profile)
+        )
+    
+    @staticmethod
+    def _cached_response(
+        db: Session,
+        organization_id: int,
+        key: str,
+        load
+    ) -> Optional[ClientResponse]:
+        """Serve a client detail response from the entity cache, rendering it on a miss."""
+        def render() -> Optional[str]:
+            client = load()
+            return ClientResponse.from_orm(client).model_dump_json() if client else None
+        
+        cached = client_detail_cache.get_or_load(db, organization_id, key, render)
+        return ClientResponse.model_validate_json(cached) if cached else None
+    
+    @staticmethod
+    def get_client_response(
+        db: Session,
+        client_id: int,
+        organization_id: int
+    ) -> Optional[ClientResponse]:
+        """Detail response for a client by ID, cached when the entity cache is enabled."""
+        return ClientService._cached_response(
+            db, organization_id, f"id:{client_id}",
+            lambda: ClientService.get_client(db, client_id, organization_id)
+        )
+    
+    @staticmethod
+    def get_client_response_by_slug(
+        db: Session,
+        slug: str,
+        organization_id: int
+    ) -> Optional[ClientResponse]:
+        """Detail response for a client by slug, cached when the entity cache is enabled."""
+        return ClientService._cached_response(
+            db, organization_id, f"slug:{slug}",
+            lambda: ClientService.get_client_by_slug(db, slug, organization_id)
+        )
+    
+    @staticmethod
+    def update_client(
+        db: Session,
+        client_id: int,
+        client_update: ClientUpdate,
+        organization_id: int,
+        updated_by_id: Optional[int] = None,
+        expected_version: Optional[int] = None
+    ) -> Client:
+        """
+        Update a client, optionally only while it is still at ``expected_version``.
+        
+        Raises:
+            NotFoundError: If the client does not exist in the organization
+            ConflictError: If the client changed since the expected version
+        """
+        client = TenantRepository(db, Client, organization_id).get(client_id)
+        if client is None:
+            raise NotFoundError("Client not found")
+        check_version(client, expected_version)
+        
+        apply_update(client, client_update.dict(exclude_unset=True))
+        flush_versioned(db, client)
+        commit_unless_unit_of_work(db)
+        return client
+    
+    @staticmethod
+    def _bulk_values(action: str, parameters: dict) -> dict:
+        """Column values for a bulk action that sets the same value on every client."""
+        if action == "update_status":
+            return {Client.status: bulk_parameter(parameters, "status", ClientStatus)}
+        if action == "update_priority":
+            return {Client.priority: bulk_parameter(parameters, "priority", ClientPriority)}
+        if action == "assign_to":
+            assigned_to_id = bulk_parameter(parameters, "assigned_to_id", optional_int)
+            return {Client.assigned_to_id: assigned_to_id}
+        raise ValidationError(f"Unknown bulk action '{action}'")
+    
+    @staticmethod
+    def bulk_update_clients(
+        db: Session,
+        bulk_action: ClientBulkAction,
+        organization_id: int,
+        updated_by_id: Optional[int] = None
+    ) -> ClientBulkResult:
+        """
+        Apply one action to many clients in a single transaction.
+        
+        Each chunk of ids is one UPDATE scoped to the organization. Ids that
+        are missing, deleted or belong to another organization are reported
+        as errors.
+        """
+        action = bulk_action.action
+        parameters = bulk_action.parameters or {}
+        client_ids = list(dict.fromkeys(bulk_action.client_ids))
+        live = (Client.is_deleted.is_(False),)
+        
+        try:
+            if action in ("add_tags", "remove_tags"):
+                tags = bulk_parameter(parameters, "tags", string_list)
+                updated = bulk_update_tags(
+                    db, Client, client_ids, organization_id, tags,
+                    remove=action == "remove_tags",
+                    criteria=live
+                )
+            else:
+                values = ClientService._bulk_values(action, parameters)
+                updated = bulk_update(db, Client, client_ids, organization_id, values, live)
+            commit_unless_unit_of_work(db)
+        except Exception:
+            db.rollback()
+            raise
+        
+        updated_set = set(updated)
+        missing = [client_id for client_id in client_ids if client_id not in updated_set]
+        return ClientBulkResult(
+            success_count=len(updated),
+            error_count=len(missing),
+            updated_clients=updated,
+            errors=[{"client_id": client_id, "error": "Client not found"} for client_id in missing]
+        )
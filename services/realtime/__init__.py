@@ -1,11 +1,22 @@
 # services/realtime/__init__.py
 """Real-time communication services for WebSocket support."""
 
-from .activity_tracker import ActivityTracker, activity_tracker
-from .broadcaster import RealtimeBroadcaster, broadcaster
-from .connection_manager import ConnectionManager, connection_manager
-from .presence_tracker import PresenceTracker, presence_tracker
-from .session_store import SessionStore, session_store
+from importlib import import_module
+
+# Exports are resolved lazily so each service module can be imported on its own
+_EXPORTS = {
+    "ConnectionManager": ".connection_manager",
+    "connection_manager": ".connection_manager",
+    "RealtimeBroadcaster": ".broadcaster",
+    "broadcaster": ".broadcaster",
+    "PresenceTracker": ".presence_tracker",
+    "presence_tracker": ".presence_tracker",
+    "SessionStore": ".session_store",
+    "session_store": ".session_store",
+    "ActivityTracker": ".activity_tracker",
+    "ActivityType": ".activity_tracker",
+    "activity_tracker": ".activity_tracker",
+}
 
 __all__ = [
     "ConnectionManager",
@@ -17,5 +28,12 @@ __all__ = [
     "SessionStore",
     "session_store",
     "ActivityTracker",
+    "ActivityType",
     "activity_tracker"
 ]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
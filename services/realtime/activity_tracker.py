@@ -1,2 +1,458 @@
+# services/realtime/activity_tracker.py
+"""
+Organization activity tracking service.
+Appends activity events to a capped Redis Stream per organization and
+aggregates them through a consumer group into rolling-window counters and
+capped feeds, so dashboards read pre-aggregated data in one round trip.
+"""
 
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from .cache import TTLCache
+from .redis_pool import create_client
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityType(str, Enum):
+    """Kinds of activity shown in feeds and counters."""
+    DOCUMENT_CREATED = "document.created"
+    DOCUMENT_VIEWED = "document.viewed"
+    DOCUMENT_EDITED = "document.edited"
+    COMMENT_ADDED = "comment.added"
+
+
+# Consumer group shared by every node aggregating activity
+ACTIVITY_GROUP = "activity-aggregators"
+
+# Set of organization ids that have an activity stream
+STREAMS_KEY = "activity:streams"
+
+# Approximate cap on each organization's raw stream
+STREAM_MAXLEN = int(os.getenv("REALTIME_ACTIVITY_STREAM_MAXLEN", "10000"))
+
+# Entries kept in each pre-aggregated feed
+FEED_LENGTH = int(os.getenv("REALTIME_ACTIVITY_FEED_LENGTH", "200"))
+
+# Milliseconds an entry stays unacknowledged by another consumer before it is
+# claimed, so a dead node's deliveries are aggregated by a live one
+CLAIM_MIN_IDLE_MS = int(os.getenv("REALTIME_ACTIVITY_CLAIM_MIN_IDLE_MS", "60000"))
+
+# Rolling windows: name -> (bucket size in seconds, number of buckets)
+WINDOWS: Dict[str, Tuple[int, int]] = {
+    "1h": (300, 12),
+    "24h": (3600, 24),
+    "7d": (86400, 7),
+}
+
+
+def _stream_key(organization_id: str) -> str:
+    return f"activity:stream:{organization_id}"
+
+
+def _feed_key(
+    organization_id: str,
+    document_id: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> str:
+    if document_id:
+        return f"activity:feed:{organization_id}:document:{document_id}"
+    if user_id:
+        return f"activity:feed:{organization_id}:user:{user_id}"
+    return f"activity:feed:{organization_id}"
+
+
+def _bucket_keys(organization_id: str, window: str, now: Optional[float] = None) -> List[str]:
+    """Keys of the counter buckets covering a window, newest first."""
+    if window not in WINDOWS:
+        raise ValueError(f"Unknown activity window: {window}")
+    
+    size, count = WINDOWS[window]
+    current = int((time.time() if now is None else now) // size)
+    return [f"activity:counts:{organization_id}:{window}:{current - i}" for i in range(count)]
+
+
+class ActivityEvent:
+    """A single activity event."""
+    
+    def __init__(
+        self,
+        organization_id: str,
+        user_id: str,
+        activity_type: ActivityType,
+        document_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[float] = None
+    ):
+        self.organization_id = organization_id
+        self.user_id = user_id
+        self.activity_type = ActivityType(activity_type)
+        self.document_id = document_id
+        self.metadata = metadata or {}
+        self.timestamp = time.time() if timestamp is None else timestamp
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for feeds."""
+        return {
+            "organization_id": self.organization_id,
+            "user_id": self.user_id,
+            "activity_type": self.activity_type.value,
+            "document_id": self.document_id,
+            "metadata": self.metadata,
+            "timestamp": self.timestamp
+        }
+    
+    def to_stream_fields(self) -> Dict[str, str]:
+        """Flatten to stream entry fields."""
+        fields = {
+            "organization_id": self.organization_id,
+            "user_id": self.user_id,
+            "activity_type": self.activity_type.value,
+            "timestamp": repr(self.timestamp)
+        }
+        if self.document_id:
+            fields["document_id"] = self.document_id
+        if self.metadata:
+            fields["metadata"] = json.dumps(self.metadata)
+        return fields
+    
+    @classmethod
+    def from_stream_fields(cls, fields: Dict[str, str]) -> "ActivityEvent":
+        """Create from stream entry fields."""
+        return cls(
+            organization_id=fields["organization_id"],
+            user_id=fields["user_id"],
+            activity_type=ActivityType(fields["activity_type"]),
+            document_id=fields.get("document_id") or None,
+            metadata=json.loads(fields["metadata"]) if fields.get("metadata") else {},
+            timestamp=float(fields["timestamp"])
+        )
+
+
+def _merge_counts(buckets: Iterable[Dict[str, str]]) -> Dict[str, Any]:
+    """Sum counter buckets into totals and per-document/per-user counts."""
+    totals: Dict[str, int] = {}
+    documents: Dict[str, Dict[str, int]] = {}
+    users: Dict[str, Dict[str, int]] = {}
+    
+    for bucket in buckets:
+        for field, value in (bucket or {}).items():
+            scope, _, rest = field.partition(":")
+            if scope == "total":
+                totals[rest] = totals.get(rest, 0) + int(value)
+                continue
+            
+            subject, _, activity_type = rest.rpartition(":")
+            target = documents if scope == "doc" else users
+            counts = target.setdefault(subject, {})
+            counts[activity_type] = counts.get(activity_type, 0) + int(value)
+    
+    return {"totals": totals, "documents": documents, "users": users}
+
+
+class ActivityTracker:
+    """Records and aggregates organization activity."""
+    
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379",
+        consumer_name: Optional[str] = None,
+        batch_size: int = 100,
+        block_ms: int = 1000,
+        claim_min_idle_ms: int = CLAIM_MIN_IDLE_MS,
+        max_cached_organizations: int = 1000
+    ):
+        self.redis_url = redis_url
+        self.redis_client: Optional[redis.Redis] = None
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_min_idle_ms = claim_min_idle_ms
+        self._streams: Dict[str, str] = {}  # stream key -> next id to read
+        self._last_claim = 0.0
+        self._consumer_task: Optional[asyncio.Task] = None
+        # Recent activity per organization when running without Redis
+        self._local_feeds = TTLCache(max_entries=max_cached_organizations)
+    
+    async def start(self, connection_pool: Optional[redis.ConnectionPool] = None):
+        """Initialize the activity tracker."""
+        try:
+            self.redis_client = await create_client(self.redis_url, connection_pool)
+            
+            # Start aggregation consumer
+            self._consumer_task = asyncio.create_task(self._consume_activity())
+            
+            logger.info("ActivityTracker started")
+            
+        except Exception as e:
+            logger.error(f"Failed to start ActivityTracker: {e}")
+            # Continue without Redis - use in-memory only
+    
+    async def stop(self):
+        """Stop the activity tracker."""
+        if self._consumer_task:
+            self._consumer_task.cancel()
+        
+        if self.redis_client:
+            await self.redis_client.close()
+        
+        self._streams = {}
+        logger.info("ActivityTracker stopped")
+    
+    async def record_activity(
+        self,
+        organization_id: str,
+        user_id: str,
+        activity_type: ActivityType,
+        document_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Append an activity event; returns the stream entry id."""
+        event = ActivityEvent(organization_id, user_id, activity_type, document_id, metadata)
+        
+        if self.redis_client:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.xadd(
+                    _stream_key(organization_id),
+                    event.to_stream_fields(),
+                    maxlen=STREAM_MAXLEN,
+                    approximate=True
+                )
+                pipe.sadd(STREAMS_KEY, organization_id)
+                entry_id, _ = await pipe.execute()
+                return entry_id
+            except Exception as e:
+                logger.error(f"Error recording activity in Redis: {e}")
+        
+        feed = self._local_feeds.get(organization_id)
+        if feed is None:
+            feed = deque(maxlen=FEED_LENGTH)
+            self._local_feeds[organization_id] = feed
+        feed.appendleft(event.to_dict())
+        return None
+    
+    async def _consume_activity(self):
+        """Background task that aggregates new stream entries."""
+        while True:
+            try:
+                await self._refresh_streams()
+                if not self._streams:
+                    await asyncio.sleep(self.block_ms / 1000)
+                    continue
+                
+                processed = await self.process_pending()
+                
+                # Sweep other consumers' stale entries every min-idle period
+                now = time.monotonic()
+                if now - self._last_claim >= self.claim_min_idle_ms / 1000:
+                    self._last_claim = now
+                    processed += await self.claim_idle()
+                
+                if not processed:
+                    # Nothing pending for this consumer; block for new entries
+                    response = await self.redis_client.xreadgroup(
+                        ACTIVITY_GROUP,
+                        self.consumer_name,
+                        {stream: ">" for stream in self._streams},
+                        count=self.batch_size,
+                        block=self.block_ms
+                    )
+                    for stream, entries in response or []:
+                        await self._aggregate(stream, entries)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in activity aggregation: {e}")
+                await asyncio.sleep(1)
+    
+    async def _refresh_streams(self):
+        """Join the consumer group on streams created since the last check."""
+        organization_ids = await self.redis_client.smembers(STREAMS_KEY)
+        
+        for organization_id in organization_ids:
+            stream = _stream_key(organization_id)
+            if stream in self._streams:
+                continue
+            try:
+                await self.redis_client.xgroup_create(stream, ACTIVITY_GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            # Start with entries delivered to this consumer but never acknowledged
+            self._streams[stream] = "0"
+    
+    async def process_pending(self) -> int:
+        """Aggregate every entry waiting for this consumer; returns the entry count."""
+        if not self._streams:
+            return 0
+        
+        processed = 0
+        while True:
+            response = await self.redis_client.xreadgroup(
+                ACTIVITY_GROUP,
+                self.consumer_name,
+                dict(self._streams),
+                count=self.batch_size
+            )
+            
+            reading_history = any(last_id != ">" for last_id in self._streams.values())
+            batch = 0
+            for stream, entries in response or []:
+                if self._streams.get(stream, ">") != ">":
+                    # Walk this consumer's unacknowledged history before new entries
+                    self._streams[stream] = entries[-1][0] if entries else ">"
+                batch += await self._aggregate(stream, entries)
+            
+            if not batch and not reading_history:
+                return processed
+            processed += batch
+    
+    async def claim_idle(self) -> int:
+        """
+        Claim and aggregate entries other consumers left unacknowledged.
+        
+        Entries idle for at least ``claim_min_idle_ms`` are moved to this
+        consumer with XAUTOCLAIM, so deliveries to a node that died before
+        acknowledging them are not stuck in its pending list forever.
+        Returns the number of entries aggregated.
+        """
+        processed = 0
+        for stream in list(self._streams):
+            start_id = "0-0"
+            while True:
+                response = await self.redis_client.xautoclaim(
+                    stream,
+                    ACTIVITY_GROUP,
+                    self.consumer_name,
+                    self.claim_min_idle_ms,
+                    start_id=start_id,
+                    count=self.batch_size
+                )
+                start_id, entries = response[0], response[1]
+                processed += await self._aggregate(stream, entries)
+                if start_id == "0-0":
+                    break
+        return processed
+    
+    async def _aggregate(self, stream: str, entries: List[Tuple[str, Dict[str, str]]]) -> int:
+        """Fold a batch of entries into counters and feeds, then acknowledge it."""
+        if not entries:
+            return 0
+        
+        pipe = self.redis_client.pipeline(transaction=True)
+        entry_ids = []
+        
+        for entry_id, fields in entries:
+            entry_ids.append(entry_id)
+            if not fields:
+                continue  # Trimmed from the stream before it was read
+            
+            try:
+                event = ActivityEvent.from_stream_fields(fields)
+            except Exception as e:
+                logger.error(f"Skipping malformed activity entry {entry_id}: {e}")
+                continue
+            
+            activity_type = event.activity_type.value
+            for window, (size, count) in WINDOWS.items():
+                key = _bucket_keys(event.organization_id, window, event.timestamp)[0]
+                pipe.hincrby(key, f"total:{activity_type}", 1)
+                pipe.hincrby(key, f"user:{event.user_id}:{activity_type}", 1)
+                if event.document_id:
+                    pipe.hincrby(key, f"doc:{event.document_id}:{activity_type}", 1)
+                pipe.expire(key, size * (count + 1))
+            
+            feed_entry = json.dumps(event.to_dict())
+            feed_keys = [
+                _feed_key(event.organization_id),
+                _feed_key(event.organization_id, user_id=event.user_id)
+            ]
+            if event.document_id:
+                feed_keys.append(_feed_key(event.organization_id, document_id=event.document_id))
+            for feed_key in feed_keys:
+                pipe.lpush(feed_key, feed_entry)
+                pipe.ltrim(feed_key, 0, FEED_LENGTH - 1)
+        
+        pipe.xack(stream, ACTIVITY_GROUP, *entry_ids)
+        await pipe.execute()
+        return len(entry_ids)
+    
+    async def get_recent_activity(
+        self,
+        organization_id: str,
+        document_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get the newest activity for an organization, document or user."""
+        if self.redis_client:
+            try:
+                rows = await self.redis_client.lrange(
+                    _feed_key(organization_id, document_id, user_id), 0, limit - 1
+                )
+                return [json.loads(row) for row in rows]
+            except Exception as e:
+                logger.error(f"Error reading activity feed from Redis: {e}")
+        
+        feed = self._local_feeds.get(organization_id) or ()
+        entries = [
+            entry for entry in feed
+            if (not document_id or entry["document_id"] == document_id)
+            and (not user_id or entry["user_id"] == user_id)
+        ]
+        return entries[:limit]
+    
+    async def get_activity_counts(
+        self,
+        organization_id: str,
+        window: str = "24h"
+    ) -> Dict[str, Any]:
+        """Get activity counts for a rolling window."""
+        keys = _bucket_keys(organization_id, window)
+        if not self.redis_client:
+            return _merge_counts(())
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        return _merge_counts(await pipe.execute())
+    
+    async def get_dashboard(
+        self,
+        organization_id: str,
+        window: str = "24h",
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """Get the feed and window counters for a dashboard in one round trip."""
+        keys = _bucket_keys(organization_id, window)
+        if not self.redis_client:
+            recent = await self.get_recent_activity(organization_id, limit=limit)
+            return {"window": window, "recent": recent, **_merge_counts(())}
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.lrange(_feed_key(organization_id), 0, limit - 1)
+        for key in keys:
+            pipe.hgetall(key)
+        rows, *buckets = await pipe.execute()
+        
+        return {
+            "window": window,
+            "recent": [json.loads(row) for row in rows],
+            **_merge_counts(buckets)
+        }
+
+
+# Global activity tracker instance
+activity_tracker = ActivityTracker()
@@ -3,6 +3,13 @@
 Real-time event broadcaster service.
 Triggers updates when documents are edited or other events occur.
 Integrates with Redis Pub/Sub for distributed broadcasting.
+
+Local delivery goes through ``framing.fan_out``: the broadcaster records each
+connection's negotiated frame format and encodes every outgoing frame at
+most once per format in use. Which sockets a frame reaches is looked up on
+``connections``, any object with ``room_connections(room_id)``,
+``user_connections(user_id)`` and ``all_connections()``, each returning
+``(connection_id, websocket)`` pairs.
 """
 
 import asyncio
@@ -10,11 +17,13 @@ import json
 import logging
 from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import redis.asyncio as redis
 
-from .connection_manager import MessageType, connection_manager
+from .framing import EncodedMessage, FrameFormat, fan_out
+from .redis_pool import create_client
+from .replay import ReplayBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -40,23 +49,97 @@ class BroadcastEvent(str, Enum):
     CLIENT_UPDATED = "client.updated"
 
 
+class FrameType(str, Enum):
+    """Envelope ``type`` of frames sent to WebSocket clients."""
+    SYSTEM_MESSAGE = "system_message"
+    DOCUMENT_UPDATE = "document_update"
+    NOTIFICATION = "notification"
+    PRESENCE_UPDATE = "presence_update"
+    ROOM_UPDATE = "room_update"
+
+
 class RealtimeBroadcaster:
     """Handles real-time event broadcasting across the application."""
     
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
+    def __init__(self, redis_url: str = "redis://localhost:6379", connections: Any = None):
         self.redis_url = redis_url
         self.redis_client: Optional[redis.Redis] = None
         self._event_handlers: Dict[str, List[Callable]] = {}
         self._subscription_task: Optional[asyncio.Task] = None
+        # Sequenced room frames for clients resuming after a reconnect
+        self.replay = ReplayBuffer()
+        # Registry of local sockets; nothing is delivered locally without one
+        self.connections = connections
+        # Negotiated frame format per connection id; JSON when not recorded
+        self._formats: Dict[str, FrameFormat] = {}
+    
+    def set_frame_format(self, connection_id: str, fmt: FrameFormat):
+        """Record the format a connection negotiated during its handshake."""
+        self._formats[connection_id] = fmt
+    
+    def forget_connection(self, connection_id: str):
+        """Drop a closed connection's format."""
+        self._formats.pop(connection_id, None)
+    
+    async def _deliver(
+        self,
+        connections: Iterable[Tuple[str, Any]],
+        frame_type: FrameType,
+        data: Dict[str, Any],
+        room_id: Optional[str] = None
+    ) -> int:
+        """Send one frame to connections, encoded once per format in use."""
+        targets = [
+            (websocket, self._formats.get(connection_id, FrameFormat.JSON))
+            for connection_id, websocket in connections
+        ]
+        if not targets:
+            return 0
+        
+        envelope = {
+            "type": frame_type.value,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        if room_id:
+            envelope["room_id"] = room_id
+        return await fan_out(EncodedMessage(envelope), targets)
+    
+    async def send_to_room(self, room_id: str, frame_type: FrameType, data: Dict[str, Any]) -> int:
+        """Send a frame to a room's local connections; returns the delivered count."""
+        if self.connections is None:
+            return 0
+        return await self._deliver(
+            self.connections.room_connections(room_id), frame_type, data, room_id
+        )
     
-    async def start(self):
+    async def send_to_users(
+        self,
+        user_ids: Iterable[str],
+        frame_type: FrameType,
+        data: Dict[str, Any]
+    ) -> int:
+        """Send a frame to every local connection of the given users."""
+        if self.connections is None:
+            return 0
+        connections = [
+            connection
+            for user_id in dict.fromkeys(user_ids)
+            for connection in self.connections.user_connections(user_id)
+        ]
+        return await self._deliver(connections, frame_type, data)
+    
+    async def send_to_all(self, frame_type: FrameType, data: Dict[str, Any]) -> int:
+        """Send a frame to every local connection."""
+        if self.connections is None:
+            return 0
+        return await self._deliver(self.connections.all_connections(), frame_type, data)
+    
+    async def start(self, connection_pool: Optional[redis.ConnectionPool] = None):
         """Initialize Redis connection and start listening."""
         try:
-            self.redis_client = await redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            self.redis_client = await create_client(self.redis_url, connection_pool)
+            self.replay.attach(self.redis_client)
             
             # Start Redis subscription handler
             self._subscription_task = asyncio.create_task(self._subscription_handler())
@@ -75,6 +158,7 @@ class RealtimeBroadcaster:
         if self.redis_client:
             await self.redis_client.close()
         
+        self.replay.attach(None)
         logger.info("RealtimeBroadcaster stopped")
     
     async def _subscription_handler(self):
@@ -104,12 +188,17 @@ class RealtimeBroadcaster:
         event_type = message.get("event_type")
         data = message.get("data", {})
         
+        # Keep frames sequenced on other nodes available for resume here, and
+        # note room frames they could not sequence
+        if message.get("room_id"):
+            self.replay.remember(message["room_id"], message)
+        
         if event_type:
             await self._trigger_handlers(event_type, data)
             
             # Also broadcast via WebSocket
-            await connection_manager.broadcast_to_all(
-                MessageType.SYSTEM_MESSAGE,
+            await self.send_to_all(
+                FrameType.SYSTEM_MESSAGE,
                 {
                     "event_type": event_type,
                     "data": data
@@ -159,36 +248,29 @@ class RealtimeBroadcaster:
             "data": data,
             "timestamp": datetime.utcnow().isoformat()
         }
+        if room_id and not user_ids:
+            message_data["room_id"] = room_id
+            seq = await self.replay.append(room_id, message_data)
+            if seq is not None:
+                message_data["seq"] = seq
         
         # Broadcast via WebSocket
         if user_ids:
             # Send to specific users
-            for user_id in user_ids:
-                await connection_manager.send_to_user(
-                    user_id,
-                    MessageType.SYSTEM_MESSAGE,
-                    message_data
-                )
+            await self.send_to_users(user_ids, FrameType.SYSTEM_MESSAGE, message_data)
         elif room_id:
             # Send to specific room
-            await connection_manager.broadcast_to_room(
-                room_id,
-                MessageType.SYSTEM_MESSAGE,
-                message_data
-            )
+            await self.send_to_room(room_id, FrameType.SYSTEM_MESSAGE, message_data)
         else:
             # Broadcast to all
-            await connection_manager.broadcast_to_all(
-                MessageType.SYSTEM_MESSAGE,
-                message_data
-            )
+            await self.send_to_all(FrameType.SYSTEM_MESSAGE, message_data)
         
         # Broadcast via Redis for distributed systems
         if self.redis_client:
             try:
                 await self.redis_client.publish(
                     "realtime_events",
-                    json.dumps(message_data)
+                    EncodedMessage(message_data).encoded(FrameFormat.JSON)
                 )
             except Exception as e:
                 logger.error(f"Error publishing to Redis: {e}")
@@ -196,6 +278,21 @@ class RealtimeBroadcaster:
         # Trigger local handlers
         await self._trigger_handlers(event_type.value, data)
     
+    async def resume(self, room_id: str, last_seq: int) -> Dict[str, Any]:
+        """
+        Get the room frames a reconnecting client missed.
+        
+        Clients track the ``seq`` of the last room frame they received and
+        send it back on reconnect. If ``complete`` is False in the result, the
+        missed frames are no longer buffered and the client must refetch
+        full state instead.
+        
+        Args:
+            room_id: Room the client is rejoining
+            last_seq: Sequence number of the last frame the client received
+        """
+        return await self.replay.since(room_id, last_seq)
+    
     # Convenience methods for common broadcasts
     
     async def broadcast_document_update(
@@ -302,9 +399,9 @@ async def handle_document_update(data: Dict[str, Any]):
     document_id = data.get("document_id")
     if document_id:
         # Notify all users viewing the document
-        await connection_manager.broadcast_to_room(
+        await broadcaster.send_to_room(
             f"document:{document_id}",
-            MessageType.DOCUMENT_UPDATE,
+            FrameType.DOCUMENT_UPDATE,
             data
         )
 
@@ -316,8 +413,8 @@ async def handle_notification(data: Dict[str, Any]):
     notification_data = data.get("notification", {})
     
     if user_id:
-        await connection_manager.send_to_user(
-            user_id,
-            MessageType.NOTIFICATION,
+        await broadcaster.send_to_users(
+            [user_id],
+            FrameType.NOTIFICATION,
             notification_data
         )
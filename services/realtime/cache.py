@@ -0,0 +1,198 @@
+# services/realtime/cache.py
+"""
+Bounded in-memory cache with LRU eviction and per-entry TTL.
+Keeps the memory used by realtime services predictable per process.
+"""
+
+import heapq
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Dict-like cache bounded by entry count with optional expiry per entry.
+    
+    Least recently used entries are evicted once ``max_entries`` is reached.
+    Deadlines are kept in a min-heap, so expiring entries only touches the
+    entries that actually expired instead of scanning the whole cache.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._deadlines: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._counter = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def _is_expired(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Check whether an entry's deadline has passed."""
+        deadline = self._deadlines.get(key)
+        if deadline is None:
+            return False
+        return deadline <= (self._clock() if now is None else now)
+    
+    def _schedule(self, key: Hashable, ttl: Optional[float]):
+        """Record a deadline for the entry, or clear it if ttl is None."""
+        if ttl is None:
+            self._deadlines.pop(key, None)
+            return
+        
+        deadline = self._clock() + ttl
+        self._deadlines[key] = deadline
+        self._counter += 1
+        heapq.heappush(self._heap, (deadline, self._counter, key))
+        
+        # Superseded deadlines stay in the heap until popped; rebuild it
+        # when they start to dominate
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = []
+            for live_key, live_deadline in self._deadlines.items():
+                self._counter += 1
+                self._heap.append((live_deadline, self._counter, live_key))
+            heapq.heapify(self._heap)
+    
+    def _remove(self, key: Hashable) -> Any:
+        """Remove an entry and its deadline, returning the value."""
+        self._deadlines.pop(key, None)
+        return self._data.pop(key)
+    
+    def _evict(self, key: Hashable, expired: bool):
+        """Remove an entry the caller did not ask to remove."""
+        value = self._remove(key)
+        if expired:
+            self.expirations += 1
+        else:
+            self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Any = _MISSING):
+        """Insert or replace an entry, evicting the least recently used if full."""
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = value
+        self._schedule(key, self.ttl if ttl is _MISSING else ttl)
+        
+        while len(self._data) > self.max_entries:
+            oldest = next(iter(self._data))
+            self._evict(oldest, expired=False)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get an entry and mark it as recently used."""
+        if key not in self._data:
+            return default
+        
+        if self._is_expired(key):
+            self._evict(key, expired=True)
+            return default
+        
+        self._data.move_to_end(key)
+        return self._data[key]
+    
+    def touch(self, key: Hashable, ttl: Any = _MISSING) -> bool:
+        """Refresh an entry's deadline and recency without replacing it."""
+        if key not in self:
+            return False
+        
+        self._data.move_to_end(key)
+        self._schedule(key, self.ttl if ttl is _MISSING else ttl)
+        return True
+    
+    def pop(self, key: Hashable, default: Any = _MISSING) -> Any:
+        """Remove an entry and return its value."""
+        if key in self._data and not self._is_expired(key):
+            return self._remove(key)
+        if key in self._data:
+            self._evict(key, expired=True)
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+    
+    def pop_expired(self, now: Optional[float] = None) -> List[Tuple[Hashable, Any]]:
+        """Remove and return every entry whose deadline has passed."""
+        now = self._clock() if now is None else now
+        expired = []
+        
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            # Skip deadlines superseded by a later set() or touch()
+            if self._deadlines.get(key) != deadline:
+                continue
+            expired.append((key, self._evict(key, expired=True)))
+        
+        return expired
+    
+    def keys(self) -> List[Hashable]:
+        """Snapshot of live keys, oldest first."""
+        self.pop_expired()
+        return list(self._data.keys())
+    
+    def values(self) -> List[Any]:
+        """Snapshot of live values, oldest first."""
+        self.pop_expired()
+        return list(self._data.values())
+    
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of live entries, oldest first."""
+        self.pop_expired()
+        return list(self._data.items())
+    
+    def clear(self):
+        """Remove every entry without calling on_evict."""
+        self._data.clear()
+        self._deadlines.clear()
+        self._heap.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get cache size and eviction counters."""
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+    
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+    
+    def __delitem__(self, key: Hashable):
+        self.pop(key)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        if key not in self._data:
+            return False
+        if self._is_expired(key):
+            self._evict(key, expired=True)
+            return False
+        return True
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __iter__(self):
+        return iter(self.keys())
@@ -0,0 +1,153 @@
+# services/realtime/framing.py
+"""
+WebSocket frame encoding for real-time payloads.
+Clients choose JSON text frames or MessagePack binary frames during the
+handshake; each outgoing message is encoded at most once per format.
+Compression is left to the server: uvicorn negotiates permessage-deflate
+with clients that offer it unless started with ws_per_message_deflate=False.
+"""
+
+import json
+import logging
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class FrameFormat(str, Enum):
+    """Wire formats a WebSocket client can negotiate."""
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+# Sec-WebSocket-Protocol values offered by clients, in server preference order
+SUBPROTOCOLS: Dict[str, FrameFormat] = {
+    "goldleaves.msgpack.v1": FrameFormat.MSGPACK,
+    "goldleaves.json.v1": FrameFormat.JSON,
+}
+
+def msgpack_available() -> bool:
+    """Check whether binary framing can be offered."""
+    return msgpack is not None
+
+
+def _default(value: Any) -> Any:
+    """Serialize values json/msgpack do not handle natively."""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def encode_frame(message: Dict[str, Any], fmt: FrameFormat) -> Union[str, bytes]:
+    """Encode a message for the given wire format."""
+    if fmt == FrameFormat.MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.packb(message, default=_default, use_bin_type=True)
+    return json.dumps(message, default=_default, separators=(",", ":"))
+
+
+def decode_frame(data: Union[str, bytes], fmt: FrameFormat) -> Dict[str, Any]:
+    """Decode a frame received from a client."""
+    if fmt == FrameFormat.MSGPACK and isinstance(data, (bytes, bytearray)):
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+def negotiate_frame_format(
+    offered_subprotocols: Iterable[str],
+    requested_format: Optional[str] = None
+) -> Tuple[FrameFormat, Optional[str]]:
+    """
+    Pick the frame format for a new connection.
+    
+    Args:
+        offered_subprotocols: Values of the client's Sec-WebSocket-Protocol header
+        requested_format: Optional ``format`` query parameter, for clients that
+            cannot set subprotocols
+    
+    Returns:
+        The format to use and the subprotocol to echo in ``websocket.accept``
+    """
+    offered = set(offered_subprotocols or ())
+    
+    for subprotocol, fmt in SUBPROTOCOLS.items():
+        if subprotocol in offered:
+            if fmt == FrameFormat.MSGPACK and not msgpack_available():
+                continue
+            return fmt, subprotocol
+    
+    if requested_format == FrameFormat.MSGPACK.value and msgpack_available():
+        return FrameFormat.MSGPACK, None
+    
+    return FrameFormat.JSON, None
+
+
+class EncodedMessage:
+    """An outgoing message that caches its encoding per frame format."""
+    
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self._encoded: Dict[FrameFormat, Union[str, bytes]] = {}
+    
+    def encoded(self, fmt: FrameFormat) -> Union[str, bytes]:
+        """Get the encoded frame, encoding on first use only."""
+        frame = self._encoded.get(fmt)
+        if frame is None:
+            frame = encode_frame(self.message, fmt)
+            self._encoded[fmt] = frame
+        return frame
+    
+    @property
+    def formats_encoded(self) -> int:
+        """Number of distinct encodings produced so far."""
+        return len(self._encoded)
+
+
+async def send_frame(websocket: Any, message: EncodedMessage, fmt: FrameFormat):
+    """Send a message to a WebSocket using the connection's negotiated format."""
+    frame = message.encoded(fmt)
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+async def fan_out(
+    message: Union[EncodedMessage, Dict[str, Any]],
+    targets: Iterable[Tuple[Any, FrameFormat]]
+) -> int:
+    """
+    Send one message to many connections.
+    
+    Args:
+        message: Message to send; encoded at most once per format in use
+        targets: ``(websocket, frame_format)`` pairs
+    
+    Returns:
+        Number of connections the message was delivered to
+    """
+    if not isinstance(message, EncodedMessage):
+        message = EncodedMessage(message)
+    
+    delivered = 0
+    for websocket, fmt in targets:
+        try:
+            await send_frame(websocket, message, fmt)
+            delivered += 1
+        except Exception as e:
+            logger.error(f"Error sending frame: {e}")
+    
+    return delivered
@@ -8,13 +8,17 @@ Provides room-based presence information.
 import asyncio
 import json
 import logging
-from datetime import datetime, timedelta
+import os
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 import redis.asyncio as redis
 
-from .connection_manager import MessageType, connection_manager
+from .broadcaster import FrameType, broadcaster
+from .cache import TTLCache
+from .redis_pool import create_client
+from .sharding import SHARDING_ENABLED, ShardCoordinator
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +31,25 @@ class PresenceStatus(str, Enum):
     OFFLINE = "offline"
 
 
+# Hash fields read back when listing room members
+PRESENCE_FIELDS = ("user_id", "status", "last_seen", "active_rooms", "metadata")
+
+# Sorted set of every non-offline user, scored by last seen
+ONLINE_KEY = "presence:online"
+
+# Minutes without activity before a user is marked offline
+INACTIVE_TIMEOUT_MINUTES = 10
+
+# Upper bounds on presence state kept in memory per process
+MAX_CACHED_USERS = int(os.getenv("REALTIME_MAX_CACHED_USERS", "10000"))
+MAX_CACHED_ROOMS = int(os.getenv("REALTIME_MAX_CACHED_ROOMS", "10000"))
+
+
+def _to_score(value: datetime) -> float:
+    """Convert a naive UTC datetime to a sorted-set score."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
 class UserPresence:
     """Represents a user's presence information."""
     
@@ -50,10 +73,20 @@ class UserPresence:
             "user_id": self.user_id,
             "status": self.status.value,
             "last_seen": self.last_seen.isoformat(),
-            "active_rooms": List[Any](self.active_rooms),
+            "active_rooms": list(self.active_rooms),
             "metadata": self.metadata
         }
     
+    def to_redis_hash(self) -> Dict[str, str]:
+        """Convert to a flat mapping suitable for a Redis hash."""
+        return {
+            "user_id": self.user_id,
+            "status": self.status.value,
+            "last_seen": self.last_seen.isoformat(),
+            "active_rooms": json.dumps(list(self.active_rooms)),
+            "metadata": json.dumps(self.metadata)
+        }
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "UserPresence":
         """Create from dictionary."""
@@ -65,6 +98,22 @@ class UserPresence:
             metadata=data.get("metadata", {})
         )
     
+    @classmethod
+    def from_redis_hash(cls, data: Dict[str, str]) -> "UserPresence":
+        """Create from a Redis hash mapping."""
+        return cls(
+            user_id=data["user_id"],
+            status=PresenceStatus(data["status"]),
+            last_seen=datetime.fromisoformat(data["last_seen"]),
+            active_rooms=set(json.loads(data.get("active_rooms") or "[]")),
+            metadata=json.loads(data.get("metadata") or "{}")
+        )
+    
+    @property
+    def score(self) -> float:
+        """Last seen as a Unix timestamp, used as the sorted-set score."""
+        return _to_score(self.last_seen)
+    
     def update_activity(self):
         """Update last seen timestamp."""
         self.last_seen = datetime.utcnow()
@@ -91,25 +140,42 @@ class UserPresence:
 class PresenceTracker:
     """Manages user presence across the application."""
     
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379",
+        max_cached_users: int = MAX_CACHED_USERS,
+        max_cached_rooms: int = MAX_CACHED_ROOMS,
+        sharding: Optional[ShardCoordinator] = None
+    ):
         self.redis_url = redis_url
         self.redis_client: Optional[redis.Redis] = None
-        self._presence_cache: Dict[str, UserPresence] = {}
-        self._room_members: Dict[str, Set[str]] = {}
+        # When set, room rosters are aggregated by the room's owner node
+        self.sharding = sharding
+        # Entries expire once a user has been idle for the inactivity timeout
+        self._presence_cache = TTLCache(
+            max_entries=max_cached_users,
+            ttl=INACTIVE_TIMEOUT_MINUTES * 60
+        )
+        # room_id -> user_ids, refreshed whenever someone joins
+        self._room_members = TTLCache(
+            max_entries=max_cached_rooms,
+            ttl=timedelta(hours=1).total_seconds()
+        )
         self._cleanup_task: Optional[asyncio.Task] = None
     
-    async def start(self):
+    async def start(self, connection_pool: Optional[redis.ConnectionPool] = None):
         """Initialize the presence tracker."""
         try:
-            self.redis_client = await redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            self.redis_client = await create_client(self.redis_url, connection_pool)
             
             # Start cleanup task
             self._cleanup_task = asyncio.create_task(self._cleanup_inactive_users())
             
+            if self.sharding:
+                self.sharding.load_room_state = self._load_room_roster
+                self.sharding.on_snapshot(self._relay_room_snapshot)
+                await self.sharding.start(self.redis_client)
+            
             logger.info("PresenceTracker started")
             
         except Exception as e:
@@ -121,6 +187,9 @@ class PresenceTracker:
         if self._cleanup_task:
             self._cleanup_task.cancel()
         
+        if self.sharding:
+            await self.sharding.stop()
+        
         if self.redis_client:
             await self.redis_client.close()
         
@@ -137,38 +206,78 @@ class PresenceTracker:
             except Exception as e:
                 logger.error(f"Error in presence cleanup: {e}")
     
-    async def _remove_inactive_users(self, timeout_minutes: int = 10):
+    async def _remove_inactive_users(self, timeout_minutes: int = INACTIVE_TIMEOUT_MINUTES):
         """Remove users who have been inactive for too long."""
-        current_time = datetime.utcnow()
-        inactive_users = []
+        cutoff = datetime.utcnow() - timedelta(minutes=timeout_minutes)
         
-        for user_id, presence in self._presence_cache.items():
-            if current_time - presence.last_seen > timedelta(minutes=timeout_minutes):
-                inactive_users.append(user_id)
+        # Expired entries come off the cache's deadline heap, no scan needed
+        expired = self._presence_cache.pop_expired()
+        
+        if not self.redis_client:
+            for user_id, presence in expired:
+                await self.set_user_offline(user_id, presence)
+            return
+        
+        try:
+            # Only the stale tail of the online index is read, so the cost
+            # depends on how many users expired rather than how many are online
+            inactive_users = await self.redis_client.zrangebyscore(
+                ONLINE_KEY, "-inf", _to_score(cutoff)
+            )
+        except Exception as e:
+            logger.error(f"Error reading inactive users from Redis: {e}")
+            return
         
         for user_id in inactive_users:
             await self.set_user_offline(user_id)
+        
+        try:
+            # Drop entries whose presence hash already expired
+            await self.redis_client.zremrangebyscore(ONLINE_KEY, "-inf", _to_score(cutoff))
+        except Exception as e:
+            logger.error(f"Error expiring online users in Redis: {e}")
     
     async def _get_redis_key(self, user_id: str) -> str:
-        """Get Redis key for user presence."""
-        return f"presence:{user_id}"
+        """Get Redis key for the user presence hash."""
+        return f"presence:user:{user_id}"
     
     async def _get_room_key(self, room_id: str) -> str:
-        """Get Redis key for room members."""
-        return f"room:members:{room_id}"
+        """Get Redis key for the room members sorted set."""
+        return f"room:presence:{room_id}"
     
-    async def _save_to_redis(self, user_id: str, presence: UserPresence):
-        """Save presence to Redis."""
+    async def _save_to_redis(
+        self,
+        user_id: str,
+        presence: UserPresence,
+        left_rooms: Iterable[str] = ()
+    ):
+        """Save presence hash and sorted-set scores to Redis in one round trip."""
         if not self.redis_client:
             return
         
         try:
             key = await self._get_redis_key(user_id)
-            await self.redis_client.setex(
-                key,
-                timedelta(hours=1),  # Expire after 1 hour
-                json.dumps(presence.to_dict())
-            )
+            score = presence.score
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(key, mapping=presence.to_redis_hash())
+            pipe.expire(key, timedelta(hours=1))  # Expire after 1 hour
+            
+            if presence.status == PresenceStatus.OFFLINE:
+                pipe.zrem(ONLINE_KEY, user_id)
+            else:
+                pipe.zadd(ONLINE_KEY, {user_id: score})
+            
+            # Keep the user's score current in every room they are in
+            for room_id in presence.active_rooms:
+                room_key = await self._get_room_key(room_id)
+                pipe.zadd(room_key, {user_id: score})
+                pipe.expire(room_key, timedelta(hours=1))
+            
+            for room_id in left_rooms:
+                pipe.zrem(await self._get_room_key(room_id), user_id)
+            
+            await pipe.execute()
         except Exception as e:
             logger.error(f"Error saving presence to Redis: {e}")
     
@@ -179,14 +288,21 @@ class PresenceTracker:
         
         try:
             key = await self._get_redis_key(user_id)
-            data = await self.redis_client.get(key)
+            data = await self.redis_client.hgetall(key)
             if data:
-                return UserPresence.from_dict(json.loads(data))
+                return UserPresence.from_redis_hash(data)
         except Exception as e:
             logger.error(f"Error loading presence from Redis: {e}")
         
         return None
     
+    def _discard_room_member(self, room_id: str, user_id: str):
+        """Remove a user from the local room membership index."""
+        if room_id in self._room_members:
+            self._room_members[room_id].discard(user_id)
+            if not self._room_members[room_id]:
+                del self._room_members[room_id]
+    
     async def set_user_online(
         self,
         user_id: str,
@@ -213,21 +329,29 @@ class PresenceTracker:
         # Broadcast presence update
         await self._broadcast_presence_update(user_id, presence)
     
-    async def set_user_offline(self, user_id: str):
+    async def set_user_offline(
+        self,
+        user_id: str,
+        presence: Optional[UserPresence] = None
+    ):
         """Set user as offline."""
-        presence = self._presence_cache.get(user_id)
+        if not presence:
+            presence = self._presence_cache.get(user_id)
         if not presence:
             presence = await self._load_from_redis(user_id)
         
         if presence:
             # Remove from all rooms
-            for room_id in list(presence.active_rooms):
-                await self.leave_room(user_id, room_id)
+            left_rooms = list(presence.active_rooms)
+            for room_id in left_rooms:
+                presence.leave_room(room_id)
+                self._discard_room_member(room_id, user_id)
+                await self._broadcast_room_update(room_id, user_id, "left")
             
             presence.status = PresenceStatus.OFFLINE
             presence.update_activity()
             
-            await self._save_to_redis(user_id, presence)
+            await self._save_to_redis(user_id, presence, left_rooms=left_rooms)
             await self._broadcast_presence_update(user_id, presence)
             
             # Remove from cache after a delay
@@ -257,21 +381,15 @@ class PresenceTracker:
             presence = self._presence_cache[user_id]
         
         presence.join_room(room_id)
-        await self._save_to_redis(user_id, presence)
+        self._presence_cache[user_id] = presence
         
         # Update room members
-        if room_id not in self._room_members:
-            self._room_members[room_id] = set()
-        self._room_members[room_id].add(user_id)
+        members = self._room_members.get(room_id) or set()
+        members.add(user_id)
+        self._room_members[room_id] = members
         
-        # Update Redis room members
-        if self.redis_client:
-            try:
-                room_key = await self._get_room_key(room_id)
-                await self.redis_client.sadd(room_key, user_id)
-                await self.redis_client.expire(room_key, timedelta(hours=1))
-            except Exception as e:
-                logger.error(f"Error updating room members in Redis: {e}")
+        # Adds the user to the room sorted set as well
+        await self._save_to_redis(user_id, presence)
         
         # Broadcast to room
         await self._broadcast_room_update(room_id, user_id, "joined")
@@ -279,21 +397,17 @@ class PresenceTracker:
     async def leave_room(self, user_id: str, room_id: str):
         """Remove user from a room."""
         presence = self._presence_cache.get(user_id)
-        if presence:
-            presence.leave_room(room_id)
-            await self._save_to_redis(user_id, presence)
         
         # Update room members
-        if room_id in self._room_members:
-            self._room_members[room_id].discard(user_id)
-            if not self._room_members[room_id]:
-                del self._room_members[room_id]
+        self._discard_room_member(room_id, user_id)
         
-        # Update Redis room members
-        if self.redis_client:
+        if presence:
+            presence.leave_room(room_id)
+            await self._save_to_redis(user_id, presence, left_rooms=[room_id])
+        elif self.redis_client:
             try:
                 room_key = await self._get_room_key(room_id)
-                await self.redis_client.srem(room_key, user_id)
+                await self.redis_client.zrem(room_key, user_id)
             except Exception as e:
                 logger.error(f"Error removing from room in Redis: {e}")
         
@@ -310,29 +424,59 @@ class PresenceTracker:
         
         return presence
     
-    async def get_room_members(self, room_id: str) -> List[Dict[str, Any]]:
-        """Get all members in a room with their presence."""
-        members = []
-        
-        # Get from cache first
-        user_ids = self._room_members.get(room_id, set())
-        
-        # Also check Redis if available
+    async def get_room_members(
+        self,
+        room_id: str,
+        timeout_minutes: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Get all active members in a room with their presence."""
         if self.redis_client:
             try:
-                room_key = await self._get_room_key(room_id)
-                redis_members = await self.redis_client.smembers(room_key)
-                user_ids.update(redis_members)
+                return await self._get_room_members_from_redis(room_id, timeout_minutes)
             except Exception as e:
                 logger.error(f"Error getting room members from Redis: {e}")
         
-        for user_id in user_ids:
+        members = []
+        for user_id in list(self._room_members.get(room_id, ())):
             presence = await self.get_user_presence(user_id)
-            if presence and presence.is_active():
+            if presence and presence.is_active(timeout_minutes):
                 members.append(presence.to_dict())
         
         return members
     
+    async def _get_room_members_from_redis(
+        self,
+        room_id: str,
+        timeout_minutes: int
+    ) -> List[Dict[str, Any]]:
+        """Read a room roster with one ZRANGEBYSCORE and one pipelined HMGET."""
+        room_key = await self._get_room_key(room_id)
+        now = datetime.utcnow()
+        expired_before = _to_score(now - timedelta(minutes=INACTIVE_TIMEOUT_MINUTES))
+        active_since = _to_score(now - timedelta(minutes=timeout_minutes))
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zremrangebyscore(room_key, "-inf", expired_before)
+        pipe.zrangebyscore(room_key, active_since, "+inf")
+        _, user_ids = await pipe.execute()
+        
+        if not user_ids:
+            return []
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hmget(await self._get_redis_key(user_id), PRESENCE_FIELDS)
+        rows = await pipe.execute()
+        
+        members = []
+        for values in rows:
+            data = dict(zip(PRESENCE_FIELDS, values))
+            if not data["user_id"] or data["status"] == PresenceStatus.OFFLINE.value:
+                continue
+            members.append(UserPresence.from_redis_hash(data).to_dict())
+        
+        return members
+    
     async def get_online_users(self) -> List[Dict[str, Any]]:
         """Get all online users."""
         online_users = []
@@ -353,25 +497,41 @@ class PresenceTracker:
         }
         
         # Broadcast to all rooms the user is in
-        for room_id in presence.active_rooms:
-            await connection_manager.broadcast_to_room(
+        for room_id in list(presence.active_rooms):
+            if self._is_sharded():
+                await self.sharding.submit_room_event(room_id, {
+                    "user_id": user_id,
+                    "action": "status",
+                    "status": presence.status.value
+                })
+                continue
+            await broadcaster.send_to_room(
                 room_id,
-                MessageType.PRESENCE_UPDATE,
+                FrameType.PRESENCE_UPDATE,
                 presence_data
             )
         
         # Also send to user's personal channel
-        await connection_manager.send_to_user(
-            user_id,
-            MessageType.PRESENCE_UPDATE,
+        await broadcaster.send_to_users(
+            [user_id],
+            FrameType.PRESENCE_UPDATE,
             presence_data
         )
     
     async def _broadcast_room_update(self, room_id: str, user_id: str, action: str):
         """Broadcast room membership update."""
-        await connection_manager.broadcast_to_room(
+        if self._is_sharded():
+            # Relay the owner's snapshots only while a local user is in the room
+            if action == "joined":
+                await self.sharding.track_room(room_id, user_id)
+            else:
+                await self.sharding.untrack_room(room_id, user_id)
+            await self.sharding.submit_room_event(room_id, {"user_id": user_id, "action": action})
+            return
+        
+        await broadcaster.send_to_room(
             room_id,
-            MessageType.ROOM_UPDATE,
+            FrameType.ROOM_UPDATE,
             {
                 "room_id": room_id,
                 "user_id": user_id,
@@ -379,7 +539,26 @@ class PresenceTracker:
                 "timestamp": datetime.utcnow().isoformat()
             }
         )
+    
+    def _is_sharded(self) -> bool:
+        """Check whether room updates go through the owning node."""
+        return self.sharding is not None and self.sharding.is_active()
+    
+    async def _load_room_roster(self, room_id: str) -> Dict[str, str]:
+        """Load a room's roster when this node becomes its owner."""
+        members = await self._get_room_members_from_redis(room_id, INACTIVE_TIMEOUT_MINUTES)
+        return {member["user_id"]: member["status"] for member in members}
+    
+    async def _relay_room_snapshot(self, room_id: str, snapshot: Dict[str, Any]):
+        """Forward an owner's room snapshot to this node's connections."""
+        await broadcaster.send_to_room(
+            room_id,
+            FrameType.ROOM_UPDATE,
+            snapshot
+        )
 
 
 # Global presence tracker instance
-presence_tracker = PresenceTracker()
+presence_tracker = PresenceTracker(
+    sharding=ShardCoordinator() if SHARDING_ENABLED else None
+)
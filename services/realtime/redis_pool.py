@@ -0,0 +1,62 @@
+# services/realtime/redis_pool.py
+"""
+Shared Redis connections for real-time services.
+The service manager owns one connection pool per process and injects it
+into every service instead of each service opening its own.
+
+Some connections are held for the life of the process rather than per
+command: the pub/sub subscriptions of the broadcaster, the presence
+tracker and room sharding, and the activity consumer's blocking
+XREADGROUP. The pool is a blocking pool, so when every connection is in
+use a command waits for one to come back instead of failing with
+MaxConnectionsError.
+"""
+
+import os
+from typing import Optional
+
+import redis.asyncio as redis
+
+DEFAULT_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+# Upper bound on sockets the shared pool may open, including the four
+# long-lived pub/sub and blocking-read connections
+MAX_CONNECTIONS = int(os.getenv("REALTIME_REDIS_MAX_CONNECTIONS", "50"))
+
+# Seconds a command waits for a free connection before raising
+POOL_TIMEOUT = float(os.getenv("REALTIME_REDIS_POOL_TIMEOUT", "5"))
+
+
+def create_pool(
+    redis_url: Optional[str] = None,
+    max_connections: int = MAX_CONNECTIONS,
+    timeout: float = POOL_TIMEOUT
+) -> redis.BlockingConnectionPool:
+    """Create the connection pool shared by the real-time services."""
+    return redis.BlockingConnectionPool.from_url(
+        redis_url or DEFAULT_REDIS_URL,
+        encoding="utf-8",
+        decode_responses=True,
+        max_connections=max_connections,
+        timeout=timeout
+    )
+
+
+async def create_client(
+    redis_url: str,
+    connection_pool: Optional[redis.ConnectionPool] = None
+) -> redis.Redis:
+    """
+    Create a Redis client for a service.
+    
+    Clients built on an injected pool do not close it when the service
+    stops; the pool's owner disconnects it.
+    """
+    if connection_pool is not None:
+        return redis.Redis(connection_pool=connection_pool)
+    
+    return await redis.from_url(
+        redis_url,
+        encoding="utf-8",
+        decode_responses=True
+    )
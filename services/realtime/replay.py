@@ -0,0 +1,224 @@
+# services/realtime/replay.py
+"""
+Per-room replay buffer for resumable subscriptions.
+Every room broadcast gets a monotonically increasing sequence number and is
+kept in a bounded in-memory ring backed by a capped Redis Stream, so a
+client reconnecting with ``last_seq`` receives only the frames it missed.
+When Redis is attached it alone assigns sequence numbers; a frame it could
+not sequence is sent without one and resumes across it need a refetch.
+"""
+
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per room, in memory and in the backing stream
+REPLAY_BUFFER_SIZE = int(os.getenv("REALTIME_REPLAY_BUFFER_SIZE", "500"))
+
+# Seconds a quiet room's stream and sequence counter are kept in Redis
+REPLAY_TTL_SECONDS = int(os.getenv("REALTIME_REPLAY_TTL_SECONDS", "3600"))
+
+# Upper bound on rooms buffered in memory per process
+MAX_REPLAY_ROOMS = int(os.getenv("REALTIME_MAX_REPLAY_ROOMS", "10000"))
+
+# Allocates the next sequence number and stores the frame under it as one
+# atomic step, so concurrent nodes never append out of order
+APPEND_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], seq .. '-0', 'frame', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+
+def _seq_key(room_id: str) -> str:
+    return f"replay:seq:{room_id}"
+
+
+def _stream_key(room_id: str) -> str:
+    return f"replay:stream:{room_id}"
+
+
+class RoomReplay:
+    """In-memory replay state for one room."""
+    
+    def __init__(self, max_frames: int):
+        self.seq = 0
+        self.frames: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=max_frames)
+        # Highest seq known when a frame went out unsequenced; None if never
+        self.unsequenced_after: Optional[int] = None
+    
+    def add(self, seq: int, frame: Dict[str, Any]):
+        """Insert a frame, keeping the ring ordered by sequence."""
+        self.seq = max(self.seq, seq)
+        
+        if not self.frames or seq > self.frames[-1][0]:
+            self.frames.append((seq, frame))
+            return
+        
+        # Frames relayed from other nodes can arrive slightly out of order
+        for index in range(len(self.frames) - 1, -1, -1):
+            existing = self.frames[index][0]
+            if existing == seq:
+                return
+            if existing < seq:
+                if len(self.frames) < self.frames.maxlen:
+                    self.frames.insert(index + 1, (seq, frame))
+                return
+        if len(self.frames) < self.frames.maxlen:
+            self.frames.appendleft((seq, frame))
+    
+    def since(self, last_seq: int, current_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Frames after last_seq, or None if the ring does not cover them all."""
+        frames = [frame for seq, frame in self.frames if seq > last_seq]
+        expected = current_seq - last_seq
+        if len(frames) != expected:
+            return None
+        if frames and frames[0]["seq"] != last_seq + 1:
+            return None
+        return frames
+
+
+class ReplayBuffer:
+    """Assigns room sequence numbers and serves missed frames on resume."""
+    
+    def __init__(
+        self,
+        max_frames: int = REPLAY_BUFFER_SIZE,
+        max_rooms: int = MAX_REPLAY_ROOMS,
+        ttl_seconds: int = REPLAY_TTL_SECONDS
+    ):
+        self.max_frames = max_frames
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = None
+        self._append_script = None
+        self._rooms = TTLCache(max_entries=max_rooms, ttl=ttl_seconds)
+    
+    def attach(self, redis_client):
+        """Back the buffer with Redis; None reverts to in-memory only."""
+        self.redis_client = redis_client
+        self._append_script = redis_client.register_script(APPEND_SCRIPT) if redis_client else None
+    
+    def _room(self, room_id: str) -> RoomReplay:
+        room = self._rooms.get(room_id)
+        if room is None:
+            room = RoomReplay(self.max_frames)
+        # Re-set to refresh the room's idle deadline
+        self._rooms[room_id] = room
+        return room
+    
+    async def append(self, room_id: str, message: Dict[str, Any]) -> Optional[int]:
+        """
+        Assign the next sequence number to a room frame and store it.
+        
+        Returns None when Redis could not sequence the frame. Other nodes
+        share the Redis counter, so a locally chosen number could collide
+        with theirs; the frame is sent unsequenced instead and the room is
+        marked so resumes from before it report ``complete=False``.
+        """
+        room = self._room(room_id)
+        
+        if self._append_script is not None:
+            try:
+                seq = int(await self._append_script(
+                    keys=[_seq_key(room_id), _stream_key(room_id)],
+                    args=[json.dumps(message), self.max_frames, self.ttl_seconds]
+                ))
+                room.add(seq, {**message, "seq": seq})
+                return seq
+            except Exception as e:
+                logger.error(f"Error appending to replay stream: {e}")
+                room.unsequenced_after = room.seq
+                return None
+        
+        seq = room.seq + 1
+        room.add(seq, {**message, "seq": seq})
+        return seq
+    
+    def remember(self, room_id: str, message: Dict[str, Any]):
+        """Keep a sequenced frame published by another node."""
+        room = self._room(room_id)
+        seq = message.get("seq")
+        if seq is None:
+            room.unsequenced_after = room.seq
+        else:
+            room.add(int(seq), message)
+    
+    async def current_seq(self, room_id: str) -> int:
+        """Latest sequence number assigned in a room."""
+        if self.redis_client:
+            try:
+                value = await self.redis_client.get(_seq_key(room_id))
+                return int(value or 0)
+            except Exception as e:
+                logger.error(f"Error reading replay sequence: {e}")
+        
+        room = self._rooms.get(room_id)
+        return room.seq if room else 0
+    
+    async def since(self, room_id: str, last_seq: int) -> Dict[str, Any]:
+        """
+        Get the frames a client missed since last_seq.
+        
+        Returns a dict with the room's current ``seq``, the missed ``frames``
+        in order, and ``complete``; when ``complete`` is False the frames have
+        already been trimmed and the client must refetch full state.
+        """
+        current = await self.current_seq(room_id)
+        result = {"room_id": room_id, "seq": current, "frames": [], "complete": True}
+        
+        if last_seq >= current:
+            # Nothing missed, unless the counter was lost and restarted
+            result["complete"] = last_seq == current
+            return result
+        
+        room = self._rooms.get(room_id)
+        gap = room.unsequenced_after if room else None
+        if gap is not None and last_seq <= gap:
+            # An unsequenced frame may have gone out after the client's position
+            result["complete"] = False
+            return result
+        
+        frames = room.since(last_seq, current) if room else None
+        
+        if frames is None and self.redis_client:
+            frames = await self._since_from_redis(room_id, last_seq, current)
+        
+        if frames is None:
+            result["complete"] = False
+        else:
+            result["frames"] = frames
+        return result
+    
+    async def _since_from_redis(
+        self,
+        room_id: str,
+        last_seq: int,
+        current: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Read missed frames from the backing stream."""
+        try:
+            entries = await self.redis_client.xrange(
+                _stream_key(room_id),
+                min=f"{last_seq + 1}-0",
+                max=f"{current}-0"
+            )
+        except Exception as e:
+            logger.error(f"Error reading replay stream: {e}")
+            return None
+        
+        if not entries or entries[0][0] != f"{last_seq + 1}-0":
+            return None  # Trimmed past the client's position
+        
+        frames = []
+        for entry_id, fields in entries:
+            seq = int(entry_id.split("-", 1)[0])
+            frames.append({**json.loads(fields["frame"]), "seq": seq})
+        return frames
@@ -8,14 +8,24 @@ Provides session persistence across browser refreshes.
 import asyncio
 import json
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
 import redis.asyncio as redis
 
+from .cache import TTLCache
+from .redis_pool import create_client
+
 logger = logging.getLogger(__name__)
 
+# Lifetime of session keys in Redis, refreshed on every activity update
+SESSION_TTL = timedelta(hours=24)
+
+# Upper bound on sessions kept in memory per process
+MAX_CACHED_SESSIONS = int(os.getenv("REALTIME_MAX_CACHED_SESSIONS", "10000"))
+
 
 class UserSession:
     """Represents a user session with preferences and activity."""
@@ -82,21 +92,29 @@ class UserSession:
 class SessionStore:
     """Manages user sessions with Redis backing."""
     
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379",
+        max_cached_sessions: int = MAX_CACHED_SESSIONS
+    ):
         self.redis_url = redis_url
         self.redis_client: Optional[redis.Redis] = None
-        self._session_cache: Dict[str, UserSession] = {}
-        self._user_sessions: Dict[str, List[str]] = {}  # user_id -> session_ids
+        self._session_cache = TTLCache(
+            max_entries=max_cached_sessions,
+            ttl=SESSION_TTL.total_seconds(),
+            on_evict=self._forget_session
+        )
+        # user_id -> session_ids
+        self._user_sessions = TTLCache(
+            max_entries=max_cached_sessions,
+            ttl=SESSION_TTL.total_seconds()
+        )
         self._cleanup_task: Optional[asyncio.Task] = None
     
-    async def start(self):
+    async def start(self, connection_pool: Optional[redis.ConnectionPool] = None):
         """Initialize the session store."""
         try:
-            self.redis_client = await redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            self.redis_client = await create_client(self.redis_url, connection_pool)
             
             # Start cleanup task
             self._cleanup_task = asyncio.create_task(self._cleanup_expired_sessions())
@@ -129,45 +147,88 @@ class SessionStore:
                 logger.error(f"Error in session cleanup: {e}")
     
     async def _remove_expired_sessions(self):
-        """Remove expired sessions."""
-        expired_sessions = []
-        
-        for session_id, session in self._session_cache.items():
-            if session.is_expired():
-                expired_sessions.append(session_id)
+        """Drop locally cached sessions whose TTL has passed."""
+        expired_sessions = self._session_cache.pop_expired()
+        self._user_sessions.pop_expired()
         
-        for session_id in expired_sessions:
-            await self.delete_session(session_id)
+        if expired_sessions:
+            logger.debug(f"Expired {len(expired_sessions)} cached sessions")
+    
+    def _forget_session(self, session_id: str, session: UserSession):
+        """Remove an evicted session from the user sessions mapping."""
+        session_ids = self._user_sessions.get(session.user_id)
+        if session_ids and session_id in session_ids:
+            session_ids.remove(session_id)
+            if not session_ids:
+                del self._user_sessions[session.user_id]
     
     async def _get_session_key(self, session_id: str) -> str:
         """Get Redis key for session."""
         return f"session:{session_id}"
     
+    async def _get_activity_key(self, session_id: str) -> str:
+        """Get Redis key for the session's last activity timestamp."""
+        return f"session:{session_id}:activity"
+    
     async def _get_user_sessions_key(self, user_id: str) -> str:
         """Get Redis key for user sessions."""
         return f"user_sessions:{user_id}"
     
     async def _save_to_redis(self, session: UserSession):
-        """Save session to Redis."""
+        """Save the full session to Redis in a single transaction."""
         if not self.redis_client:
             return
         
         try:
             session_key = await self._get_session_key(session.session_id)
-            await self.redis_client.setex(
-                session_key,
-                timedelta(hours=24),
-                json.dumps(session.to_dict())
-            )
+            activity_key = await self._get_activity_key(session.session_id)
+            user_sessions_key = await self._get_user_sessions_key(session.user_id)
+            
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.setex(session_key, SESSION_TTL, json.dumps(session.to_dict()))
+            pipe.setex(activity_key, SESSION_TTL, session.last_activity.isoformat())
             
             # Update user sessions list
-            user_sessions_key = await self._get_user_sessions_key(session.user_id)
-            await self.redis_client.sadd(user_sessions_key, session.session_id)
-            await self.redis_client.expire(user_sessions_key, timedelta(hours=24))
+            pipe.sadd(user_sessions_key, session.session_id)
+            pipe.expire(user_sessions_key, SESSION_TTL)
+            await pipe.execute()
             
         except Exception as e:
             logger.error(f"Error saving session to Redis: {e}")
     
+    async def _touch_in_redis(self, session: UserSession):
+        """Record session activity without rewriting the session blob."""
+        if not self.redis_client:
+            return
+        
+        try:
+            session_key = await self._get_session_key(session.session_id)
+            activity_key = await self._get_activity_key(session.session_id)
+            user_sessions_key = await self._get_user_sessions_key(session.user_id)
+            
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.setex(activity_key, SESSION_TTL, session.last_activity.isoformat())
+            pipe.expire(session_key, SESSION_TTL)
+            pipe.expire(user_sessions_key, SESSION_TTL)
+            await pipe.execute()
+            
+        except Exception as e:
+            logger.error(f"Error touching session in Redis: {e}")
+    
+    def _decode_session(
+        self,
+        data: Optional[str],
+        last_activity: Optional[str]
+    ) -> Optional[UserSession]:
+        """Build a session from its blob and separately stored activity timestamp."""
+        if not data:
+            return None
+        
+        session = UserSession.from_dict(json.loads(data))
+        if last_activity:
+            session.last_activity = datetime.fromisoformat(last_activity)
+        return session
+    
     async def _load_from_redis(self, session_id: str) -> Optional[UserSession]:
         """Load session from Redis."""
         if not self.redis_client:
@@ -175,14 +236,46 @@ class SessionStore:
         
         try:
             session_key = await self._get_session_key(session_id)
-            data = await self.redis_client.get(session_key)
-            if data:
-                return UserSession.from_dict(json.loads(data))
+            activity_key = await self._get_activity_key(session_id)
+            data, last_activity = await self.redis_client.mget(session_key, activity_key)
+            return self._decode_session(data, last_activity)
         except Exception as e:
             logger.error(f"Error loading session from Redis: {e}")
         
         return None
     
+    async def _load_many_from_redis(self, session_ids: List[str]) -> Dict[str, UserSession]:
+        """Load several sessions from Redis with a single MGET."""
+        if not self.redis_client or not session_ids:
+            return {}
+        
+        try:
+            keys = []
+            for session_id in session_ids:
+                keys.append(await self._get_session_key(session_id))
+                keys.append(await self._get_activity_key(session_id))
+            values = await self.redis_client.mget(keys)
+        except Exception as e:
+            logger.error(f"Error loading sessions from Redis: {e}")
+            return {}
+        
+        sessions = {}
+        for index, session_id in enumerate(session_ids):
+            session = self._decode_session(values[2 * index], values[2 * index + 1])
+            if session:
+                sessions[session_id] = session
+        return sessions
+    
+    def _cache_session(self, session: UserSession):
+        """Add a session loaded from Redis to the local cache and user mapping."""
+        self._session_cache[session.session_id] = session
+        
+        # Update user sessions mapping
+        if session.user_id not in self._user_sessions:
+            self._user_sessions[session.user_id] = []
+        if session.session_id not in self._user_sessions[session.user_id]:
+            self._user_sessions[session.user_id].append(session.session_id)
+    
     async def create_session(
         self,
         user_id: str,
@@ -222,22 +315,34 @@ class SessionStore:
         # Load from Redis
         session = await self._load_from_redis(session_id)
         if session:
-            self._session_cache[session_id] = session
-            
-            # Update user sessions mapping
-            if session.user_id not in self._user_sessions:
-                self._user_sessions[session.user_id] = []
-            if session_id not in self._user_sessions[session.user_id]:
-                self._user_sessions[session.user_id].append(session_id)
+            self._cache_session(session)
         
         return session
     
+    async def get_sessions(self, session_ids: List[str]) -> List[UserSession]:
+        """Get several sessions by ID, loading cache misses with one MGET."""
+        missing = [
+            session_id for session_id in dict.fromkeys(session_ids)
+            if session_id not in self._session_cache
+        ]
+        
+        for session in (await self._load_many_from_redis(missing)).values():
+            self._cache_session(session)
+        
+        sessions = []
+        for session_id in dict.fromkeys(session_ids):
+            session = self._session_cache.get(session_id)
+            if session:
+                sessions.append(session)
+        return sessions
+    
     async def update_session_activity(self, session_id: str):
         """Update session last activity."""
         session = await self.get_session(session_id)
         if session:
             session.update_activity()
-            await self._save_to_redis(session)
+            self._session_cache.touch(session_id)
+            await self._touch_in_redis(session)
     
     async def update_session_preferences(
         self,
@@ -290,10 +395,13 @@ class SessionStore:
         if self.redis_client:
             try:
                 session_key = await self._get_session_key(session_id)
-                await self.redis_client.delete(session_key)
-                
+                activity_key = await self._get_activity_key(session_id)
                 user_sessions_key = await self._get_user_sessions_key(user_id)
-                await self.redis_client.srem(user_sessions_key, session_id)
+                
+                pipe = self.redis_client.pipeline(transaction=True)
+                pipe.delete(session_key, activity_key)
+                pipe.srem(user_sessions_key, session_id)
+                await pipe.execute()
                 
             except Exception as e:
                 logger.error(f"Error deleting session from Redis: {e}")
@@ -303,10 +411,8 @@ class SessionStore:
     
     async def get_user_sessions(self, user_id: str) -> List[UserSession]:
         """Get all sessions for a user."""
-        sessions = []
-        
         # Get session IDs from mapping
-        session_ids = self._user_sessions.get(user_id, [])
+        session_ids = list(self._user_sessions.get(user_id, []))
         
         # Also check Redis
         if self.redis_client:
@@ -314,17 +420,12 @@ class SessionStore:
                 user_sessions_key = await self._get_user_sessions_key(user_id)
                 redis_session_ids = await self.redis_client.smembers(user_sessions_key)
                 session_ids.extend(redis_session_ids)
-                session_ids = list(set(session_ids))  # Remove duplicates
             except Exception as e:
                 logger.error(f"Error getting user sessions from Redis: {e}")
         
         # Load sessions
-        for session_id in session_ids:
-            session = await self.get_session(session_id)
-            if session and not session.is_expired():
-                sessions.append(session)
-        
-        return sessions
+        sessions = await self.get_sessions(session_ids)
+        return [session for session in sessions if not session.is_expired()]
     
     async def cleanup_user_sessions(self, user_id: str, keep_latest: int = 5):
         """Clean up old sessions for a user, keeping only the most recent."""
@@ -355,6 +456,7 @@ class SessionStore:
             "total_sessions": total_sessions,
             "active_users": active_users,
             "recent_sessions": recent_sessions,
+            "cache": self._session_cache.stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
 
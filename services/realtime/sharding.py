@@ -0,0 +1,348 @@
+# services/realtime/sharding.py
+"""
+Consistent-hash room ownership for horizontally scaled realtime nodes.
+Nodes discover each other through Redis heartbeats; each room is owned by
+one node, which aggregates its presence and publishes compact snapshots
+that the other nodes relay to their local connections.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from uuid import uuid4
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Opt-in switch for sharded room ownership
+SHARDING_ENABLED = os.getenv("REALTIME_SHARDING_ENABLED", "false").lower() == "true"
+
+# Sorted set of live nodes scored by last heartbeat
+NODES_KEY = "realtime:nodes"
+
+# Owner -> all nodes: compact room snapshots
+ROOM_CHANNEL_PREFIX = "realtime:room:"
+
+# Any node -> owner: room membership events
+NODE_CHANNEL_PREFIX = "realtime:node:"
+
+# Publishes of one event between nodes: the original send plus one forward
+# when ownership moved; ring views that disagree during a rebalance would
+# otherwise bounce the event between two nodes forever
+MAX_EVENT_HOPS = 2
+
+
+def _hash(key: str) -> int:
+    """Stable 64-bit hash used to place nodes and rooms on the ring."""
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes."""
+    
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 128):
+        self.replicas = replicas
+        self.nodes: Set[str] = set()
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self.rebuild(nodes)
+    
+    def rebuild(self, nodes: Iterable[str]):
+        """Replace the node set and recompute the ring."""
+        self.nodes = set(nodes)
+        ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(self.replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+    
+    def owner(self, key: str) -> Optional[str]:
+        """Get the node that owns a key, or None if the ring is empty."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class ShardCoordinator:
+    """Tracks live nodes and routes room events to the owning node."""
+    
+    def __init__(
+        self,
+        node_id: Optional[str] = None,
+        heartbeat_interval: float = 5.0,
+        node_timeout: float = 15.0,
+        snapshot_interval: float = 0.1,
+        replicas: int = 128,
+        max_rooms: int = 10000
+    ):
+        self.node_id = node_id or f"{socket.gethostname()}-{uuid4().hex[:8]}"
+        self.heartbeat_interval = heartbeat_interval
+        self.node_timeout = node_timeout
+        self.snapshot_interval = snapshot_interval
+        self.ring = HashRing(replicas=replicas)
+        self.redis_client = None
+        
+        # Loads a room's roster (user_id -> status) when this node takes it over
+        self.load_room_state: Optional[Callable[[str], Awaitable[Dict[str, str]]]] = None
+        
+        self._room_state = TTLCache(max_entries=max_rooms, ttl=3600)
+        self._dirty_rooms: Set[str] = set()
+        self._relayed_rooms: Dict[str, Set[str]] = {}  # room_id -> local user_ids
+        self._snapshot_handlers: List[Callable] = []
+        self._pubsub = None
+        self._tasks: List[asyncio.Task] = []
+    
+    @property
+    def node_channel(self) -> str:
+        return f"{NODE_CHANNEL_PREFIX}{self.node_id}"
+    
+    def is_active(self) -> bool:
+        """Check whether the coordinator is connected to Redis."""
+        return self.redis_client is not None
+    
+    def owner_of(self, room_id: str) -> str:
+        """Get the node that owns a room."""
+        return self.ring.owner(room_id) or self.node_id
+    
+    def is_owner(self, room_id: str) -> bool:
+        """Check whether this node owns a room."""
+        return self.owner_of(room_id) == self.node_id
+    
+    def on_snapshot(self, handler: Callable):
+        """Register a handler called with (room_id, snapshot) for relayed rooms."""
+        self._snapshot_handlers.append(handler)
+        return handler
+    
+    async def start(self, redis_client):
+        """Join the node set and start heartbeats, routing and snapshot flushing."""
+        self.redis_client = redis_client
+        await self._heartbeat()
+        
+        self._pubsub = redis_client.pubsub()
+        await self._pubsub.subscribe(self.node_channel)
+        
+        self._tasks = [
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._flush_loop())
+        ]
+        logger.info(f"ShardCoordinator started as {self.node_id}")
+    
+    async def stop(self):
+        """Leave the node set so rooms rebalance to the remaining nodes."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        
+        if self.redis_client:
+            try:
+                await self.redis_client.zrem(NODES_KEY, self.node_id)
+                if self._pubsub:
+                    await self._pubsub.close()
+            except Exception as e:
+                logger.error(f"Error leaving node set: {e}")
+        
+        self.redis_client = None
+        self._pubsub = None
+        logger.info(f"ShardCoordinator {self.node_id} stopped")
+    
+    async def _heartbeat_loop(self):
+        """Background task that refreshes this node's heartbeat."""
+        while True:
+            try:
+                await asyncio.sleep(self.heartbeat_interval)
+                await self._heartbeat()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in shard heartbeat: {e}")
+    
+    async def _heartbeat(self):
+        """Record a heartbeat, expire dead nodes and refresh the ring."""
+        now = time.time()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zadd(NODES_KEY, {self.node_id: now})
+        pipe.zremrangebyscore(NODES_KEY, "-inf", now - self.node_timeout)
+        pipe.zrange(NODES_KEY, 0, -1)
+        *_, nodes = await pipe.execute()
+        self._update_ring(nodes)
+    
+    def _update_ring(self, nodes: Iterable[str]):
+        """Rebuild the ring on membership change and drop rooms no longer owned."""
+        nodes = set(nodes) | {self.node_id}
+        if nodes == self.ring.nodes:
+            return
+        
+        joined = nodes - self.ring.nodes
+        left = self.ring.nodes - nodes
+        self.ring.rebuild(nodes)
+        
+        # The new owner rebuilds state from Redis on its first event
+        released = [room_id for room_id in self._room_state.keys() if not self.is_owner(room_id)]
+        for room_id in released:
+            self._room_state.pop(room_id, None)
+            self._dirty_rooms.discard(room_id)
+        
+        logger.info(
+            f"Realtime ring rebalanced: {len(nodes)} nodes "
+            f"(+{len(joined)} -{len(left)}), released {len(released)} rooms"
+        )
+    
+    async def track_room(self, room_id: str, user_id: str):
+        """Start relaying a room's snapshots while a local user is in it."""
+        local_members = self._relayed_rooms.setdefault(room_id, set())
+        first = not local_members
+        local_members.add(user_id)
+        if first and self._pubsub:
+            await self._pubsub.subscribe(f"{ROOM_CHANNEL_PREFIX}{room_id}")
+    
+    async def untrack_room(self, room_id: str, user_id: str):
+        """Stop relaying a room once its last local member has left."""
+        local_members = self._relayed_rooms.get(room_id)
+        if local_members is None:
+            return
+        local_members.discard(user_id)
+        if not local_members:
+            del self._relayed_rooms[room_id]
+            if self._pubsub:
+                await self._pubsub.unsubscribe(f"{ROOM_CHANNEL_PREFIX}{room_id}")
+    
+    async def submit_room_event(self, room_id: str, event: Dict[str, Any], hops: int = 0):
+        """
+        Route a membership or status event to the room's owner.
+        
+        ``hops`` counts the publishes the event has already been through.
+        """
+        owner = self.owner_of(room_id)
+        if owner == self.node_id or not self.redis_client:
+            await self._apply_event(room_id, event)
+            return
+        
+        await self.redis_client.publish(
+            f"{NODE_CHANNEL_PREFIX}{owner}",
+            json.dumps({"room_id": room_id, "event": event, "hops": hops + 1})
+        )
+    
+    async def _receive_room_event(self, payload: Dict[str, Any]):
+        """Apply an event routed to this node, forwarding it once if ownership moved."""
+        room_id = payload["room_id"]
+        if self.is_owner(room_id):
+            await self._apply_event(room_id, payload["event"])
+            return
+        
+        # Nodes without the hop count only ever send directly
+        hops = payload.get("hops", 1)
+        if hops >= MAX_EVENT_HOPS:
+            logger.warning(
+                f"Dropping event for {room_id} after {hops} hops; "
+                f"nodes disagree on its owner ({self.owner_of(room_id)})"
+            )
+            return
+        await self.submit_room_event(room_id, payload["event"], hops)
+    
+    async def _apply_event(self, room_id: str, event: Dict[str, Any]):
+        """Fold an event into the owned room's state and mark it for publishing."""
+        state = self._room_state.get(room_id)
+        if state is None:
+            members = await self.load_room_state(room_id) if self.load_room_state else {}
+            state = {"version": 0, "members": dict(members)}
+        
+        user_id = event.get("user_id")
+        action = event.get("action")
+        if action == "left" or event.get("status") == "offline":
+            state["members"].pop(user_id, None)
+        elif user_id:
+            current = state["members"].get(user_id, "online")
+            state["members"][user_id] = event.get("status") or current
+        
+        self._room_state[room_id] = state
+        self._dirty_rooms.add(room_id)
+    
+    async def _flush_loop(self):
+        """Publish coalesced snapshots for rooms that changed."""
+        while True:
+            try:
+                await asyncio.sleep(self.snapshot_interval)
+                await self.flush_snapshots()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error publishing room snapshots: {e}")
+    
+    async def flush_snapshots(self) -> int:
+        """Publish one snapshot per dirty owned room; returns the count."""
+        if not self._dirty_rooms:
+            return 0
+        
+        rooms, self._dirty_rooms = self._dirty_rooms, set()
+        snapshots = []
+        for room_id in rooms:
+            state = self._room_state.get(room_id)
+            if state is None:
+                continue
+            state["version"] += 1
+            snapshots.append((room_id, {
+                "room_id": room_id,
+                "owner": self.node_id,
+                "version": state["version"],
+                "members": [[user_id, status] for user_id, status in state["members"].items()],
+                "timestamp": time.time()
+            }))
+        
+        if not self.redis_client:
+            for room_id, snapshot in snapshots:
+                await self._dispatch_snapshot(room_id, snapshot)
+            return len(snapshots)
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for room_id, snapshot in snapshots:
+            pipe.publish(f"{ROOM_CHANNEL_PREFIX}{room_id}", json.dumps(snapshot))
+        await pipe.execute()
+        return len(snapshots)
+    
+    async def _listen(self):
+        """Handle events routed to this node and snapshots for relayed rooms."""
+        try:
+            async for message in self._pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    payload = json.loads(message["data"])
+                    if message["channel"] == self.node_channel:
+                        # Ownership may have moved since the sender looked it up
+                        await self._receive_room_event(payload)
+                    else:
+                        await self._dispatch_snapshot(payload["room_id"], payload)
+                except Exception as e:
+                    logger.error(f"Error processing shard message: {e}")
+        except asyncio.CancelledError:
+            pass
+    
+    async def _dispatch_snapshot(self, room_id: str, snapshot: Dict[str, Any]):
+        """Hand a snapshot to the local relay handlers."""
+        if room_id not in self._relayed_rooms:
+            return
+        for handler in self._snapshot_handlers:
+            try:
+                await handler(room_id, snapshot)
+            except Exception as e:
+                logger.error(f"Error relaying snapshot for {room_id}: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get ownership and relay counts for health checks."""
+        return {
+            "node_id": self.node_id,
+            "nodes": len(self.ring.nodes),
+            "owned_rooms": len(self._room_state),
+            "relayed_rooms": len(self._relayed_rooms)
+        }
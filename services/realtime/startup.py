@@ -6,16 +6,35 @@ Initializes and manages all real-time services.
 
 import asyncio
 import logging
-from typing import Optional
+import os
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
 
 from .activity_tracker import activity_tracker
 from .broadcaster import broadcaster
 from .connection_manager import connection_manager
 from .presence_tracker import presence_tracker
+from .redis_pool import create_pool
 from .session_store import session_store
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for a service's start() and readiness ping
+START_TIMEOUT = float(os.getenv("REALTIME_START_TIMEOUT", "10"))
+
+# Backoff bounds for restarting services that failed to start
+RETRY_INITIAL_DELAY = float(os.getenv("REALTIME_RETRY_INITIAL_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("REALTIME_RETRY_MAX_DELAY", "60"))
+
+
+class ServiceState(str, Enum):
+    """Lifecycle states reported for each real-time service."""
+    PENDING = "pending"
+    STARTING = "starting"
+    READY = "ready"
+    FAILED = "failed"
+    STOPPED = "stopped"
+
 
 class RealtimeServiceManager:
     """Manages the lifecycle of all real-time services."""
@@ -28,6 +47,19 @@ class RealtimeServiceManager:
             ("session_store", session_store),
             ("activity_tracker", activity_tracker)
         ]
+        # Services that must be ready before a service starts
+        self._dependencies: Dict[str, Tuple[str, ...]] = {
+            "broadcaster": (),
+            "session_store": (),
+            "presence_tracker": ("session_store",),
+            "activity_tracker": ("broadcaster",)
+        }
+        self._states: Dict[str, ServiceState] = {}
+        self._errors: Dict[str, str] = {}
+        self._attempts: Dict[str, int] = {}
+        self._settled: Dict[str, asyncio.Event] = {}
+        self._pool = None
+        self._retry_task: Optional[asyncio.Task] = None
     
     async def start_all(self, redis_url: Optional[str] = None):
         """Start all real-time services."""
@@ -43,26 +75,100 @@ class RealtimeServiceManager:
                 if hasattr(service, 'redis_url'):
                     service.redis_url = redis_url
         
-        # Start services
-        start_tasks = []
-        for service_name, service in self._services:
-            if hasattr(service, 'start'):
-                start_tasks.append(self._start_service(service_name, service))
+        # One pool shared by every service instead of one per service
+        self._pool = create_pool(redis_url)
+        
+        self._states = {name: ServiceState.PENDING for name, _ in self._services}
+        self._errors = {}
+        self._attempts = {name: 0 for name, _ in self._services}
+        self._settled = {name: asyncio.Event() for name, _ in self._services}
         
-        # Start all services concurrently
-        if start_tasks:
-            await asyncio.gather(*start_tasks, return_exceptions=True)
+        # Start all services concurrently; each waits for its own dependencies
+        await asyncio.gather(
+            *(self._start_when_ready(name, service) for name, service in self._services),
+            return_exceptions=True
+        )
         
         self._started = True
-        logger.info("All real-time services started successfully")
+        
+        failed = self._failed_services()
+        if failed:
+            logger.warning(f"Real-time services started degraded, retrying: {', '.join(failed)}")
+            self._retry_task = asyncio.create_task(self._retry_failed())
+        else:
+            logger.info("All real-time services started successfully")
+    
+    async def _start_when_ready(self, name: str, service):
+        """Start a service once its dependencies have settled."""
+        try:
+            for dependency in self._dependencies.get(name, ()):
+                if dependency in self._settled:
+                    await self._settled[dependency].wait()
+            await self._start_service(name, service)
+        finally:
+            self._settled[name].set()
     
-    async def _start_service(self, name: str, service):
-        """Start a single service with error handling."""
+    async def _start_service(self, name: str, service) -> bool:
+        """Start a single service and record whether it became ready."""
+        self._states[name] = ServiceState.STARTING
+        self._attempts[name] = self._attempts.get(name, 0) + 1
+        
         try:
-            await service.start()
-            logger.info(f"Started {name}")
+            if hasattr(service, 'start'):
+                await asyncio.wait_for(service.start(connection_pool=self._pool), START_TIMEOUT)
+            await asyncio.wait_for(self._check_ready(service), START_TIMEOUT)
         except Exception as e:
-            logger.error(f"Failed to start {name}: {e}")
+            self._states[name] = ServiceState.FAILED
+            self._errors[name] = str(e) or e.__class__.__name__
+            logger.error(f"Failed to start {name}: {self._errors[name]}")
+            return False
+        
+        self._states[name] = ServiceState.READY
+        self._errors.pop(name, None)
+        logger.info(f"Started {name}")
+        return True
+    
+    async def _check_ready(self, service):
+        """Confirm a service can reach Redis; services degrade silently otherwise."""
+        if not hasattr(service, 'redis_client'):
+            return
+        if service.redis_client is None:
+            raise ConnectionError("Redis client not initialized")
+        await service.redis_client.ping()
+    
+    def _failed_services(self) -> list:
+        """Names of services that failed to start, in startup order."""
+        return [name for name, _ in self._services if self._states.get(name) == ServiceState.FAILED]
+    
+    async def _retry_failed(self):
+        """Restart failed services with exponential backoff until all are ready."""
+        delay = RETRY_INITIAL_DELAY
+        
+        while True:
+            try:
+                await asyncio.sleep(delay)
+                
+                for name, service in self._services:
+                    if self._states.get(name) != ServiceState.FAILED:
+                        continue
+                    # Wait for dependencies to recover first
+                    dependencies = self._dependencies.get(name, ())
+                    if any(self._states.get(dep) != ServiceState.READY for dep in dependencies):
+                        continue
+                    
+                    if hasattr(service, 'stop'):
+                        await self._stop_service(name, service)
+                    await self._start_service(name, service)
+                
+                if not self._failed_services():
+                    logger.info("All real-time services recovered")
+                    return
+                
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error retrying real-time services: {e}")
     
     async def stop_all(self):
         """Stop all real-time services."""
@@ -71,6 +177,10 @@ class RealtimeServiceManager:
         
         logger.info("Stopping real-time services...")
         
+        if self._retry_task:
+            self._retry_task.cancel()
+            self._retry_task = None
+        
         # Stop services
         stop_tasks = []
         for service_name, service in self._services:
@@ -81,6 +191,13 @@ class RealtimeServiceManager:
         if stop_tasks:
             await asyncio.gather(*stop_tasks, return_exceptions=True)
         
+        for service_name, _ in self._services:
+            self._states[service_name] = ServiceState.STOPPED
+        
+        if self._pool is not None:
+            await self._pool.disconnect()
+            self._pool = None
+        
         self._started = False
         logger.info("All real-time services stopped")
     
@@ -92,18 +209,40 @@ class RealtimeServiceManager:
         except Exception as e:
             logger.error(f"Failed to stop {name}: {e}")
     
+    def is_ready(self) -> bool:
+        """Check if every service started and reached Redis."""
+        return self._started and all(
+            self._states.get(name) == ServiceState.READY for name, _ in self._services
+        )
+    
     def is_started(self) -> bool:
         """Check if services are started."""
         return self._started
     
     async def health_check(self) -> dict:
-        """Perform health check on all services."""
-        health = {
+        """
+        Perform health check on all services.
+        
+        ``services`` maps each service to a status string; startup state,
+        attempts and the last start error are under ``service_details``.
+        """
+        health: Dict[str, Any] = {
             "status": "healthy" if self._started else "stopped",
-            "services": {}
+            "ready": self.is_ready(),
+            "services": {},
+            "service_details": {}
         }
         
         for service_name, service in self._services:
+            state = self._states.get(service_name, ServiceState.PENDING)
+            details: Dict[str, Any] = {
+                "state": state.value,
+                "attempts": self._attempts.get(service_name, 0)
+            }
+            if service_name in self._errors:
+                details["last_error"] = self._errors[service_name]
+            health["service_details"][service_name] = details
+            
             try:
                 # Check if service has redis client and is connected
                 if hasattr(service, 'redis_client') and service.redis_client:
@@ -115,6 +254,12 @@ class RealtimeServiceManager:
             except Exception as e:
                 health["services"][service_name] = f"error: {str(e)}"
                 health["status"] = "degraded"
+            
+            if self._started and state != ServiceState.READY:
+                health["status"] = "degraded"
+        
+        if self._pool is not None:
+            health["redis_pool"] = {"max_connections": self._pool.max_connections}
         
         # Check connection manager
         health["services"]["connection_manager"] = {
@@ -123,6 +268,9 @@ class RealtimeServiceManager:
             "rooms": len(connection_manager._rooms)
         }
         
+        if presence_tracker.sharding:
+            health["services"]["sharding"] = presence_tracker.sharding.stats()
+        
         return health
 
 
@@ -144,6 +292,7 @@ async def shutdown_event():
 # Export for use in main app
 __all__ = [
     "RealtimeServiceManager",
+    "ServiceState",
     "service_manager", 
     "startup_event",
     "shutdown_event"
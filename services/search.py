@@ -0,0 +1,100 @@
+"""
+Full-text search for cases and clients.
+On Postgres, terms are matched against each table's generated
+``search_vector`` column with prefix tsqueries, served by a GIN index on
+``(organization_id, search_vector)``, and ranked with ts_rank_cd. Other
+dialects fall back to ILIKE over the same fields.
+"""
+
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.orm import Session
+
+from core.utils import LIKE_ESCAPE, escape_like
+
+# Text search configuration used by the generated search_vector columns;
+# 'simple' skips stemming so names and case numbers match as typed
+SEARCH_CONFIG = "simple"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_tsquery(term: str) -> Optional[str]:
+    """
+    Build a tsquery matching every token of ``term`` as a prefix.
+    
+    Only word characters are kept, so the result is always valid tsquery
+    syntax: ``"Smith v. Jo"`` becomes ``"smith:* & v:* & jo:*"``.
+    """
+    tokens = _TOKEN.findall(term.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def match_condition(
+    db: Session,
+    model,
+    term: str,
+    fallback_columns: Sequence[Any]
+) -> Tuple[Any, Any]:
+    """
+    Get the WHERE condition and rank expression for a search term.
+    
+    Args:
+        db: Database session, used to pick the dialect
+        model: Mapped class with a ``search_vector`` column
+        term: User-entered search text
+        fallback_columns: Columns searched with ILIKE off Postgres
+    
+    Returns:
+        Tuple of (condition, rank); rank is None when results cannot be
+        ranked, and condition is None when the term has nothing to match
+    """
+    tsquery = prefix_tsquery(term)
+    if tsquery is None:
+        return None, None
+    
+    if db.get_bind().dialect.name != "postgresql":
+        pattern = f"%{escape_like(term.strip())}%"
+        return or_(
+            *(column.ilike(pattern, escape=LIKE_ESCAPE) for column in fallback_columns)
+        ), None
+    
+    query = func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), tsquery)
+    return model.search_vector.op("@@")(query), func.ts_rank_cd(model.search_vector, query)
+
+
+def search(
+    db: Session,
+    model,
+    organization_id: int,
+    term: str,
+    fallback_columns: Sequence[Any],
+    limit: int = 10,
+    options: Sequence[Any] = ()
+) -> List[Any]:
+    """
+    Tenant-scoped ranked search for typeahead.
+    
+    Best matches come first; ties go to the most recently updated rows.
+    """
+    condition, rank = match_condition(db, model, term, fallback_columns)
+    if condition is None:
+        return []
+    
+    ordering = [rank.desc()] if rank is not None else []
+    return (
+        db.query(model)
+        .options(*options)
+        .filter(
+            model.organization_id == organization_id,
+            model.is_deleted.is_(False),
+            condition
+        )
+        .order_by(*ordering, model.updated_at.desc(), model.id.desc())
+        .limit(limit)
+        .all()
+    )
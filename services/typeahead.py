@@ -0,0 +1,332 @@
+"""
+In-process typeahead index for case and client quick search.
+Each organization's normalized tokens are kept in a sorted array, so a
+keystroke is a bisect over that array instead of a database query. Indexes
+are built on first use and bounded by an LRU of organizations. A commit
+marks the rows it wrote, and the next search reloads just those rows and
+merges them into the index instead of rebuilding it. With Redis configured
+every commit also bumps a per-organization generation and publishes the
+written ids under it, which other processes check on each search; an index
+older than the max age is rebuilt regardless.
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Serve /search from the in-process index instead of the database
+TYPEAHEAD_ENABLED = os.getenv("TYPEAHEAD_INDEX_ENABLED", "false").lower() == "true"
+
+# Organizations whose indexes are kept in memory per process
+TYPEAHEAD_MAX_ORGANIZATIONS = int(os.getenv("TYPEAHEAD_MAX_ORGANIZATIONS", "200"))
+
+# Seconds before an organization's index is rebuilt from scratch
+TYPEAHEAD_MAX_AGE_SECONDS = float(os.getenv("TYPEAHEAD_MAX_AGE_SECONDS", "300"))
+
+# Shared change log; empty limits invalidation to the committing process
+TYPEAHEAD_REDIS_URL = os.getenv("TYPEAHEAD_REDIS_URL", os.getenv("REDIS_URL", ""))
+
+# Generations an index may fall behind before patching gives way to a rebuild
+_MAX_CHANGE_SETS = 50
+
+# Change set meaning "any row may have changed"
+_ALL_ROWS = "*"
+
+# None until first use, False when Redis is not configured or not installed
+_redis_client: Any = None
+_redis_lock = threading.Lock()
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens of a field or search term."""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _redis():
+    """The shared Redis client, or None to keep changes in process."""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = False
+                if TYPEAHEAD_REDIS_URL:
+                    try:
+                        import redis
+                        _redis_client = redis.from_url(TYPEAHEAD_REDIS_URL, decode_responses=True)
+                    except ImportError:
+                        logger.warning(
+                            "redis package not available, typeahead changes stay in process"
+                        )
+    return _redis_client or None
+
+
+def _pairs(rows: Iterable[Sequence[Any]]) -> List[Tuple[str, Any]]:
+    """Sorted distinct (token, id) pairs of ``(id, *fields)`` rows."""
+    pairs = set()
+    for row_id, *fields in rows:
+        for field in fields:
+            for token in tokenize(field):
+                pairs.add((token, row_id))
+    return sorted(pairs)
+
+
+class PrefixIndex:
+    """Sorted (token, id) pairs for one organization."""
+    
+    def __init__(
+        self,
+        rows: Iterable[Sequence[Any]] = (),
+        pairs: Optional[Iterable[Tuple[str, Any]]] = None
+    ):
+        ordered = _pairs(rows) if pairs is None else pairs
+        self._tokens: List[str] = []
+        self._ids = array("q")
+        for token, row_id in ordered:
+            self._tokens.append(token)
+            self._ids.append(row_id)
+    
+    def __len__(self) -> int:
+        return len(self._tokens)
+    
+    def patched(self, ids: Set[Any], rows: Iterable[Sequence[Any]]) -> "PrefixIndex":
+        """
+        A copy with the rows ``ids`` replaced by ``rows``.
+        
+        Ids without a row are removed, e.g. deleted rows. Both inputs are
+        sorted, so this is a linear merge with no database work beyond
+        loading ``rows``.
+        """
+        kept = (
+            (token, row_id)
+            for token, row_id in zip(self._tokens, self._ids)
+            if row_id not in ids
+        )
+        return PrefixIndex(pairs=heapq.merge(kept, _pairs(rows)))
+    
+    def _ids_with_prefix(self, prefix: str) -> set:
+        start = bisect_left(self._tokens, prefix)
+        # Every token starting with prefix sorts before prefix + U+FFFF
+        end = bisect_left(self._tokens, prefix + "\uffff", start)
+        return set(self._ids[start:end])
+    
+    def search(self, term: str, limit: int = 10) -> List[int]:
+        """
+        Ids of rows with a token starting with every token of ``term``.
+        
+        Newest rows (highest ids) come first.
+        """
+        matches = None
+        # Longer prefixes match fewer rows, so intersect from the longest
+        for token in sorted(set(tokenize(term)), key=len, reverse=True):
+            ids = self._ids_with_prefix(token)
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+        
+        return heapq.nlargest(limit, matches) if matches else []
+
+
+class _Entry(NamedTuple):
+    index: PrefixIndex
+    # Monotonic time after which the index is rebuilt
+    expires_at: float
+    # Shared generation the index reflects; None when built without Redis
+    generation: Optional[int]
+
+
+class TypeaheadIndex:
+    """Lazily built PrefixIndex per organization, bounded by an LRU."""
+    
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[..., Iterable[Sequence[Any]]],
+        max_organizations: int = TYPEAHEAD_MAX_ORGANIZATIONS,
+        max_age: float = TYPEAHEAD_MAX_AGE_SECONDS
+    ):
+        """
+        Args:
+            name: Namespace for the shared change log
+            loader: ``loader(db, organization_id, ids=None)`` returns
+                ``(id, *searchable fields)`` rows for an organization, only
+                for ``ids`` when given
+            max_organizations: Organizations kept before the least recent is dropped
+            max_age: Seconds an index is patched before it is rebuilt
+        """
+        self.name = name
+        self._loader = loader
+        self.max_organizations = max_organizations
+        self.max_age = max_age
+        self._indexes: "OrderedDict[Any, _Entry]" = OrderedDict()
+        # Ids committed here since the index was patched; None means rebuild
+        self._pending: Dict[Any, Optional[Set[Any]]] = {}
+        # Bumped on every change so an index built from stale rows is not kept
+        self._generations: Dict[Any, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+    
+    def _generation_key(self, organization_id: Any) -> str:
+        return f"typeahead:{self.name}:{organization_id}:generation"
+    
+    def _changes_key(self, organization_id: Any, generation: int) -> str:
+        return f"typeahead:{self.name}:{organization_id}:{generation}"
+    
+    def _shared_generation(self, organization_id: Any) -> Optional[int]:
+        client = _redis()
+        if client is None:
+            return None
+        try:
+            return int(client.get(self._generation_key(organization_id)) or 0)
+        except Exception as e:
+            logger.warning(f"Typeahead generation read from Redis failed: {e}")
+            return None
+    
+    def _shared_changes(
+        self,
+        organization_id: Any,
+        since: Optional[int],
+        current: Optional[int]
+    ) -> Optional[Set[Any]]:
+        """Ids written by anyone between two shared generations, or None if unknown."""
+        if since == current:
+            return set()
+        if since is None or current is None or not 0 < current - since <= _MAX_CHANGE_SETS:
+            return None
+        keys = [
+            self._changes_key(organization_id, generation)
+            for generation in range(since + 1, current + 1)
+        ]
+        try:
+            change_sets = _redis().mget(keys)
+        except Exception as e:
+            logger.warning(f"Typeahead change read from Redis failed: {e}")
+            return None
+        
+        ids: Set[Any] = set()
+        for change_set in change_sets:
+            # Expired, not yet written by a committing process, or a full invalidation
+            if change_set is None or change_set == _ALL_ROWS:
+                return None
+            ids.update(json.loads(change_set))
+        return ids
+    
+    def _index(self, db: Session, organization_id: Any) -> PrefixIndex:
+        shared = self._shared_generation(organization_id)
+        with self._lock:
+            entry = self._indexes.get(organization_id)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._indexes[organization_id]
+                entry = None
+            pending = self._pending.get(organization_id, set())
+            if entry is not None:
+                self._indexes.move_to_end(organization_id)
+                if not pending and entry.generation == shared:
+                    return entry.index
+            generation = (self._epoch, self._generations.get(organization_id, 0))
+        
+        # Build outside the lock so other organizations are not blocked
+        ids = None
+        if entry is not None and pending is not None:
+            changes = self._shared_changes(organization_id, entry.generation, shared)
+            ids = None if changes is None else pending | changes
+        if ids is None:
+            index = PrefixIndex(self._loader(db, organization_id))
+            expires_at = time.monotonic() + self.max_age
+        else:
+            index = entry.index.patched(ids, self._loader(db, organization_id, ids))
+            expires_at = entry.expires_at
+        
+        with self._lock:
+            if (self._epoch, self._generations.get(organization_id, 0)) == generation:
+                self._pending.pop(organization_id, None)
+                self._indexes[organization_id] = _Entry(index, expires_at, shared)
+                self._indexes.move_to_end(organization_id)
+                while len(self._indexes) > self.max_organizations:
+                    self._indexes.popitem(last=False)
+        return index
+    
+    def search(self, db: Session, organization_id: Any, term: str, limit: int = 10) -> List[int]:
+        """Ids matching ``term`` in an organization, newest first."""
+        return self._index(db, organization_id).search(term, limit)
+    
+    def rows_changed(self, organization_id: Any, ids: Optional[Set[Any]]):
+        """
+        Mark committed rows for reloading on the organization's next search.
+        
+        ``ids`` None means any row may have changed, so the index is rebuilt.
+        """
+        with self._lock:
+            self._generations[organization_id] = self._generations.get(organization_id, 0) + 1
+            if organization_id in self._indexes:
+                pending = self._pending.get(organization_id, set())
+                merged = None if ids is None or pending is None else pending | ids
+                self._pending[organization_id] = merged
+        
+        client = _redis()
+        if client is None:
+            return
+        try:
+            generation = client.incr(self._generation_key(organization_id))
+            # A change set is only read to patch an index younger than max_age
+            change_set = _ALL_ROWS if ids is None else json.dumps(sorted(ids))
+            client.setex(
+                self._changes_key(organization_id, generation),
+                max(1, int(self.max_age)),
+                change_set
+            )
+        except Exception as e:
+            logger.warning(f"Typeahead change publish to Redis failed: {e}")
+    
+    def invalidate(self, organization_id: Any):
+        """Rebuild an organization's index on its next search, in every process."""
+        self.rows_changed(organization_id, None)
+    
+    def clear(self):
+        """Drop every index."""
+        with self._lock:
+            self._indexes.clear()
+            self._pending.clear()
+            self._epoch += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Get the number of indexed organizations and tokens."""
+        with self._lock:
+            return {
+                "organizations": len(self._indexes),
+                "max_organizations": self.max_organizations,
+                "tokens": sum(len(entry.index) for entry in self._indexes.values())
+            }
+
+
+def load_in_order(
+    db: Session,
+    model,
+    organization_id: Any,
+    ids: List[int],
+    options: Sequence[Any] = ()
+) -> List[Any]:
+    """Fetch live rows by id, keeping the order of ``ids``."""
+    if not ids:
+        return []
+    
+    rows = db.query(model).options(*options).filter(
+        model.id.in_(ids),
+        model.organization_id == organization_id,
+        model.is_deleted.is_(False)
+    )
+    by_id = {row.id: row for row in rows}
+    return [by_id[row_id] for row_id in ids if row_id in by_id]
@@ -0,0 +1,29 @@
+"""Engine and session fixtures shared by the database tests."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from tests.db.models import Base, Brief
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    # Brief is on the application's metadata; only its own table is needed
+    Brief.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(factory):
+    session = factory()
+    yield session
+    session.close()
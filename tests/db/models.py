@@ -0,0 +1,40 @@
+"""Models shared by the database tests."""
+
+from enum import Enum as PyEnum
+
+from sqlalchemy import JSON, Boolean, Column, Enum, Integer, Numeric, String
+from sqlalchemy.orm import declarative_base
+
+from core.db.tags import TagList
+from models.base import BaseModel, IntegerPrimaryKeyMixin
+
+Base = declarative_base()
+
+
+class Ticket(Base):
+    """Plain tenant-scoped row with the columns the helpers work on."""
+    __tablename__ = "tickets"
+    
+    id = Column(Integer, primary_key=True)
+    organization_id = Column(Integer, nullable=False)
+    title = Column(String(50), nullable=True)
+    status = Column(String(20), nullable=False, default="open")
+    kind = Column(String(20), nullable=True)
+    amount = Column(Numeric(10, 2), nullable=True)
+    is_deleted = Column(Boolean, nullable=False, default=False)
+    tags = Column(TagList, nullable=True)
+
+
+class BriefStatus(PyEnum):
+    DRAFT = "draft"
+    FILED = "filed"
+
+
+class Brief(IntegerPrimaryKeyMixin, BaseModel):
+    """Row on the application's base model, so it is versioned."""
+    __tablename__ = "versioned_briefs"
+    
+    title = Column(String(100), nullable=False)
+    status = Column(Enum(BriefStatus), nullable=False, default=BriefStatus.DRAFT)
+    organization_id = Column(Integer, nullable=False, default=1)
+    labels = Column(JSON)
@@ -0,0 +1,65 @@
+"""Tests for SQL-side grouped stats and per-organization caching."""
+
+import pytest
+from sqlalchemy import func
+
+from core.db.aggregates import grouped_counts
+from core.db.invalidation import OrganizationCache
+from tests.db.models import Ticket
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        Ticket(organization_id=1, status="open", kind="bug", amount=10),
+        Ticket(organization_id=1, status="open", kind="task", amount=20),
+        Ticket(organization_id=1, status="closed", kind="bug", amount=30),
+        Ticket(organization_id=1, status="closed", kind=None, amount=40),
+        Ticket(organization_id=2, status="open", kind="bug", amount=50),
+    ])
+    db.commit()
+    return db
+
+
+def test_grouped_counts_breaks_down_each_dimension(db):
+    """Test that each dimension is counted separately and totals cover all rows."""
+    breakdowns, totals = grouped_counts(
+        db,
+        criteria=(Ticket.organization_id == 1,),
+        dimensions={"by_status": Ticket.status, "by_kind": Ticket.kind},
+        totals={
+            "total": func.count(),
+            "open": func.count().filter(Ticket.status == "open"),
+            "amount": func.sum(Ticket.amount),
+        }
+    )
+    
+    assert breakdowns == {
+        "by_status": {"open": 2, "closed": 2},
+        "by_kind": {"bug": 2, "task": 1},
+    }
+    assert totals["total"] == 4
+    assert totals["open"] == 2
+    assert totals["amount"] == 100
+
+
+def test_organization_cache_drops_written_organization(db):
+    """Test that a commit only invalidates the organization it wrote to."""
+    cache = OrganizationCache(Ticket, ttl=60)
+    cache.set(1, "stats-1")
+    cache.set(2, "stats-2")
+    
+    db.add(Ticket(organization_id=2, status="open", kind="bug", amount=5))
+    db.flush()
+    assert cache.get(2) == "stats-2"
+    
+    db.commit()
+    assert cache.get(1) == "stats-1"
+    assert cache.get(2) is None
+
+
+def test_organization_cache_expires_entries():
+    """Test that entries are not served past their TTL."""
+    cache = OrganizationCache(ttl=0)
+    cache.set(1, "stale")
+    assert cache.get(1) is None
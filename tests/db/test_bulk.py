@@ -0,0 +1,63 @@
+"""Tests for set-based bulk updates."""
+
+import pytest
+from sqlalchemy import event
+
+from core.db.bulk import bulk_rewrite, bulk_update, list_difference, list_union
+from core.db.invalidation import on_committed_write
+from tests.db.models import Ticket
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([Ticket(id=i, organization_id=1, tags=["a"]) for i in range(1, 8)])
+    db.add(Ticket(id=8, organization_id=2))
+    db.add(Ticket(id=9, organization_id=1, is_deleted=True))
+    db.commit()
+    return db
+
+
+def _statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_bulk_update_is_scoped_and_chunked(engine, db, monkeypatch, returning):
+    """Test that only live rows of the organization change, a chunk per statement."""
+    monkeypatch.setattr(engine.dialect, "update_returning", returning)
+    statements = _statements(engine)
+    
+    updated = bulk_update(
+        db, Ticket, [1, 2, 8, 3, 4, 9, 5, 404, 1], 1, {Ticket.status: "closed"},
+        criteria=(Ticket.is_deleted.is_(False),), chunk_size=3
+    )
+    db.commit()
+    
+    assert sorted(updated) == [1, 2, 3, 4, 5]
+    assert len([s for s in statements if s.startswith("UPDATE")]) == 3
+    assert {t.id for t in db.query(Ticket).filter_by(status="closed")} == {1, 2, 3, 4, 5}
+
+
+def test_bulk_rewrite_changes_only_rows_that_differ(db):
+    """Test per-row JSON rewrites for tag actions."""
+    updated = bulk_rewrite(db, Ticket, Ticket.tags, [1, 2, 8], 1, list_union(["b", "a"]))
+    assert sorted(updated) == [1, 2]
+    bulk_rewrite(db, Ticket, Ticket.tags, [2], 1, list_difference(["a"]))
+    db.commit()
+    
+    assert db.get(Ticket, 1).tags == ["a", "b"]
+    assert db.get(Ticket, 2).tags == ["b"]
+    assert db.get(Ticket, 8).tags is None
+
+
+def test_bulk_writes_notify_on_commit(db):
+    """Test that bulk statements invalidate caches like flushed writes do."""
+    notified = []
+    on_committed_write(Ticket, notified.append)
+    
+    bulk_update(db, Ticket, [1], 1, {Ticket.status: "closed"})
+    assert notified == []
+    db.commit()
+    assert notified == [1]
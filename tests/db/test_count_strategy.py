@@ -0,0 +1,75 @@
+"""Tests for list count strategies."""
+
+import pytest
+
+from core.db.counting import (
+    CountStrategy,
+    clear_count_cache,
+    count_total,
+    track_count_invalidation,
+)
+from tests.db.models import Ticket
+
+track_count_invalidation(Ticket, "tickets")
+
+
+@pytest.fixture
+def db(db):
+    clear_count_cache()
+    db.add_all(Ticket(organization_id=1 + i % 2, title=f"w{i}") for i in range(10))
+    db.commit()
+    return db
+
+
+def _count(db, organization_id, strategy, filters=None):
+    query = db.query(Ticket).filter(Ticket.organization_id == organization_id)
+    return count_total(
+        db, query, strategy,
+        namespace="tickets",
+        organization_id=organization_id,
+        filters=filters,
+        filtered=bool(filters)
+    )
+
+
+def test_exact_counts_every_time(db):
+    """Test that exact counts reflect new rows immediately."""
+    assert _count(db, 1, CountStrategy.EXACT) == (5, True)
+    
+    db.add(Ticket(organization_id=1, title="extra"))
+    db.flush()
+    assert _count(db, 1, CountStrategy.EXACT) == (6, True)
+
+
+def test_cached_counts_are_reused_until_a_write_commits(db):
+    """Test that cached counts are served until the organization's rows change."""
+    assert _count(db, 1, CountStrategy.CACHED) == (5, True)
+    assert _count(db, 1, CountStrategy.CACHED) == (5, False)
+    assert _count(db, 1, CountStrategy.CACHED, {"title": "w1"}) == (5, True)
+    
+    db.add(Ticket(organization_id=2, title="other-org"))
+    db.commit()
+    # Another organization's write leaves this cache alone
+    assert _count(db, 1, CountStrategy.CACHED) == (5, False)
+    
+    db.add(Ticket(organization_id=1, title="extra"))
+    db.commit()
+    assert _count(db, 1, CountStrategy.CACHED) == (6, True)
+
+
+def test_rolled_back_writes_keep_the_cache(db):
+    """Test that a rolled back write does not invalidate cached counts."""
+    _count(db, 1, CountStrategy.CACHED)
+    
+    db.add(Ticket(organization_id=1, title="discarded"))
+    db.flush()
+    db.rollback()
+    assert _count(db, 1, CountStrategy.CACHED) == (5, False)
+
+
+def test_estimated_falls_back_off_postgres(db):
+    """Test that estimates fall back to a real count where the planner is unavailable."""
+    assert _count(db, 1, CountStrategy.ESTIMATED) == (5, True)
+    # Filtered lists are never estimated
+    assert _count(db, 1, CountStrategy.ESTIMATED, {"title": "w1"}) == (5, True)
+    assert _count(db, 1, CountStrategy.ESTIMATED, {"title": "w1"}) == (5, False)
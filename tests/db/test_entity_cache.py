@@ -0,0 +1,115 @@
+"""Tests for the two-tier entity cache."""
+
+import pytest
+
+from core.db import entity_cache
+from core.db.entity_cache import EntityCache
+from tests.db.models import Ticket
+
+
+class FakeRedis:
+    """Just the string commands the cache uses."""
+    
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+    
+    def get(self, name):
+        return self.values.get(name)
+    
+    def setex(self, name, seconds, value):
+        self.values[name] = value
+        self.ttls[name] = seconds
+    
+    def incr(self, name):
+        self.values[name] = str(int(self.values.get(name, 0)) + 1)
+        return int(self.values[name])
+
+
+@pytest.fixture
+def db(db):
+    db.add(Ticket(id=1, organization_id=1, title="first"))
+    db.commit()
+    return db
+
+
+@pytest.fixture(autouse=True)
+def process_memory_only(monkeypatch):
+    monkeypatch.setattr(entity_cache, "_redis_client", False)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(entity_cache, "_redis_client", fake)
+    return fake
+
+
+def _loader(db, calls):
+    def load():
+        calls.append(1)
+        ticket = db.get(Ticket, 1)
+        return ticket.title if ticket else None
+    return load
+
+
+def test_repeat_lookups_skip_the_database_until_a_commit(db):
+    """Test that a committed write for the organization drops its cached rows."""
+    cache = EntityCache("ticket", Ticket, enabled=True)
+    calls = []
+    assert cache.get_or_load(db, 1, "id:1", _loader(db, calls)) == "first"
+    assert cache.get_or_load(db, 1, "id:1", _loader(db, calls)) == "first"
+    assert len(calls) == 1
+    
+    db.get(Ticket, 1).title = "renamed"
+    db.commit()
+    assert cache.get_or_load(db, 1, "id:1", _loader(db, calls)) == "renamed"
+    assert len(calls) == 2
+
+
+def test_processes_share_entries_and_invalidations_through_redis(db, redis):
+    """Test that one process's fill and another's invalidation are seen through Redis."""
+    writer = EntityCache("ticket", enabled=True)
+    reader = EntityCache("ticket", enabled=True, local_ttl=0)
+    calls = []
+    
+    writer.get_or_load(db, 1, "id:1", _loader(db, calls))
+    assert reader.get_or_load(db, 1, "id:1", _loader(db, calls)) == "first"
+    assert len(calls) == 1
+    
+    writer.invalidate(1)
+    assert reader.get(1, "id:1") is None
+
+
+def test_loads_racing_an_invalidation_are_not_cached(db):
+    """Test that a value read before a concurrent commit is not stored."""
+    cache = EntityCache("ticket", enabled=True)
+    
+    def stale_load():
+        cache.invalidate(1)
+        return "stale"
+    
+    assert cache.get_or_load(db, 1, "id:1", stale_load) == "stale"
+    assert cache.get(1, "id:1") is None
+
+
+def test_entries_expire_individually_in_redis(db, redis):
+    """Test that each fill gets its own TTL instead of extending a shared one."""
+    cache = EntityCache("ticket", enabled=True, redis_ttl=30)
+    cache.set(1, "id:1", "first")
+    cache.set(1, "id:2", "second")
+    assert redis.ttls == {"entity:ticket:1:0:id:1": 30, "entity:ticket:1:0:id:2": 30}
+
+
+def test_fills_racing_another_process_commit_are_never_served(db, redis):
+    """Test that a value loaded before a remote invalidation is unreachable in Redis."""
+    filler = EntityCache("ticket", enabled=True, local_ttl=0)
+    committer = EntityCache("ticket", enabled=True)
+    
+    def stale_load():
+        committer.invalidate(1)
+        return "stale"
+    
+    assert filler.get_or_load(db, 1, "id:1", stale_load) == "stale"
+    assert filler.get(1, "id:1") is None
+    assert committer.get(1, "id:1") is None
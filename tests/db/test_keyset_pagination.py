@@ -0,0 +1,104 @@
+"""Tests for keyset (cursor) pagination."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from core.db.pagination import _cursor_secret, decode_cursor, encode_cursor, keyset_paginate
+from core.exceptions import ValidationError
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    
+    start = datetime(2025, 1, 1)
+    # Pairs of rows share a timestamp so the id tiebreaker is exercised
+    session.add_all(
+        Item(id=i, name=f"item-{i:02d}", created_at=start + timedelta(minutes=i // 2))
+        for i in range(1, 26)
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+def _walk(db, order_by, direction, limit):
+    pages, cursor = [], None
+    while True:
+        items, cursor, has_next = keyset_paginate(
+            db.query(Item), Item, order_by, direction, limit, cursor,
+            allowed_columns=("created_at", "name", "id")
+        )
+        pages.append([item.id for item in items])
+        if not has_next:
+            return pages
+
+
+@pytest.mark.parametrize("order_by", ["created_at", "name", "id"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_pages_cover_every_row_once_in_order(db, order_by, direction):
+    """Test that walking all pages yields the same rows as one ordered query."""
+    pages = _walk(db, order_by, direction, limit=7)
+    
+    column = getattr(Item, order_by)
+    if direction == "desc":
+        ordering = [column.desc(), Item.id.desc()]
+    else:
+        ordering = [column.asc(), Item.id.asc()]
+    expected = [item.id for item in db.query(Item).order_by(*ordering)]
+    
+    assert [len(page) for page in pages] == [7, 7, 7, 4]
+    assert [item_id for page in pages for item_id in page] == expected
+
+
+def test_tampered_cursor_is_rejected(db):
+    """Test that cursors are signed."""
+    _, cursor, _ = keyset_paginate(db.query(Item), Item, "created_at", "desc", 5)
+    payload = decode_cursor(cursor)
+    
+    forged = encode_cursor({**payload, "id": 1}).split(".")[0] + "." + cursor.split(".")[1]
+    
+    with pytest.raises(ValidationError):
+        keyset_paginate(db.query(Item), Item, "created_at", "desc", 5, forged)
+    with pytest.raises(ValidationError):
+        decode_cursor("not-a-cursor")
+
+
+def test_cursor_is_bound_to_its_ordering(db):
+    """Test that a cursor cannot be replayed against another sort."""
+    _, cursor, _ = keyset_paginate(db.query(Item), Item, "created_at", "desc", 5)
+    
+    with pytest.raises(ValidationError):
+        keyset_paginate(db.query(Item), Item, "created_at", "asc", 5, cursor)
+
+
+def test_unsupported_sort_column_is_rejected(db):
+    """Test that nullable or unknown columns cannot key a page."""
+    with pytest.raises(ValidationError):
+        keyset_paginate(db.query(Item), Item, "name", "desc", 5)
+
+
+def test_placeholder_secret_is_never_used_for_signing(monkeypatch):
+    """Test that cursors fall back to a random key instead of the public placeholder."""
+    monkeypatch.delenv("CURSOR_SECRET", raising=False)
+    monkeypatch.setenv("SECRET_KEY", "your-secret-key-change-in-production")
+    first, second = _cursor_secret(), _cursor_secret()
+    assert first != second and "change-in-production" not in first
+    
+    monkeypatch.setenv("CURSOR_SECRET", "configured")
+    assert _cursor_secret() == "configured"
@@ -0,0 +1,60 @@
+"""Tests for engine pool settings and checkout instrumentation."""
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from core.db.pool import (
+    TimedQueuePool,
+    _pool_options,
+    async_url,
+    build_engine,
+    pool_metrics,
+    pool_stats,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = build_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        name="test",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05
+    )
+    pool_metrics["test"].reset()
+    yield engine
+    engine.dispose()
+    pool_metrics.pop("test", None)
+
+
+def test_checkouts_and_saturation_are_reported(engine):
+    """Test that a busy pool reports full saturation and timed out waits."""
+    connection = engine.connect()
+    assert pool_stats()["test"]["saturation"] == 1.0
+    
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    connection.close()
+    
+    stats = pool_stats()["test"]
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
+    assert stats["checked_out"] == 0 and stats["idle"] == 1
+
+
+def test_server_databases_get_tuned_pool_settings():
+    """Test that network databases get explicit pool limits and SQLite keeps defaults."""
+    options = _pool_options("postgresql://app@db/goldleaves")
+    expected = {"pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"}
+    assert expected <= set(options)
+    assert _pool_options("sqlite:///./app.db") == {}
+
+
+def test_async_url_swaps_in_async_driver():
+    """Test that the async engine reuses the configured URL with asyncpg."""
+    url = async_url("postgresql+psycopg2://app:secret@db:5432/goldleaves")
+    assert url.drivername == "postgresql+asyncpg"
+    assert url.password == "secret" and url.database == "goldleaves"
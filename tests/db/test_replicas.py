@@ -0,0 +1,99 @@
+"""Tests for read-replica routing and read-your-writes stickiness."""
+
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from core.db import replicas
+from core.db.replicas import (
+    READ_YOUR_WRITES_COOKIE,
+    ReadYourWritesMiddleware,
+    ReplicaSet,
+    RoutingSession,
+    pin_to_primary,
+    reads_primary,
+)
+
+Base = declarative_base()
+
+
+class Matter(Base):
+    __tablename__ = "replica_matters"
+    
+    id = Column(Integer, primary_key=True)
+    source = Column(String(20), nullable=False)
+
+
+def _engine(tmp_path, name):
+    engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(Matter(id=1, source=name))
+        db.commit()
+    return engine
+
+
+@pytest.fixture
+def engines(tmp_path):
+    return _engine(tmp_path, "primary"), _engine(tmp_path, "replica")
+
+
+def _session(engines, max_lag=5):
+    primary, replica = engines
+    replicas = ReplicaSet([replica], max_lag=max_lag)
+    factory = sessionmaker(class_=RoutingSession, primary=primary, replicas=replicas)
+    return factory()
+
+
+def _source(db):
+    return db.query(Matter.source).filter(Matter.id == 1).scalar()
+
+
+def test_reads_use_replica_until_the_session_writes(engines):
+    """Test that SELECTs go to the replica and a flush pins the session to the primary."""
+    db = _session(engines)
+    assert _source(db) == "replica"
+    
+    db.add(Matter(id=2, source="new"))
+    db.flush()
+    assert _source(db) == "primary"
+    assert db.query(Matter).count() == 2
+    db.rollback()
+    db.close()
+
+
+def test_lagging_replicas_and_pinned_sessions_read_primary(engines, monkeypatch):
+    """Test that lag beyond the limit, or an explicit pin, falls back to the primary."""
+    monkeypatch.setattr(replicas.Replica, "measure_lag", lambda self: 30.0)
+    assert _source(_session(engines, max_lag=5)) == "primary"
+    
+    monkeypatch.setattr(replicas.Replica, "measure_lag", lambda self: 0.0)
+    db = _session(engines)
+    pin_to_primary(db)
+    assert _source(db) == "primary"
+
+
+def test_successful_writes_make_the_client_read_primary(monkeypatch):
+    """Test the read-your-writes cookie set after unsafe requests."""
+    monkeypatch.setattr(replicas, "DATABASE_REPLICA_URLS", ["postgresql://replica/db"])
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+    
+    @app.post("/cases")
+    def create():
+        return {}
+    
+    @app.get("/cases")
+    def read(request: Request):
+        return {"primary": reads_primary(request)}
+    
+    client = TestClient(app)
+    assert client.get("/cases").json() == {"primary": False}
+    
+    response = client.post("/cases")
+    assert float(response.cookies[READ_YOUR_WRITES_COOKIE]) > time.time()
+    assert client.get("/cases").json() == {"primary": True}
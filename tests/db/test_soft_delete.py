@@ -0,0 +1,75 @@
+"""Tests for live-row partial indexes and the default soft-delete filter."""
+
+import pytest
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.schema import CreateIndex
+
+from models.base import INCLUDE_DELETED, live_index
+
+Base = declarative_base()
+
+
+class Binder(Base):
+    __tablename__ = "soft_binders"
+    
+    id = Column(Integer, primary_key=True)
+    is_deleted = Column(Boolean, nullable=False, default=False)
+    sheets = relationship("Sheet")
+
+
+class Sheet(Base):
+    __tablename__ = "soft_sheets"
+    
+    id = Column(Integer, primary_key=True)
+    binder_id = Column(Integer, ForeignKey("soft_binders.id"))
+    organization_id = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False)
+    is_deleted = Column(Boolean, nullable=False, default=False)
+    
+    __table_args__ = (
+        live_index('idx_sheet_org_status', 'organization_id', 'status'),
+    )
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'soft.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Binder(id=1),
+        Binder(id=2, is_deleted=True),
+        Sheet(id=1, binder_id=1, organization_id=1, status="open"),
+        Sheet(id=2, binder_id=1, organization_id=1, status="open", is_deleted=True),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_live_index_is_partial():
+    """Test that live indexes only cover rows that are not soft-deleted."""
+    index = next(iter(Sheet.__table__.indexes))
+    for dialect in (postgresql.dialect(), sqlite.dialect()):
+        ddl = str(CreateIndex(index).compile(dialect=dialect)).strip()
+        assert ddl.endswith("WHERE is_deleted = false")
+
+
+def test_selects_and_relationship_loads_skip_deleted_rows(db):
+    """Test that the default criteria hide deleted rows unless a query opts in."""
+    assert [binder.id for binder in db.query(Binder)] == [1]
+    assert db.get(Binder, 2) is None
+    assert [sheet.id for sheet in db.get(Binder, 1).sheets] == [1]
+    
+    everything = db.query(Sheet).execution_options(**{INCLUDE_DELETED: True})
+    assert everything.count() == 2
+
+
+def test_soft_deleted_instances_can_still_be_refreshed(db):
+    """Test that reloading expired attributes is not filtered."""
+    sheet = db.get(Sheet, 1)
+    sheet.is_deleted = True
+    db.commit()
+    assert sheet.status == "open"
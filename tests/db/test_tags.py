@@ -0,0 +1,78 @@
+"""Tests for JSONB tag columns, containment filters and bulk tag updates."""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+from core.db.tags import _without, bulk_update_tags, tags_condition
+from tests.db.models import Ticket
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        Ticket(id=1, organization_id=1, tags=["urgent", "contract"]),
+        Ticket(id=2, organization_id=1, tags=["contract"]),
+        Ticket(id=3, organization_id=2, tags=["urgent", "contract"]),
+    ])
+    db.commit()
+    return db
+
+
+def test_in_place_mutations_are_flushed(db):
+    """Test that append/remove on a loaded tag list persist."""
+    ticket = db.get(Ticket, 2)
+    ticket.tags.append("urgent")
+    db.commit()
+    db.expire_all()
+    
+    assert db.get(Ticket, 2).tags == ["contract", "urgent"]
+
+
+def test_tags_condition_requires_every_tag(db):
+    """Test that filtering by several tags matches rows carrying all of them."""
+    matched = db.query(Ticket.id).filter(
+        Ticket.organization_id == 1,
+        tags_condition(db, Ticket.tags, ["contract", "urgent"])
+    )
+    assert [row.id for row in matched] == [1]
+
+
+def test_postgres_uses_containment_and_set_based_updates():
+    """Test the SQL emitted for Postgres: @> filters and jsonb array operators."""
+    postgres = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+    
+    condition = tags_condition(postgres, Ticket.tags, ["urgent"])
+    assert "@>" in str(condition.compile(dialect=postgresql.dialect()))
+    
+    statement = update(Ticket).values(tags=_without(Ticket.tags, ["urgent"]))
+    assert "- CAST(ARRAY[" in str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_bulk_update_tags_is_scoped_to_organization(db):
+    """Test adding and removing tags across rows of one organization."""
+    assert sorted(bulk_update_tags(db, Ticket, [1, 2, 3], 1, ["vip"])) == [1, 2]
+    bulk_update_tags(db, Ticket, [1, 2], 1, ["contract"], remove=True)
+    db.commit()
+    db.expire_all()
+    
+    assert db.get(Ticket, 1).tags == ["urgent", "vip"]
+    assert db.get(Ticket, 2).tags == ["vip"]
+    assert db.get(Ticket, 3).tags == ["urgent", "contract"]
+
+
+def test_fallback_filter_escapes_like_wildcards(db):
+    """Test that tags containing % or _ only match themselves off Postgres."""
+    db.add(Ticket(id=4, organization_id=1, tags=["50%_off"]))
+    db.commit()
+    
+    def matched(tag):
+        return [
+            row.id for row in db.query(Ticket.id).filter(tags_condition(db, Ticket.tags, [tag]))
+        ]
+    
+    assert matched("50%_off") == [4]
+    assert matched("%") == []
+    assert matched("_") == []
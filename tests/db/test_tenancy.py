@@ -0,0 +1,38 @@
+"""Tests for the tenant-scoped repository."""
+
+import pytest
+
+from core.db.tenancy import TenantRepository
+from core.exceptions import PermissionError, ValidationError
+from tests.db.models import Ticket
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        Ticket(id=1, organization_id=1, title="smith"),
+        Ticket(id=2, organization_id=1, title="jones", is_deleted=True),
+        Ticket(id=3, organization_id=2, title="smith"),
+    ])
+    db.commit()
+    return db
+
+
+def test_lookups_only_see_the_organizations_live_rows(db):
+    """Test that every repository read is scoped to one organization."""
+    tickets = TenantRepository(db, Ticket, 1)
+    assert [ticket.id for ticket in tickets.query()] == [1]
+    assert tickets.get_by("title", "smith").id == 1
+    assert tickets.get(3) is None
+    assert tickets.get(2) is None
+
+
+def test_added_rows_are_stamped_with_the_organization(db):
+    """Test that new rows join the repository's organization and foreign rows are refused."""
+    tickets = TenantRepository(db, Ticket, 2)
+    assert tickets.add(Ticket(id=4, title="new")).organization_id == 2
+    
+    with pytest.raises(PermissionError):
+        tickets.add(Ticket(id=5, organization_id=1, title="other"))
+    with pytest.raises(ValidationError):
+        TenantRepository(db, Ticket, None)
@@ -0,0 +1,106 @@
+"""Tests for the request-scoped unit of work and lazy model saves."""
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, String, create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from core.db.unit_of_work import UnitOfWorkRoute, request_unit_of_work, unit_of_work
+from models.base import BaseModel, IntegerPrimaryKeyMixin
+
+
+class Memo(IntegerPrimaryKeyMixin, BaseModel):
+    __tablename__ = "uow_memos"
+    
+    title = Column(String(100), nullable=False)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'uow.db'}")
+    Memo.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(engine):
+    seen = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: seen.append(statement.split()[0])
+    )
+    event.listen(engine, "commit", lambda conn: seen.append("COMMIT"))
+    return seen
+
+
+def _titles(engine):
+    with sessionmaker(bind=engine)() as db:
+        return sorted(title for (title,) in db.query(Memo.title))
+
+
+def test_unit_of_work_commits_once(engine, statements):
+    """Test that saves inside a unit of work share one flush and one commit."""
+    db = sessionmaker(bind=engine, autoflush=True)()
+    with unit_of_work(db):
+        for index in range(5):
+            Memo(title=f"memo {index}").save(db)
+        assert statements == []
+    
+    assert statements.count("COMMIT") == 1
+    assert "SELECT" not in statements
+    assert len(_titles(engine)) == 5
+
+
+def test_flushed_save_returns_server_defaults_without_refresh(engine, statements):
+    """Test that a flushing save gets the id and server defaults from the INSERT itself."""
+    db = sessionmaker(bind=engine)()
+    with unit_of_work(db):
+        memo = Memo(title="memo")
+        memo.save(db, flush=True)
+        assert memo.id is not None and memo.created_at is not None
+        assert "SELECT" not in statements
+
+
+def test_unit_of_work_rolls_back_on_error(engine):
+    """Test that an error discards every save in the block, including nested ones."""
+    db = sessionmaker(bind=engine)()
+    with pytest.raises(RuntimeError):
+        with unit_of_work(db):
+            Memo(title="first").save(db)
+            with unit_of_work(db):
+                Memo(title="nested").save(db)
+            raise RuntimeError("boom")
+    
+    Memo(title="standalone").save(db)
+    assert _titles(engine) == ["standalone"]
+
+
+def test_route_commits_after_successful_endpoints_only(engine, statements):
+    """Test that UnitOfWorkRoute commits the request's session once, and never after an error."""
+    factory = sessionmaker(bind=engine, autoflush=True)
+    
+    def get_uow_db(request: Request):
+        yield from request_unit_of_work(request, factory())
+    
+    router = APIRouter(route_class=UnitOfWorkRoute)
+    
+    @router.post("/memos")
+    def create(titles: str, db=Depends(get_uow_db)):
+        for title in titles.split(","):
+            Memo(title=title).save(db)
+        if "conflict" in titles:
+            raise HTTPException(status_code=409, detail="Conflict")
+        return {"count": db.query(Memo).count()}
+    
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    
+    assert client.post("/memos", params={"titles": "a,b,c"}).json() == {"count": 3}
+    assert statements.count("COMMIT") == 1
+    
+    assert client.post("/memos", params={"titles": "d,conflict"}).status_code == 409
+    assert _titles(engine) == ["a", "b", "c"]
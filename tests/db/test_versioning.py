@@ -0,0 +1,89 @@
+"""Tests for optimistic locking on versioned models."""
+
+import pytest
+
+from core.db.bulk import bulk_rewrite, bulk_update
+from core.db.versioning import (
+    apply_update,
+    check_version,
+    conflict_exception,
+    etag,
+    flush_versioned,
+    parse_if_match,
+)
+from core.exceptions import ConflictError, ValidationError
+from tests.db.models import Brief, BriefStatus
+
+
+@pytest.fixture
+def factory(factory):
+    with factory() as db:
+        db.add(Brief(id=1, title="Motion"))
+        db.commit()
+    return factory
+
+
+def test_if_match_round_trips_the_etag():
+    """Test that the ETag sent back as If-Match yields the version."""
+    assert parse_if_match(etag(3)) == 3
+    assert parse_if_match('W/"4", "5"') == 4
+    assert parse_if_match("*") is None and parse_if_match(None) is None
+    with pytest.raises(ValidationError):
+        parse_if_match('"abc"')
+
+
+def test_updates_bump_the_version_and_apply_enums(factory):
+    """Test that the mapper versions updates and schema enums are converted."""
+    with factory() as db:
+        brief = db.get(Brief, 1)
+        assert brief.version == 1
+        check_version(brief, 1)
+        
+        apply_update(brief, {"status": "filed", "missing": "ignored"})
+        flush_versioned(db, brief)
+        assert brief.status is BriefStatus.FILED
+        assert brief.version == 2
+        db.commit()
+        
+        with pytest.raises(ConflictError) as error:
+            check_version(brief, 1)
+        assert error.value.details == {"current_version": 2}
+
+
+def test_concurrent_update_is_a_conflict_with_the_current_version(factory):
+    """Test that the slower of two editors gets a 409 instead of overwriting."""
+    first, second = factory(), factory()
+    mine, theirs = first.get(Brief, 1), second.get(Brief, 1)
+    
+    theirs.title = "Their motion"
+    second.commit()
+    
+    mine.title = "My motion"
+    with pytest.raises(ConflictError) as error:
+        flush_versioned(first, mine)
+    
+    response = conflict_exception(error.value)
+    assert response.status_code == 409
+    assert response.detail["current_version"] == 2
+    assert response.headers == {"ETag": '"2"'}
+    first.close()
+    second.close()
+
+
+def test_bulk_actions_bump_the_version_so_stale_edits_conflict(factory):
+    """Test that an If-Match taken before a bulk action is refused afterwards."""
+    with factory() as db:
+        db.add(Brief(id=2, title="Reply", labels=["a"]))
+        db.commit()
+        stale = parse_if_match(etag(db.get(Brief, 1).version))
+        
+        bulk_update(db, Brief, [1, 2], 1, {Brief.status: BriefStatus.FILED})
+        assert bulk_rewrite(db, Brief, Brief.labels, [1, 2], 1, lambda labels: ["b"]) == [1, 2]
+        db.commit()
+        db.expire_all()
+        assert [db.get(Brief, id).version for id in (1, 2)] == [3, 3]
+        
+        brief = db.get(Brief, 1)
+        with pytest.raises(ConflictError) as error:
+            check_version(brief, stale)
+        assert conflict_exception(error.value).status_code == 409
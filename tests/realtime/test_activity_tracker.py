@@ -0,0 +1,122 @@
+"""Tests for Redis Streams activity aggregation."""
+
+import asyncio
+
+import pytest
+
+from services.realtime.activity_tracker import ActivityTracker, ActivityType
+
+fake_aioredis = pytest.importorskip("fakeredis.aioredis")
+
+
+def _run(scenario):
+    async def run():
+        tracker = ActivityTracker(consumer_name="test")
+        tracker.redis_client = fake_aioredis.FakeRedis(decode_responses=True)
+        try:
+            return await scenario(tracker)
+        finally:
+            await tracker.redis_client.flushall()
+    
+    return asyncio.run(run())
+
+
+def test_consumer_group_aggregates_counters_and_feeds():
+    """Test that stream entries fold into window counters and capped feeds."""
+    async def scenario(tracker):
+        await tracker.record_activity("org-1", "u1", ActivityType.DOCUMENT_VIEWED, "doc-1")
+        await tracker.record_activity("org-1", "u1", ActivityType.DOCUMENT_EDITED, "doc-1")
+        await tracker.record_activity("org-1", "u2", ActivityType.DOCUMENT_VIEWED, "doc-2")
+        await tracker.record_activity("org-2", "u3", ActivityType.COMMENT_ADDED, "doc-9")
+        
+        await tracker._refresh_streams()
+        processed = await tracker.process_pending()
+        dashboard = await tracker.get_dashboard("org-1", window="1h")
+        doc_feed = await tracker.get_recent_activity("org-1", document_id="doc-1")
+        pending = await tracker.redis_client.xpending(
+            "activity:stream:org-1", "activity-aggregators"
+        )
+        return processed, dashboard, doc_feed, pending
+    
+    processed, dashboard, doc_feed, pending = _run(scenario)
+    
+    assert processed == 4
+    assert dashboard["totals"] == {"document.viewed": 2, "document.edited": 1}
+    assert dashboard["documents"]["doc-1"] == {"document.viewed": 1, "document.edited": 1}
+    assert dashboard["users"]["u2"] == {"document.viewed": 1}
+    assert [entry["user_id"] for entry in dashboard["recent"]] == ["u2", "u1", "u1"]
+    assert [entry["activity_type"] for entry in doc_feed] == ["document.edited", "document.viewed"]
+    assert pending["pending"] == 0
+
+
+def test_unacknowledged_entries_are_reprocessed_after_restart():
+    """Test that entries read but never acknowledged are aggregated on restart."""
+    async def scenario(tracker):
+        await tracker.record_activity("org-1", "u1", ActivityType.DOCUMENT_VIEWED, "doc-1")
+        await tracker._refresh_streams()
+        
+        # Simulate a crash after delivery but before acknowledgement
+        await tracker.redis_client.xreadgroup(
+            "activity-aggregators", "test", {"activity:stream:org-1": ">"}
+        )
+        tracker._streams = {}
+        await tracker._refresh_streams()
+        
+        processed = await tracker.process_pending()
+        counts = await tracker.get_activity_counts("org-1", window="24h")
+        return processed, counts
+    
+    processed, counts = _run(scenario)
+    
+    assert processed == 1
+    assert counts["totals"] == {"document.viewed": 1}
+
+
+def test_idle_entries_of_a_dead_consumer_are_claimed():
+    """Test that another consumer's stale deliveries are reclaimed and aggregated."""
+    async def scenario(tracker):
+        await tracker.record_activity("org-1", "u1", ActivityType.DOCUMENT_VIEWED, "doc-1")
+        await tracker.record_activity("org-1", "u2", ActivityType.DOCUMENT_EDITED, "doc-1")
+        await tracker._refresh_streams()
+        
+        # Delivered to a node that died before acknowledging
+        await tracker.redis_client.xreadgroup(
+            "activity-aggregators", "dead-pod", {"activity:stream:org-1": ">"}
+        )
+        before = await tracker.process_pending()
+        
+        tracker.claim_min_idle_ms = 0
+        claimed = await tracker.claim_idle()
+        counts = await tracker.get_activity_counts("org-1", window="1h")
+        pending = await tracker.redis_client.xpending(
+            "activity:stream:org-1", "activity-aggregators"
+        )
+        return before, claimed, counts, pending
+    
+    before, claimed, counts, pending = _run(scenario)
+    
+    assert before == 0
+    assert claimed == 2
+    assert counts["totals"] == {"document.viewed": 1, "document.edited": 1}
+    assert pending["pending"] == 0
+
+
+def test_recent_entries_of_other_consumers_are_not_claimed():
+    """Test that entries younger than the min-idle time stay with their consumer."""
+    async def scenario(tracker):
+        await tracker.record_activity("org-1", "u1", ActivityType.DOCUMENT_VIEWED, "doc-1")
+        await tracker._refresh_streams()
+        await tracker.redis_client.xreadgroup(
+            "activity-aggregators", "busy-pod", {"activity:stream:org-1": ">"}
+        )
+        
+        tracker.claim_min_idle_ms = 60000
+        return await tracker.claim_idle()
+    
+    assert _run(scenario) == 0
+
+
+def test_unknown_window_is_rejected():
+    """Test that only configured windows can be queried."""
+    with pytest.raises(ValueError):
+        _run(lambda tracker: tracker.get_activity_counts("org-1", window="30d"))
@@ -0,0 +1,93 @@
+"""Tests for per-connection frame delivery in the broadcaster."""
+
+import asyncio
+import json
+
+import pytest
+
+from services.realtime.broadcaster import FrameType, RealtimeBroadcaster
+from services.realtime.framing import FrameFormat, decode_frame
+
+
+class RecordingWebSocket:
+    """Collects frames sent to it."""
+    
+    def __init__(self):
+        self.text = []
+        self.binary = []
+    
+    async def send_text(self, data):
+        self.text.append(data)
+    
+    async def send_bytes(self, data):
+        self.binary.append(data)
+
+
+class Registry:
+    """Connections keyed by id, with room and user membership."""
+    
+    def __init__(self):
+        self.sockets = {}
+        self.rooms = {}
+        self.users = {}
+    
+    def add(self, connection_id, user_id, room_id):
+        self.sockets[connection_id] = RecordingWebSocket()
+        self.rooms.setdefault(room_id, []).append(connection_id)
+        self.users.setdefault(user_id, []).append(connection_id)
+        return self.sockets[connection_id]
+    
+    def room_connections(self, room_id):
+        return [(cid, self.sockets[cid]) for cid in self.rooms.get(room_id, [])]
+    
+    def user_connections(self, user_id):
+        return [(cid, self.sockets[cid]) for cid in self.users.get(user_id, [])]
+    
+    def all_connections(self):
+        return list(self.sockets.items())
+
+
+def test_room_frames_use_each_connections_format():
+    """Test room sends honour the format recorded for each connection."""
+    pytest.importorskip("msgpack")
+    
+    registry = Registry()
+    text_ws = registry.add("c1", "u1", "document:1")
+    binary_ws = registry.add("c2", "u2", "document:1")
+    registry.add("c3", "u3", "document:2")
+    broadcaster = RealtimeBroadcaster(connections=registry)
+    broadcaster.set_frame_format("c2", FrameFormat.MSGPACK)
+    
+    delivered = asyncio.run(
+        broadcaster.send_to_room("document:1", FrameType.DOCUMENT_UPDATE, {"version": 2})
+    )
+    
+    assert delivered == 2
+    frame = json.loads(text_ws.text[0])
+    assert frame["type"] == "document_update"
+    assert frame["room_id"] == "document:1"
+    assert decode_frame(binary_ws.binary[0], FrameFormat.MSGPACK) == frame
+
+
+def test_user_sends_reach_every_connection_once():
+    """Test repeated user ids do not duplicate frames."""
+    registry = Registry()
+    first = registry.add("c1", "u1", "document:1")
+    second = registry.add("c2", "u1", "document:2")
+    broadcaster = RealtimeBroadcaster(connections=registry)
+    broadcaster.set_frame_format("c2", FrameFormat.MSGPACK)
+    broadcaster.forget_connection("c2")
+    
+    delivered = asyncio.run(
+        broadcaster.send_to_users(["u1", "u1"], FrameType.NOTIFICATION, {"title": "Hi"})
+    )
+    
+    assert delivered == 2
+    assert len(first.text) == 1 and len(second.text) == 1
+
+
+def test_nothing_is_delivered_without_a_registry():
+    """Test sends are no-ops until a connection registry is attached."""
+    broadcaster = RealtimeBroadcaster()
+    
+    assert asyncio.run(broadcaster.send_to_all(FrameType.SYSTEM_MESSAGE, {})) == 0
@@ -0,0 +1,111 @@
+"""Tests for the bounded TTL cache used by realtime services."""
+
+import pytest
+
+from services.realtime.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock for deterministic expiry."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_lru_eviction_keeps_recently_used_entries(clock):
+    """Test that the least recently used entry is evicted when full."""
+    evicted = []
+    cache = TTLCache(max_entries=2, on_evict=lambda k, v: evicted.append(k), clock=clock)
+    
+    cache["a"] = 1
+    cache["b"] = 2
+    cache.get("a")
+    cache["c"] = 3
+    
+    assert cache.keys() == ["a", "c"]
+    assert evicted == ["b"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    """Test lazy expiry on access."""
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+    cache["a"] = 1
+    
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    
+    clock.now = 5
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert len(cache) == 0
+
+
+def test_touch_extends_deadline(clock):
+    """Test that touch() pushes the deadline out."""
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+    cache["a"] = 1
+    
+    clock.now = 4
+    assert cache.touch("a") is True
+    
+    clock.now = 8
+    assert cache["a"] == 1
+    assert cache.touch("missing") is False
+
+
+def test_pop_expired_returns_only_expired_entries(clock):
+    """Test heap-driven expiry skips superseded deadlines."""
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache.set("forever", 3, ttl=None)
+    
+    clock.now = 3
+    cache["a"] = 10  # Re-set moves the deadline to 8
+    
+    clock.now = 6
+    assert cache.pop_expired() == [("b", 2)]
+    assert sorted(cache.keys()) == ["a", "forever"]
+    
+    clock.now = 100
+    assert cache.pop_expired() == [("a", 10)]
+    assert cache.keys() == ["forever"]
+
+
+def test_heap_is_compacted_on_repeated_sets(clock):
+    """Test that superseded deadlines do not grow the heap without bound."""
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+    for i in range(1000):
+        cache["a"] = i
+    
+    assert len(cache._heap) <= 2 * len(cache) + 65
+
+
+def test_pop_and_delete(clock):
+    """Test explicit removal does not call on_evict."""
+    evicted = []
+    cache = TTLCache(max_entries=10, on_evict=lambda k, v: evicted.append(k), clock=clock)
+    cache["a"] = 1
+    cache["b"] = 2
+    
+    assert cache.pop("a") == 1
+    del cache["b"]
+    assert cache.pop("c", None) is None
+    with pytest.raises(KeyError):
+        cache.pop("c")
+    assert evicted == []
+
+
+def test_invalid_size():
+    """Test that the cache refuses a zero bound."""
+    with pytest.raises(ValueError):
+        TTLCache(max_entries=0)
@@ -0,0 +1,72 @@
+"""Tests for WebSocket frame negotiation and encoding."""
+
+import asyncio
+import json
+
+import pytest
+
+from services.realtime import framing
+from services.realtime.framing import (
+    EncodedMessage,
+    FrameFormat,
+    decode_frame,
+    fan_out,
+    negotiate_frame_format,
+)
+
+
+class RecordingWebSocket:
+    """Collects frames sent to it."""
+    
+    def __init__(self):
+        self.text = []
+        self.binary = []
+    
+    async def send_text(self, data):
+        self.text.append(data)
+    
+    async def send_bytes(self, data):
+        self.binary.append(data)
+
+
+def test_json_is_the_default_format():
+    """Test clients that offer nothing get JSON text frames."""
+    assert negotiate_frame_format([]) == (FrameFormat.JSON, None)
+    assert negotiate_frame_format(["goldleaves.json.v1"]) == (
+        FrameFormat.JSON, "goldleaves.json.v1"
+    )
+
+
+def test_msgpack_negotiated_via_subprotocol():
+    """Test MessagePack is chosen when offered and installed."""
+    pytest.importorskip("msgpack")
+    
+    fmt, subprotocol = negotiate_frame_format(["goldleaves.json.v1", "goldleaves.msgpack.v1"])
+    assert fmt == FrameFormat.MSGPACK
+    assert subprotocol == "goldleaves.msgpack.v1"
+    assert negotiate_frame_format([], requested_format="msgpack") == (FrameFormat.MSGPACK, None)
+
+
+def test_msgpack_falls_back_when_unavailable(monkeypatch):
+    """Test negotiation never picks a format the server cannot encode."""
+    monkeypatch.setattr(framing, "msgpack", None)
+    
+    assert negotiate_frame_format(["goldleaves.msgpack.v1"]) == (FrameFormat.JSON, None)
+
+
+def test_message_encoded_once_per_format():
+    """Test fan-out encodes each format a single time."""
+    pytest.importorskip("msgpack")
+    
+    message = EncodedMessage({"event_type": "document.updated", "data": {"changes": {"a": 1}}})
+    json_clients = [RecordingWebSocket() for _ in range(3)]
+    binary_clients = [RecordingWebSocket() for _ in range(2)]
+    targets = [(ws, FrameFormat.JSON) for ws in json_clients]
+    targets += [(ws, FrameFormat.MSGPACK) for ws in binary_clients]
+    
+    delivered = asyncio.run(fan_out(message, targets))
+    
+    assert delivered == 5
+    assert message.formats_encoded == 2
+    assert json.loads(json_clients[0].text[0]) == message.message
+    assert decode_frame(binary_clients[0].binary[0], FrameFormat.MSGPACK) == message.message
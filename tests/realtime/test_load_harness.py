@@ -0,0 +1,34 @@
+"""Smoke test for the realtime load-testing harness."""
+
+import pytest
+
+pytest.importorskip("fakeredis")
+
+from benchmarks.realtime_load import LoadConfig, run_load_test
+from services.realtime.framing import FrameFormat, msgpack_available
+
+
+@pytest.mark.parametrize("frame_format", [FrameFormat.JSON, FrameFormat.MSGPACK])
+def test_small_load_run_reports_fanout_and_memory(frame_format):
+    """Test a short run through the broadcaster against fakeredis produces a complete report."""
+    if frame_format == FrameFormat.MSGPACK and not msgpack_available():
+        pytest.skip("msgpack is not installed")
+    
+    config = LoadConfig(
+        clients=40,
+        rooms=4,
+        update_rate=50,
+        presence_rate=20,
+        duration=0.3,
+        payload_bytes=64,
+        frame_format=frame_format
+    )
+    
+    report = run_load_test(config)
+    
+    assert report.errors == 0
+    assert report.updates_sent > 0
+    # Every room member gets each update, and only updates reach the registry
+    assert report.frames_delivered == report.updates_sent * (config.clients // config.rooms)
+    assert report.fanout_p50_ms <= report.fanout_p99_ms <= report.fanout_max_ms
+    assert report.memory_per_connection_bytes > 0
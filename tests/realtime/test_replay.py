@@ -0,0 +1,118 @@
+"""Tests for the per-room replay buffer."""
+
+import asyncio
+import json
+
+import pytest
+
+from services.realtime.replay import ReplayBuffer
+
+
+def _frame(n):
+    return {"event_type": "document.updated", "data": {"n": n}}
+
+
+def test_resume_returns_only_missed_frames():
+    """Test that a client resuming at last_seq gets the frames after it."""
+    async def run():
+        buffer = ReplayBuffer(max_frames=10)
+        seqs = [await buffer.append("document:1", _frame(n)) for n in range(5)]
+        return seqs, await buffer.since("document:1", 2), await buffer.since("document:1", 5)
+    
+    seqs, missed, current = asyncio.run(run())
+    
+    assert seqs == [1, 2, 3, 4, 5]
+    assert missed["complete"] is True
+    assert [frame["seq"] for frame in missed["frames"]] == [3, 4, 5]
+    assert [frame["data"]["n"] for frame in missed["frames"]] == [2, 3, 4]
+    assert current == {"room_id": "document:1", "seq": 5, "frames": [], "complete": True}
+
+
+def test_resume_past_the_ring_requires_full_refetch():
+    """Test that trimmed frames are reported instead of silently skipped."""
+    async def run():
+        buffer = ReplayBuffer(max_frames=3)
+        for n in range(5):
+            await buffer.append("document:1", _frame(n))
+        return await buffer.since("document:1", 0), await buffer.since("document:1", 2)
+    
+    trimmed, covered = asyncio.run(run())
+    
+    assert trimmed["complete"] is False
+    assert trimmed["frames"] == []
+    assert [frame["seq"] for frame in covered["frames"]] == [3, 4, 5]
+
+
+def test_frames_from_other_nodes_are_ordered():
+    """Test that relayed frames arriving out of order replay in sequence."""
+    async def run():
+        buffer = ReplayBuffer(max_frames=10)
+        for seq in (1, 3, 2, 3):
+            buffer.remember("document:1", {**_frame(seq), "seq": seq})
+        return await buffer.since("document:1", 1)
+    
+    missed = asyncio.run(run())
+    
+    assert missed["complete"] is True
+    assert [frame["seq"] for frame in missed["frames"]] == [2, 3]
+
+
+def test_resume_reads_backing_stream_when_not_buffered_locally():
+    """Test that a node can replay frames another node appended to Redis."""
+    fake_aioredis = pytest.importorskip("fakeredis.aioredis")
+    
+    async def run():
+        client = fake_aioredis.FakeRedis(decode_responses=True)
+        for seq in range(1, 5):
+            await client.xadd(
+                "replay:stream:document:1", {"frame": json.dumps(_frame(seq))}, id=f"{seq}-0"
+            )
+        await client.set("replay:seq:document:1", 4)
+        
+        buffer = ReplayBuffer(max_frames=10)
+        buffer.attach(client)
+        return await buffer.since("document:1", 1)
+    
+    missed = asyncio.run(run())
+    
+    assert missed["complete"] is True
+    assert [frame["seq"] for frame in missed["frames"]] == [2, 3, 4]
+
+
+def test_redis_failure_never_invents_a_sequence_number():
+    """Test that an unsequenced frame forces a refetch for earlier positions."""
+    class FailingScript:
+        async def __call__(self, keys, args):
+            raise ConnectionError("redis down")
+    
+    async def run():
+        buffer = ReplayBuffer(max_frames=10)
+        first = await buffer.append("document:1", _frame(1))
+        buffer._append_script = FailingScript()
+        second = await buffer.append("document:1", _frame(2))
+        buffer._append_script = None
+        third = await buffer.append("document:1", _frame(3))
+        resumes = await buffer.since("document:1", 1), await buffer.since("document:1", 2)
+        return (first, second, third), resumes
+    
+    seqs, (across_gap, after_gap) = asyncio.run(run())
+    
+    assert seqs == (1, None, 2)
+    assert across_gap["complete"] is False
+    assert after_gap["complete"] is True
+    assert after_gap["frames"] == []
+
+
+def test_unsequenced_frames_from_other_nodes_mark_the_room():
+    """Test that a relayed frame without a seq makes earlier resumes incomplete."""
+    async def run():
+        buffer = ReplayBuffer(max_frames=10)
+        buffer.remember("document:1", {**_frame(1), "seq": 1})
+        buffer.remember("document:1", _frame(2))
+        buffer.remember("document:1", {**_frame(3), "seq": 2})
+        return await buffer.since("document:1", 0), await buffer.since("document:1", 1)
+    
+    before_gap, at_gap = asyncio.run(run())
+    
+    assert before_gap["complete"] is False
+    assert at_gap["complete"] is False
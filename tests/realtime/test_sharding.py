@@ -0,0 +1,102 @@
+"""Tests for consistent-hash room ownership."""
+
+import asyncio
+import json
+
+from services.realtime.sharding import HashRing, ShardCoordinator
+
+
+class FakeRedis:
+    """Records publishes."""
+    
+    def __init__(self):
+        self.published = []
+    
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+def test_ring_assigns_every_room_to_a_live_node():
+    """Test that every key maps to one of the ring's nodes."""
+    ring = HashRing(["node-a", "node-b", "node-c"])
+    owners = {ring.owner(f"document:{i}") for i in range(1000)}
+    
+    assert owners == {"node-a", "node-b", "node-c"}
+    assert HashRing().owner("document:1") is None
+
+
+def test_ring_moves_few_rooms_when_a_node_joins():
+    """Test that adding a node only reassigns rooms to the new node."""
+    rooms = [f"document:{i}" for i in range(2000)]
+    ring = HashRing(["node-a", "node-b", "node-c"])
+    before = {room: ring.owner(room) for room in rooms}
+    
+    ring.rebuild(["node-a", "node-b", "node-c", "node-d"])
+    moved = [room for room in rooms if ring.owner(room) != before[room]]
+    
+    assert all(ring.owner(room) == "node-d" for room in moved)
+    assert 0.1 < len(moved) / len(rooms) < 0.4
+
+
+def test_rebalance_releases_rooms_no_longer_owned():
+    """Test that a node drops aggregated state for rooms it loses."""
+    coordinator = ShardCoordinator(node_id="node-a")
+    coordinator._update_ring(["node-a"])
+    
+    for i in range(200):
+        event = {"user_id": "u1", "action": "joined"}
+        asyncio.run(coordinator._apply_event(f"document:{i}", event))
+    assert len(coordinator._room_state) == 200
+    
+    coordinator._update_ring(["node-a", "node-b"])
+    
+    assert 0 < len(coordinator._room_state) < 200
+    assert all(coordinator.is_owner(room) for room in coordinator._room_state.keys())
+
+
+def test_owner_publishes_compact_snapshot_to_relays():
+    """Test that events fold into one snapshot per room per flush."""
+    asyncio.run(_owner_publishes_snapshot())
+
+
+async def _owner_publishes_snapshot():
+    coordinator = ShardCoordinator(node_id="node-a")
+    received = []
+    
+    async def handler(room_id, snapshot):
+        received.append(snapshot)
+    
+    coordinator.on_snapshot(handler)
+    await coordinator.track_room("document:1", "u1")
+    await coordinator.submit_room_event("document:1", {"user_id": "u1", "action": "joined"})
+    await coordinator.submit_room_event("document:1", {"user_id": "u2", "action": "joined"})
+    await coordinator.submit_room_event(
+        "document:1", {"user_id": "u2", "action": "status", "status": "away"}
+    )
+    
+    assert await coordinator.flush_snapshots() == 1
+    assert len(received) == 1
+    assert received[0]["version"] == 1
+    assert dict(received[0]["members"]) == {"u1": "online", "u2": "away"}
+
+
+def test_misrouted_events_are_forwarded_once_then_dropped():
+    """Test that nodes disagreeing on a room's owner cannot bounce an event forever."""
+    asyncio.run(_misrouted_events())
+
+
+async def _misrouted_events():
+    coordinator = ShardCoordinator(node_id="node-a")
+    coordinator.redis_client = FakeRedis()
+    coordinator._update_ring(["node-a", "node-b"])
+    room_id = next(f"document:{i}" for i in range(100) if not coordinator.is_owner(f"document:{i}"))
+    event = {"user_id": "u1", "action": "joined"}
+    
+    await coordinator._receive_room_event({"room_id": room_id, "event": event})
+    assert coordinator.redis_client.published == [
+        ("realtime:node:node-b", {"room_id": room_id, "event": event, "hops": 2})
+    ]
+    
+    await coordinator._receive_room_event({"room_id": room_id, "event": event, "hops": 2})
+    assert len(coordinator.redis_client.published) == 1
+    assert room_id not in coordinator._room_state.keys()
@@ -0,0 +1,98 @@
+"""Tests for real-time service startup ordering, readiness and retry."""
+
+import asyncio
+
+from services.realtime import startup
+from services.realtime.startup import RealtimeServiceManager, ServiceState
+
+
+class FakeRedis:
+    """Client whose ping succeeds once the service is marked healthy."""
+    
+    def __init__(self, service):
+        self.service = service
+    
+    async def ping(self):
+        if not self.service.healthy:
+            raise ConnectionError("Connection refused")
+        return True
+
+
+class FakeService:
+    """Service that records start order and the pool it was given."""
+    
+    def __init__(self, name, events, healthy=True):
+        self.name = name
+        self.events = events
+        self.healthy = healthy
+        self.redis_client = None
+        self.pool = None
+    
+    async def start(self, connection_pool=None):
+        self.events.append(("start", self.name))
+        await asyncio.sleep(0)
+        self.pool = connection_pool
+        self.redis_client = FakeRedis(self)
+    
+    async def stop(self):
+        self.events.append(("stop", self.name))
+
+
+def _manager(services, dependencies):
+    manager = RealtimeServiceManager()
+    manager._services = [(service.name, service) for service in services]
+    manager._dependencies = dependencies
+    return manager
+
+
+def test_services_share_one_pool_and_respect_dependencies():
+    """Test that dependents start after their dependencies with the shared pool."""
+    events = []
+    base = FakeService("base", events)
+    dependent = FakeService("dependent", events)
+    other = FakeService("other", events)
+    manager = _manager([dependent, base, other], {"dependent": ("base",)})
+    
+    async def run():
+        await manager.start_all()
+        health = await manager.health_check()
+        await manager.stop_all()
+        return health
+    
+    health = asyncio.run(run())
+    
+    starts = [name for kind, name in events if kind == "start"]
+    assert starts.index("base") < starts.index("dependent")
+    assert base.pool is not None and base.pool is dependent.pool is other.pool
+    assert health["ready"] is True
+    assert health["services"]["dependent"] == "healthy"
+    assert health["service_details"]["dependent"]["state"] == ServiceState.READY.value
+
+
+def test_failed_service_is_retried_in_background(monkeypatch):
+    """Test that a service that fails its readiness check is restarted."""
+    monkeypatch.setattr(startup, "RETRY_INITIAL_DELAY", 0.01)
+    events = []
+    flaky = FakeService("flaky", events, healthy=False)
+    manager = _manager([flaky], {})
+    
+    async def run():
+        await manager.start_all()
+        degraded = await manager.health_check()
+        
+        flaky.healthy = True
+        await asyncio.wait_for(manager._retry_task, 1)
+        recovered = await manager.health_check()
+        await manager.stop_all()
+        return degraded, recovered
+    
+    degraded, recovered = asyncio.run(run())
+    
+    assert degraded["ready"] is False
+    assert degraded["status"] == "degraded"
+    assert degraded["services"]["flaky"] == "error: Connection refused"
+    assert degraded["service_details"]["flaky"]["state"] == ServiceState.FAILED.value
+    assert "Connection refused" in degraded["service_details"]["flaky"]["last_error"]
+    assert recovered["ready"] is True
+    assert recovered["services"]["flaky"] == "healthy"
+    assert recovered["service_details"]["flaky"]["attempts"] >= 2
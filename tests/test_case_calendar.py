@@ -0,0 +1,133 @@
+# tests/test_case_calendar.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.case import (
+    CalendarEntry,
+    CalendarEntryKind,
+    Case,
+    CaseEvent,
+    CaseStatus,
+    CaseTask,
+    CaseType,
+)
+from models.user import Base
+from services.case_calendar import iter_ical, iter_ndjson, rebuild_calendar_entries
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _days(n):
+    return datetime(2030, 1, 1) + timedelta(days=n)
+
+
+def _case(db, **fields):
+    case = Case(
+        id=1,
+        case_number="CASE-0001",
+        slug="case-1",
+        title="Calendar Matter",
+        case_type=CaseType.LITIGATION,
+        status=CaseStatus.OPEN,
+        client_id=1,
+        organization_id=1,
+        **fields
+    )
+    db.add(case)
+    db.commit()
+    return case
+
+
+def _calendar(db):
+    return [
+        (entry.kind, entry.entry_date)
+        for entry in db.query(CalendarEntry).order_by(CalendarEntry.entry_date)
+    ]
+
+
+def test_projection_merges_case_dates_events_and_tasks(db):
+    """Test that every dated item of a case lands in the calendar table."""
+    case = _case(db, deadline_date=_days(10), next_court_date=_days(3))
+    db.add_all([
+        CaseEvent(title="Hearing", event_date=_days(5), case_id=case.id, organization_id=1),
+        CaseTask(title="File brief", due_date=_days(7), case_id=case.id, organization_id=1),
+        CaseTask(title="Undated", case_id=case.id, organization_id=1),
+    ])
+    db.commit()
+    
+    assert _calendar(db) == [
+        (CalendarEntryKind.COURT_DATE, _days(3)),
+        (CalendarEntryKind.EVENT, _days(5)),
+        (CalendarEntryKind.TASK, _days(7)),
+        (CalendarEntryKind.DEADLINE, _days(10)),
+    ]
+
+
+def test_projection_follows_edits_completion_and_closing(db):
+    """Test that writes to cases and tasks rebuild the case's rows."""
+    case = _case(db, deadline_date=_days(10))
+    task = CaseTask(title="File brief", due_date=_days(7), case_id=case.id, organization_id=1)
+    db.add(task)
+    db.commit()
+    
+    case.deadline_date = _days(20)
+    task.complete_task()
+    db.commit()
+    assert _calendar(db) == [(CalendarEntryKind.DEADLINE, _days(20))]
+    
+    case.status = CaseStatus.CLOSED_WON
+    db.commit()
+    assert _calendar(db) == []
+
+
+def test_rolled_back_writes_leave_calendar_unchanged(db):
+    """Test that calendar rows share the writing transaction."""
+    case = _case(db, deadline_date=_days(10))
+    case.deadline_date = _days(1)
+    db.flush()
+    db.rollback()
+    
+    assert _calendar(db) == [(CalendarEntryKind.DEADLINE, _days(10))]
+
+
+def test_rebuild_restores_rows_written_behind_the_orm(db):
+    """Test that the projection can be rebuilt after bulk SQL."""
+    _case(db, deadline_date=_days(10), statute_of_limitations=_days(400))
+    db.query(CalendarEntry).delete()
+    db.commit()
+    
+    assert rebuild_calendar_entries(db, organization_id=1) == 2
+    assert len(_calendar(db)) == 2
+
+
+def test_exports_encode_each_entry(db):
+    """Test iCalendar escaping and folding, and one NDJSON line per entry."""
+    case = _case(db)
+    db.add(CaseEvent(
+        title="Hearing; courtroom 4, " + "x" * 80,
+        event_date=_days(5),
+        case_id=case.id,
+        organization_id=1
+    ))
+    db.commit()
+    entries = db.query(CalendarEntry).all()
+    
+    ical = "".join(iter_ical(entries))
+    assert ical.startswith("BEGIN:VCALENDAR\r\n") and ical.endswith("END:VCALENDAR\r\n")
+    assert "DTSTART:20300106T000000Z\r\n" in ical
+    assert "SUMMARY:Hearing\\; courtroom 4\\, " in ical
+    assert all(len(line.encode()) <= 75 for line in ical.split("\r\n"))
+    
+    lines = list(iter_ndjson(entries))
+    assert len(lines) == 1 and '"kind":"event"' in lines[0]
@@ -0,0 +1,113 @@
+# tests/test_case_rollups.py
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.db.invalidation import on_committed_write
+from models.case import BillingType, Case, CaseType, TimeEntry
+from models.user import Base
+from services.case_rollups import recalculate_case_rollups
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Case(
+        id=1,
+        case_number="CASE-0001",
+        slug="case-1",
+        title="Rollup Matter",
+        case_type=CaseType.LITIGATION,
+        billing_type=BillingType.HOURLY,
+        hourly_rate=Decimal("200.00"),
+        client_id=1,
+        organization_id=1
+    ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _entry(hours, billable=True, case_id=1):
+    return TimeEntry(
+        hours=Decimal(hours),
+        billable=billable,
+        description="Work",
+        date=datetime(2025, 1, 1),
+        case_id=case_id,
+        organization_id=1,
+        user_id=1
+    )
+
+
+def _hours(db):
+    case = db.get(Case, 1)
+    return case.actual_hours, case.billable_hours
+
+
+def test_rollups_follow_entry_inserts_edits_and_deletes(db):
+    """Test that case hours track time entries without summing them in Python."""
+    billable, internal = _entry("2.50"), _entry("1.00", billable=False)
+    db.add_all([billable, internal])
+    db.commit()
+    assert _hours(db) == (Decimal("3.50"), Decimal("2.50"))
+    
+    billable.hours = Decimal("4.00")
+    internal.billable = True
+    db.commit()
+    assert _hours(db) == (Decimal("5.00"), Decimal("5.00"))
+    
+    internal.soft_delete()
+    db.commit()
+    assert _hours(db) == (Decimal("4.00"), Decimal("4.00"))
+    
+    db.delete(billable)
+    db.commit()
+    assert _hours(db) == (Decimal("0.00"), Decimal("0.00"))
+
+
+def test_rolled_back_entries_leave_rollups_unchanged(db):
+    """Test that rollup updates share the entry's transaction."""
+    db.add(_entry("3.00"))
+    db.flush()
+    db.rollback()
+    assert _hours(db) == (Decimal("0.00"), Decimal("0.00"))
+
+
+def test_billable_amount_reads_rollups(db):
+    """Test that billable_amount works on instances and in SQL."""
+    db.add(_entry("1.50"))
+    db.commit()
+    
+    assert db.get(Case, 1).billable_amount == Decimal("300.00")
+    assert db.query(Case.billable_amount).scalar() == Decimal("300.00")
+
+
+def test_recalculate_repairs_rollups(db):
+    """Test that rollups can be rebuilt after writes that bypassed the ORM."""
+    db.add(_entry("2.00"))
+    db.commit()
+    db.query(Case).update({Case.actual_hours: 0, Case.billable_hours: 0})
+    db.commit()
+    
+    assert recalculate_case_rollups(db, organization_id=1) == 1
+    db.commit()
+    assert _hours(db) == (Decimal("2.00"), Decimal("2.00"))
+
+
+def test_rollup_updates_notify_case_caches_on_commit(db):
+    """Test that rollup UPDATEs drop cached case data like flushed case writes."""
+    notified = []
+    on_committed_write(Case, notified.append)
+    
+    db.add(_entry("1.00"))
+    db.flush()
+    assert notified == []
+    db.commit()
+    assert notified == [1]
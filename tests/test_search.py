@@ -0,0 +1,83 @@
+"""Tests for case and client full-text search helpers."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from services.search import match_condition, prefix_tsquery, search
+
+Base = declarative_base()
+
+
+class Matter(Base):
+    __tablename__ = "matters"
+    
+    id = Column(Integer, primary_key=True)
+    organization_id = Column(Integer, nullable=False)
+    title = Column(String(100), nullable=False)
+    is_deleted = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    search_vector = Column(postgresql.TSVECTOR().with_variant(String(), "sqlite"))
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Matter(organization_id=1, title="Smith v. Jones"),
+        Matter(organization_id=1, title="Estate of Smithers"),
+        Matter(organization_id=1, title="Smith lease", is_deleted=True),
+        Matter(organization_id=2, title="Smith holdings"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_prefix_tsquery_keeps_only_word_tokens():
+    """Test that every token becomes a prefix match and tsquery syntax is stripped."""
+    assert prefix_tsquery("Smith v. Jo") == "smith:* & v:* & jo:*"
+    assert prefix_tsquery("2024-CV-001") == "2024:* & cv:* & 001:*"
+    assert prefix_tsquery("a' | !b") == "a:* & b:*"
+    assert prefix_tsquery("  &|! ") is None
+
+
+def test_postgres_condition_uses_search_vector():
+    """Test that Postgres searches match the tsvector column and rank results."""
+    class PostgresBind:
+        dialect = postgresql.dialect()
+    
+    class PostgresSession:
+        def get_bind(self):
+            return PostgresBind()
+    
+    condition, rank = match_condition(PostgresSession(), Matter, "smi", [Matter.title])
+    sql = str(condition.compile(dialect=postgresql.dialect()))
+    assert "matters.search_vector @@ to_tsquery('simple'::regconfig" in sql
+    assert "ts_rank_cd" in str(rank.compile(dialect=postgresql.dialect()))
+
+
+def test_search_is_tenant_scoped_and_skips_deleted(db):
+    """Test that the fallback search only returns live rows of the organization."""
+    titles = {matter.title for matter in search(db, Matter, 1, "smith", [Matter.title])}
+    assert titles == {"Smith v. Jones", "Estate of Smithers"}
+    
+    assert search(db, Matter, 1, "smith", [Matter.title], limit=1)[0].organization_id == 1
+
+
+def test_fallback_treats_like_wildcards_literally(db):
+    """Test that empty terms match nothing and % or _ are not wildcards."""
+    db.add(Matter(organization_id=1, title="Smith_50% holdback"))
+    db.commit()
+    
+    assert search(db, Matter, 1, "", [Matter.title]) == []
+    assert search(db, Matter, 1, " % ", [Matter.title]) == []
+    assert [matter.title for matter in search(db, Matter, 1, "h_5", [Matter.title])] == [
+        "Smith_50% holdback"
+    ]
+    assert search(db, Matter, 1, "smith%jones", [Matter.title]) == []
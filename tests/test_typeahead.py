@@ -0,0 +1,162 @@
+"""Tests for the in-process typeahead index."""
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from core.db.invalidation import on_committed_rows
+from services import typeahead as typeahead_module
+from services.typeahead import PrefixIndex, TypeaheadIndex
+
+Base = declarative_base()
+
+
+class Matter(Base):
+    __tablename__ = "typeahead_matters"
+    
+    id = Column(Integer, primary_key=True)
+    organization_id = Column(Integer, nullable=False)
+    number = Column(String(50), nullable=False)
+    title = Column(String(100), nullable=False)
+
+
+def _rows(db, organization_id, ids=None):
+    query = db.query(Matter.id, Matter.number, Matter.title).filter(
+        Matter.organization_id == organization_id
+    )
+    return query if ids is None else query.filter(Matter.id.in_(ids))
+
+
+class FakeRedis:
+    """Just the string commands the index uses."""
+    
+    def __init__(self):
+        self.values = {}
+    
+    def get(self, name):
+        return self.values.get(name)
+    
+    def mget(self, names):
+        return [self.values.get(name) for name in names]
+    
+    def setex(self, name, seconds, value):
+        self.values[name] = value
+    
+    def incr(self, name):
+        self.values[name] = str(int(self.values.get(name, 0)) + 1)
+        return int(self.values[name])
+
+
+@pytest.fixture(autouse=True)
+def process_memory_only(monkeypatch):
+    monkeypatch.setattr(typeahead_module, "_redis_client", False)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Matter(organization_id=1, number="A-1", title="Smith v. Jones"),
+        Matter(organization_id=2, number="B-1", title="Smith holdings"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _counting(loads):
+    def loader(db, organization_id, ids=None):
+        loads.append(None if ids is None else sorted(ids))
+        return _rows(db, organization_id, ids)
+    return loader
+
+
+def test_prefix_index_matches_every_token_newest_first():
+    """Test that all term tokens must prefix-match and higher ids come first."""
+    index = PrefixIndex([
+        (1, "2024-CV-001", "Smith v. Jones"),
+        (2, "2024-CV-002", "Smithers estate"),
+        (3, "2025-FA-003", "Jones custody"),
+        (4, None, "Smith lease"),
+    ])
+    
+    assert index.search("smi") == [4, 2, 1]
+    assert index.search("smith jo") == [1]
+    assert index.search("cv-00") == [2, 1]
+    assert index.search("smi", limit=2) == [4, 2]
+    assert index.search("xyz") == []
+    assert index.search("  ") == []
+
+
+def test_indexes_are_bounded_by_organization_lru():
+    """Test that the least recently searched organization is dropped first."""
+    loads = []
+    
+    def loader(db, organization_id, ids=None):
+        loads.append(organization_id)
+        return [(organization_id, f"org {organization_id}")]
+    
+    typeahead = TypeaheadIndex("matter", loader, max_organizations=2)
+    typeahead.search(None, 1, "org")
+    typeahead.search(None, 2, "org")
+    typeahead.search(None, 1, "org")
+    typeahead.search(None, 3, "org")
+    typeahead.search(None, 1, "org")
+    typeahead.search(None, 2, "org")
+    
+    assert loads == [1, 2, 3, 2]
+    assert typeahead.stats()["organizations"] == 2
+
+
+def test_committed_writes_patch_only_the_written_rows(db):
+    """Test that a commit reloads just its rows, and only for its organization."""
+    loads = []
+    typeahead = TypeaheadIndex("matter", _counting(loads))
+    on_committed_rows(Matter, typeahead.rows_changed)
+    assert typeahead.search(db, 1, "smith") == [1]
+    assert typeahead.search(db, 2, "smith") == [2]
+    
+    db.add(Matter(organization_id=1, number="A-2", title="Smithers estate"))
+    db.flush()
+    assert typeahead.search(db, 1, "smith") == [1]
+    
+    db.commit()
+    assert typeahead.search(db, 1, "smith") == [3, 1]
+    
+    db.get(Matter, 1).title = "Brown v. Jones"
+    db.commit()
+    assert typeahead.search(db, 1, "smith") == [3]
+    assert typeahead.search(db, 1, "brown") == [1]
+    assert typeahead.search(db, 2, "smith") == [2]
+    
+    assert loads == [None, None, [3], [1]]
+    assert typeahead.stats()["organizations"] == 2
+
+
+def test_other_processes_patch_from_the_shared_change_log(db, monkeypatch):
+    """Test that a commit elsewhere is picked up through Redis without a rebuild."""
+    monkeypatch.setattr(typeahead_module, "_redis_client", FakeRedis())
+    loads = []
+    reader = TypeaheadIndex("matter", _counting(loads))
+    writer = TypeaheadIndex("matter", _rows)
+    assert reader.search(db, 1, "smith") == [1]
+    
+    db.add(Matter(organization_id=1, number="A-2", title="Smithers estate"))
+    db.commit()
+    writer.rows_changed(1, {3})
+    assert reader.search(db, 1, "smith") == [3, 1]
+    
+    writer.invalidate(1)
+    assert reader.search(db, 1, "smith") == [3, 1]
+    assert loads == [None, [3], None]
+
+
+def test_indexes_are_rebuilt_after_max_age(db):
+    """Test that an index is not served past its age without Redis."""
+    loads = []
+    typeahead = TypeaheadIndex("matter", _counting(loads), max_age=0)
+    typeahead.search(db, 1, "smith")
+    typeahead.search(db, 1, "smith")
+    assert loads == [None, None]